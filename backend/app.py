@@ -1,31 +1,35 @@
 from flask import Flask
 from flask_cors import CORS
-from src.database.database import init_db, get_db
-from src.routes.users import users_routes
-from src.routes.books import books_routes
-from src.routes.collections import collections_routes
-from src.routes.transactions import transactions_routes
-from src.database.commands import register_commands, seed_admin_collections
-from src.database.crud import create_user, create_book, create_transaction
-from src.auth_utils import hash_password
-from src.database.models import User
-app = Flask(__name__)
-CORS(app, supports_credentials=True, origins=["http://localhost:3000", "http://localhost:5173"])
+from src.database.database import init_app
+from src.database.commands import register_commands
+from src.init_routes import init_routes
+from src.metrics import init_metrics
+from src.serializers import init_json
 
-init_db()
+DEFAULT_CONFIG = {
+    "CORS_ORIGINS": ["http://localhost:3000", "http://localhost:5173"],
+}
 
-users_routes(app)
-books_routes(app)
-collections_routes(app)
-transactions_routes(app)
-register_commands(app)
 
-try:
-    from src.database.commands import register_commands
+def create_app(config: dict = None):
+    """Фабрика приложения. Под gunicorn с preload_app вызывается один раз в мастере до fork;
+    flask CLI находит её сам (FLASK_APP=app).
+
+    Фабрика не обращается к БД: схема и демо-данные — явные идемпотентные команды
+    flask create-tables и flask seed-db, готовность к трафику — GET /ready"""
+    app = Flask(__name__)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    if config:
+        app.config.update(config)
+    CORS(app, supports_credentials=True, origins=app.config["CORS_ORIGINS"])
+
+    init_app(app)
+    init_metrics(app)
+    init_json(app)
+    init_routes(app)
     register_commands(app)
-    app.test_cli_runner().invoke(args=["seed-db"])
-except Exception as e:
-    print(f"[seed-db] Ошибка при сидировании: {e}")
+    return app
+
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,72 @@
+"""
+Подбор стоимости bcrypt под конкретную машину и проверка пропускной способности пула паролей.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_bcrypt --rounds 10 11 12 13 14 --target-ms 250
+
+Для выбранной стоимости задайте BCRYPT_ROUNDS, размер пула — PASSWORD_POOL_SIZE.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from passlib.context import CryptContext
+
+from src import password_pool
+
+
+def measure_rounds(rounds, repeat):
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = context.hash("benchmark-password")
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        context.verify("benchmark-password", hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure_pool(requests, concurrency):
+    hashed = password_pool.hash_password("benchmark-password")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        results = list(clients.map(
+            lambda _: password_pool.verify_password("benchmark-password", hashed), range(requests)
+        ))
+    elapsed = time.perf_counter() - started
+    assert all(results)
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13, 14])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--requests", type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'verify, ms':>11}")
+    suitable = None
+    for rounds in args.rounds:
+        elapsed = measure_rounds(rounds, args.repeat)
+        print(f"{rounds:>6} {elapsed:>11.1f}")
+        if elapsed <= args.target_ms:
+            suitable = rounds
+    print(f"Рекомендуемое BCRYPT_ROUNDS при цели {args.target_ms:.0f} мс: {suitable or 'нет подходящих'}")
+
+    concurrency = max(1, password_pool.PASSWORD_POOL_SIZE)
+    throughput = measure_pool(args.requests, concurrency)
+    print(f"Пул: {password_pool.PASSWORD_POOL_SIZE} процессов, BCRYPT_ROUNDS={os.getenv('BCRYPT_ROUNDS', 12)}, "
+          f"{throughput:.1f} проверок/с")
+    print(password_pool.stats.snapshot())
+    password_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Бенчмарк GET /books на уровне crud: выборка страницы (offset и keyset) и COUNT(*) при росте каталога.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_books --sizes 1000 10000 100000 1000000
+
+По умолчанию используется временная SQLite-база; для Postgres задайте BENCH_DATABASE_URL.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.database.database import Base
+from src.database import models
+from src.database.crud import get_books, count_books
+
+CATEGORIES = ["Классика", "Фантастика", "Детектив", "Роман", "Фэнтези"]
+USERS = 50
+BATCH = 10000
+
+
+def seed(engine, total):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": i, "username": f"user{i}", "password": "x", "role": "user"} for i in range(1, USERS + 1)
+        ])
+        for start in range(0, total, BATCH):
+            conn.execute(insert(models.Book), [
+                {
+                    "title": f"Книга {i}",
+                    "author": f"Автор {i % 1000}",
+                    "category": CATEGORIES[i % len(CATEGORIES)],
+                    "user_id": i % USERS + 1,
+                    "year": 1800 + i % 220,
+                }
+                for i in range(start, min(start + BATCH, total))
+            ])
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(url, sizes, repeat, limit):
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+    print(f"{'books':>10} {'page, ms':>10} {'deep page, ms':>14} {'keyset, ms':>11} {'count, ms':>10}")
+    for size in sizes:
+        seed(engine, size)
+        db = Session()
+        filters = {"exclude_user_id": 1}
+        page = measure(lambda: get_books(db, skip=0, limit=limit, **filters), repeat)
+        deep = measure(lambda: get_books(db, skip=size // 2, limit=limit, **filters), repeat)
+        keyset = measure(lambda: get_books(db, after_id=size // 2, limit=limit, **filters), repeat)
+        count = measure(lambda: count_books(db, **filters), repeat)
+        db.close()
+        print(f"{size:>10} {page:>10.2f} {deep:>14.2f} {keyset:>11.2f} {count:>10.2f}")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=12)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        run(url, args.sizes, args.repeat, args.limit)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.sizes, args.repeat, args.limit)
+
+
+if __name__ == '__main__':
+    main()
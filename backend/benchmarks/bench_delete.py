@@ -0,0 +1,93 @@
+"""
+Бенчмарк каскадного удаления пользователя: crud.delete_user для владельца N книг
+с коллекциями, отзывами и обменами.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_delete --books 1000 10000
+
+По умолчанию используется временная SQLite-база; для Postgres задайте BENCH_DATABASE_URL.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from src.database.database import Base
+from src.database import models
+from src.database.crud import delete_user
+
+BATCH = 10000
+
+
+def seed(engine, books):
+    """Пользователь 1 — владелец books книг; пользователь 2 на них ссылается"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": 1, "username": "power_user", "password": "x", "role": "user"},
+            {"id": 2, "username": "reader", "password": "x", "role": "user"},
+        ])
+        conn.execute(insert(models.Collection), [
+            {"id": 1, "title": "Моя полка", "user_id": 1},
+            {"id": 2, "title": "Чужая полка", "user_id": 2},
+        ])
+        for start in range(0, books, BATCH):
+            chunk = range(start + 1, min(start + BATCH, books) + 1)
+            conn.execute(insert(models.Book), [
+                {"id": i, "title": f"Книга {i}", "author": "Автор", "category": "Классика", "user_id": 1}
+                for i in chunk
+            ])
+            conn.execute(insert(models.CollectionItem), [
+                {"collection_id": 1 + i % 2, "book_id": i} for i in chunk
+            ])
+            conn.execute(insert(models.Review), [
+                {"rating": 1 + i % 10, "text": "", "user_id": 2, "book_id": i} for i in chunk
+            ])
+            conn.execute(insert(models.Transaction), [
+                {"from_user_id": 1, "to_user_id": 2, "book_id": i, "place": "Кампус"} for i in chunk
+            ])
+
+
+def run(url, sizes):
+    engine = create_engine(url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def enable_foreign_keys(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    Session = sessionmaker(bind=engine)
+    print(f"{'books':>8} {'delete_user, ms':>16}  deleted")
+    for size in sizes:
+        seed(engine, size)
+        db = Session()
+        started = time.perf_counter()
+        deleted = delete_user(db, 1)
+        elapsed = (time.perf_counter() - started) * 1000
+        assert db.execute(select(models.Book.id).limit(1)).first() is None
+        db.close()
+        print(f"{size:>8} {elapsed:>16.1f}  {deleted}")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        run(url, args.books)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.books)
+
+
+if __name__ == '__main__':
+    main()
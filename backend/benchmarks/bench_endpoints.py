@@ -0,0 +1,453 @@
+"""
+Сквозной бенчмарк API: каждый маршрут books_routes, collections_routes, transactions_routes и users_routes
+на синтетических данных (src.database.synthetic) разного объёма.
+
+Для каждого объёма (--sizes, число книг; пользователей, отзывов, обменов и коллекций — пропорционально)
+маршруты прогоняются через тестовый клиент Flask в этом процессе и через настоящий HTTP-сервер
+(gunicorn или flask-dev, --servers). Выводятся p50/p95/p99, запросов/с, SQL-запросов на HTTP-запрос
+(по /metrics) и число ошибок. Авторизация настоящая (JWT администратора), кэш ответов по умолчанию выключен.
+Пишущие маршруты работают с отдельными строками (удаляются строки с конца диапазона), поэтому
+каждый запрос выполняет настоящую работу.
+
+Результаты сохраняются в JSON (--output); --compare сравнивает с прошлым прогоном и завершается
+с кодом 1, если p95 вырос или пропускная способность упала больше чем на --threshold,
+либо выросло число SQL-запросов на запрос или ошибок.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_endpoints --sizes 10000 100000 1000000 --output bench.json
+    python -m benchmarks.bench_endpoints --sizes 10000 --compare bench.json --threshold 0.2
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_endpoints --modes http
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+import numpy as np
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
+SECRET_KEY = "bench-secret-key-bench-secret-key"
+LOGIN_PASSWORD = "bench-password"
+# bcrypt (register/login) стоит сотни миллисекунд — для них меньше запросов
+SLOW_REQUESTS = 20
+MIN_DELTA_MS = 0.5  # изменения p95 меньше этого — шум, не регрессия
+# SQL на запрос в HTTP-режиме — среднее по одному воркеру и может чуть плавать; N+1 добавляет запрос на строку
+QUERY_DELTA = 0.5
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# make(dataset, i) → (путь, тело JSON или None)
+Case = namedtuple("Case", "method rule make slow")
+
+
+def case(method, rule, make, slow=False):
+    return Case(method, rule, make, slow)
+
+
+class Dataset:
+    """Объёмы таблиц и выдача id: для чтения — из первой половины, для удаления — заранее отобранные, без повторов"""
+
+    def __init__(self, counts, victims, items, seed=0):
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.run = ""
+        self._victims = {table: iter(ids) for table, ids in victims.items()}
+        # Пары (коллекция, книга), которые точно есть: удаляются по одной
+        self._victims["items"] = iter(items)
+
+    def read_id(self, table):
+        return self.rng.randint(1, max(1, self.counts[table] // 2))
+
+    def victim(self, table):
+        victim = next(self._victims[table], None)
+        if victim is None:
+            raise RuntimeError(f"Не хватает строк {table} для удаления: увеличьте --sizes или уменьшите --requests")
+        return victim
+
+    def item(self):
+        return self.victim("items")
+
+
+# Порядок — порядок выполнения: сначала чтение и запись, удаления в конце — от зависимых таблиц к главным,
+# чтобы каскады не задевали ещё не удалённые строки
+CASES = [
+    # books_routes
+    case("GET", "/books", lambda d, i: (f"/books?limit=20&skip={20 * (i % 50)}", None)),
+    case("GET", "/books/search", lambda d, i: (f"/books/search?q={quote('Книга')}%20{d.read_id('books')}", None)),
+    case("GET", "/books/<int:book_id>", lambda d, i: (f"/books/{d.read_id('books')}", None)),
+    case("POST", "/books", lambda d, i: ("/books", {"title": f"Новая книга {i}", "author": "Автор", "user_id": 1,
+                                                    "category": "Классика", "year": 2024})),
+    case("PUT", "/books/<int:book_id>", lambda d, i: (f"/books/{d.read_id('books')}", {"year": 1900 + i % 100})),
+    case("GET", "/admin/books", lambda d, i: ("/admin/books", None)),
+    # collections_routes
+    case("GET", "/collections", lambda d, i: (f"/collections?limit=20&skip={20 * (i % 50)}", None)),
+    case("GET", "/collections/<int:collection_id>", lambda d, i: (f"/collections/{d.read_id('collections')}", None)),
+    case("POST", "/collections", lambda d, i: ("/collections", {
+        "title": f"Подборка {i}", "user_id": 1, "book_ids": [d.read_id("books") for _ in range(5)]})),
+    case("PUT", "/collections/<int:collection_id>",
+         lambda d, i: (f"/collections/{d.read_id('collections')}", {"title": f"Подборка {i}"})),
+    case("POST", "/collections/<int:collection_id>/books",
+         lambda d, i: (f"/collections/{d.read_id('collections')}/books", {"book_ids": [d.read_id("books")]})),
+    case("GET", "/admin/collections", lambda d, i: ("/admin/collections", None)),
+    # transactions_routes
+    case("GET", "/transactions", lambda d, i: ("/transactions?limit=20&cursor=", None)),
+    case("GET", "/transactions/<int:transaction_id>",
+         lambda d, i: (f"/transactions/{d.read_id('transactions')}", None)),
+    case("POST", "/transactions", lambda d, i: ("/transactions", {
+        "from_user_id": 1, "to_user_id": 2, "book_id": d.read_id("books"), "place": "Кафе"})),
+    case("PUT", "/transactions/<int:transaction_id>",
+         lambda d, i: (f"/transactions/{d.read_id('transactions')}", {"place": f"Библиотека {i}"})),
+    case("PUT", "/transactions/<int:transaction_id>/status",
+         lambda d, i: (f"/transactions/{d.read_id('transactions')}/status", {"status": "accepted"})),
+    case("GET", "/admin/transactions", lambda d, i: ("/admin/transactions", None)),
+    # users_routes
+    case("POST", "/register", lambda d, i: ("/register", {"username": f"bench_{d.run}_{i}", "password": "secret"}),
+         slow=True),
+    case("POST", "/login", lambda d, i: ("/login", {"username": "user2", "password": LOGIN_PASSWORD}), slow=True),
+    case("GET", "/users", lambda d, i: ("/users", None)),
+    # Удаления
+    case("DELETE", "/collections/<int:collection_id>/books/<int:book_id>",
+         lambda d, i: ("/collections/{}/books/{}".format(*d.item()), None)),
+    case("DELETE", "/collections/<int:collection_id>", lambda d, i: (f"/collections/{d.victim('collections')}", None)),
+    case("DELETE", "/admin/collections/<int:collection_id>",
+         lambda d, i: (f"/admin/collections/{d.victim('collections')}", None)),
+    case("DELETE", "/transactions/<int:transaction_id>",
+         lambda d, i: (f"/transactions/{d.victim('transactions')}", None)),
+    case("DELETE", "/admin/transactions/<int:transaction_id>",
+         lambda d, i: (f"/admin/transactions/{d.victim('transactions')}", None)),
+    case("DELETE", "/books/<int:book_id>", lambda d, i: (f"/books/{d.victim('books')}", None)),
+    case("DELETE", "/admin/books/<int:book_id>", lambda d, i: (f"/admin/books/{d.victim('books')}", None)),
+    case("DELETE", "/users/<int:user_id>", lambda d, i: (f"/users/{d.victim('users')}", None)),
+]
+
+
+def check_coverage():
+    """Каждый маршрут четырёх модулей должен быть в CASES — новый маршрут без замера не пройдёт незамеченным"""
+    from flask import Flask
+    from src.routes.books import books_routes
+    from src.routes.collections import collections_routes
+    from src.routes.transactions import transactions_routes
+    from src.routes.users import users_routes
+
+    app = Flask(__name__)
+    for register in (books_routes, collections_routes, transactions_routes, users_routes):
+        register(app)
+    routes = {(method, rule.rule) for rule in app.url_map.iter_rules() if rule.endpoint != "static"
+              for method in rule.methods - {"HEAD", "OPTIONS"}}
+    missing = routes - {(c.method, c.rule) for c in CASES}
+    if missing:
+        raise SystemExit("Нет замера для маршрутов: " + ", ".join(f"{m} {r}" for m, r in sorted(missing)))
+
+
+def prepare(engine, size, requests, runs):
+    """Пересоздать схему, заполнить данными и вернуть Dataset; runs — сколько прогонов (клиент, серверы) его делят"""
+    from sqlalchemy import insert, select, update
+    from src.auth_utils import hash_password
+    from src.database import models, synthetic
+    from src.database.database import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    # Коллекций больше, чем по умолчанию: половина с конца уходит под два удаляющих маршрута
+    counts = synthetic.generate(engine, books=size, collections=max(size // 5, 4 * requests * runs))
+    victims = {table: range(counts[table], counts[table] // 2, -1) for table in ("collections", "transactions")}
+    with engine.begin() as conn:
+        conn.execute(update(models.User).where(models.User.id == 2).values(password=hash_password(LOGIN_PASSWORD)))
+        # Книги и пользователи для DELETE — отдельные, без связей: каскад по настоящим задел бы чтение
+        # в следующих прогонах. id назначает база, чтобы не сбить последовательности Postgres
+        conn.execute(insert(models.User), [{"username": f"victim{i}", "password": "x"}
+                                           for i in range(requests * runs)])
+        conn.execute(insert(models.Book), [{"title": f"Списанная книга {i}", "author": "Автор", "category": "Классика",
+                                            "user_id": 1} for i in range(2 * requests * runs)])
+        victims["users"] = conn.execute(select(models.User.id).where(models.User.username.like("victim%"))
+                                        .order_by(models.User.id)).scalars().all()
+        victims["books"] = conn.execute(select(models.Book.id).where(models.Book.id > size)
+                                        .order_by(models.Book.id)).scalars().all()
+        items = conn.execute(select(models.CollectionItem.collection_id, models.CollectionItem.book_id)
+                             .where(models.CollectionItem.book_id <= size // 2,
+                                    models.CollectionItem.collection_id <= counts["collections"] // 2)
+                             .order_by(models.CollectionItem.collection_id).limit(requests * runs)).all()
+    print(f"\nbooks {size:,}: " + ", ".join(f"{table} {count:,}" for table, count in counts.items())
+          + f" — {time.perf_counter() - started:.1f} s")
+    return Dataset(counts, victims, [tuple(item) for item in items])
+
+
+def build_requests(dataset, c, requests):
+    return [c.make(dataset, i) for i in range(SLOW_REQUESTS if c.slow else requests)]
+
+
+def summarize(latencies, elapsed, errors, queries):
+    """errors — {код ответа или "connection": число} для неуспешных запросов"""
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "queries": None if queries is None else round(queries, 2),
+        "errors": sum(errors.values()),
+        "error_statuses": {str(status): count for status, count in sorted(errors.items(), key=str)},
+    }
+
+
+def queries_per_request(histograms, key):
+    histogram = histograms.get(key)
+    if not histogram:
+        return None
+    count = sum(histogram[:-1])
+    return histogram[-1] / count if count else None
+
+
+def run_client(dataset, headers, requests, warmup):
+    """Тестовый клиент Flask в этом процессе, последовательно"""
+    from app import create_app
+    from src import metrics
+
+    client = create_app().test_client()
+    results = {}
+    for c in CASES:
+        batch = build_requests(dataset, c, requests)
+        for path, body in batch[:warmup] if c.method == "GET" else []:
+            client.open(path, method=c.method, json=body, headers=headers)
+        metrics.registry.reset()
+        latencies, errors = [], Counter()
+        started = time.perf_counter()
+        for path, body in batch:
+            request_started = time.perf_counter()
+            response = client.open(path, method=c.method, json=body, headers=headers)
+            response.get_data()
+            latencies.append(time.perf_counter() - request_started)
+            if response.status_code >= 400:
+                errors[response.status_code] += 1
+        elapsed = time.perf_counter() - started
+        queries = queries_per_request(metrics.registry.collect().queries, (c.method, c.rule))
+        results[f"{c.method} {c.rule}"] = summarize(latencies, elapsed, errors, queries)
+    return results
+
+
+def http_client(port, headers, batch):
+    """Один клиент с keep-alive соединением: (задержки в секундах, ошибки по кодам)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    latencies, errors = [], Counter()
+    for method, path, body in batch:
+        payload = None if body is None else json.dumps(body)
+        request_headers = dict(headers, **({"Content-Type": "application/json"} if payload else {}))
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=request_headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors[response.status] += 1
+        except (OSError, http.client.HTTPException):
+            errors["connection"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        latencies.append(time.perf_counter() - started)
+    return latencies, errors
+
+
+def scrape_queries(port, key, attempts):
+    """SQL на запрос маршрута key по /metrics. Каждый воркер gunicorn считает сам, поэтому /metrics
+    запрашивается новыми соединениями, пока не ответит воркер, обслуживший этот маршрут"""
+    for _ in range(attempts):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode()
+        conn.close()
+        totals, counts = {}, {}
+        for line in text.splitlines():
+            for name, target in (("db_queries_total{", totals), ("http_request_db_queries_count{", counts)):
+                if line.startswith(name):
+                    labels, value = line[len(name):].rsplit("} ", 1)
+                    pairs = dict(LABEL.findall(labels))
+                    target[(pairs["method"], pairs["route"])] = float(value)
+        if counts.get(key):
+            return totals[key] / counts[key]
+    return None
+
+
+def wait_ready(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Сервер завершился с кодом {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Сервер на порту {port} не ответил на /ready за {timeout} с")
+
+
+def run_http(dataset, headers, requests, warmup, args, env, name):
+    """Настоящий HTTP-сервер в подпроцессе, --concurrency клиентов-процессов"""
+    from benchmarks.bench_server import server_command
+
+    command, extra = server_command(name, args.port, args.workers, args.threads)
+    server = subprocess.Popen(command, cwd=BACKEND, env={**env, **extra},
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    results = {}
+    try:
+        wait_ready(args.port, server)
+        with multiprocessing.Pool(args.concurrency) as pool:
+            for c in CASES:
+                batch = [(c.method, path, body) for path, body in build_requests(dataset, c, requests)]
+                if c.method == "GET":
+                    http_client(args.port, headers, batch[:warmup])
+                chunks = [batch[i::args.concurrency] for i in range(args.concurrency)]
+                started = time.perf_counter()
+                parts = pool.starmap(http_client, [(args.port, headers, chunk) for chunk in chunks if chunk])
+                elapsed = time.perf_counter() - started
+                latencies = [latency for part in parts for latency in part[0]]
+                errors = sum((part[1] for part in parts), Counter())
+                queries = scrape_queries(args.port, (c.method, c.rule), attempts=4 * args.workers)
+                results[f"{c.method} {c.rule}"] = summarize(latencies, elapsed, errors, queries)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def print_results(title, results):
+    print(f"  {title}")
+    print(f"    {'route':<58} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'SQL/req':>8} {'errors':>6}")
+    for route, r in results.items():
+        queries = "-" if r["queries"] is None else f"{r['queries']:.1f}"
+        print(f"    {route:<58} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rps']:>8,.0f} "
+              f"{queries:>8} {r['errors']:>6} {' '.join(f'{k}×{v}' for k, v in r['error_statuses'].items())}")
+
+
+def compare(previous, current, threshold):
+    """Регрессии относительно прошлого прогона: [(ключ, описание)]"""
+    regressions = []
+    for key, now in current.items():
+        before = previous.get(key)
+        if before is None:
+            continue
+        if now["p95_ms"] > before["p95_ms"] * (1 + threshold) and now["p95_ms"] - before["p95_ms"] > MIN_DELTA_MS:
+            regressions.append((key, f"p95 {before['p95_ms']:.2f} → {now['p95_ms']:.2f} ms"))
+        if now["rps"] < before["rps"] * (1 - threshold):
+            regressions.append((key, f"req/s {before['rps']:,.0f} → {now['rps']:,.0f}"))
+        if None not in (now["queries"], before["queries"]) and now["queries"] > before["queries"] + QUERY_DELTA:
+            regressions.append((key, f"SQL/req {before['queries']:.2f} → {now['queries']:.2f}"))
+        if now["errors"] > before["errors"]:
+            regressions.append((key, f"errors {before['errors']} → {now['errors']} {now['error_statuses']}"))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(url, args, tmp):
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "SECRET_KEY": SECRET_KEY,
+        "RESPONSE_CACHE_BACKEND": args.cache,
+        "PASSWORD_POOL_SIZE": "0",
+        "RECS_DIR": os.path.join(tmp, "recs"),
+        "RECS_CONTENT_DIR": os.path.join(tmp, "content"),
+    }
+    env.pop("TESTING", None)
+    # Движок и настройки читаются из окружения при импорте src — до первого импорта
+    os.environ.update(env)
+    os.environ.pop("TESTING", None)
+    from src.auth_utils import create_access_token
+    from src.database.database import engine
+
+    check_coverage()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    results = {}
+    print(f"cpu {os.cpu_count()}, requests {args.requests}/route, concurrency {args.concurrency}, "
+          f"gunicorn {args.workers}×{args.threads}, cache {args.cache}")
+    runs = ("client" in args.modes) + ("http" in args.modes) * len(args.servers)
+    for size in args.sizes:
+        dataset = prepare(engine, size, args.requests, runs)
+        for mode in args.modes:
+            servers = ["test-client"] if mode == "client" else args.servers
+            for name in servers:
+                dataset.run = f"{size}_{name}"
+                if mode == "client":
+                    mode_results = run_client(dataset, headers, args.requests, args.warmup)
+                else:
+                    engine.dispose()  # SQLite: не держать соединения, пока пишет сервер
+                    mode_results = run_http(dataset, headers, args.requests, args.warmup, args, env, name)
+                print_results(name, mode_results)
+                results.update({f"{size}/{name}/{route}": r for route, r in mode_results.items()})
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на маршрут")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=["client", "http"], choices=["client", "http"])
+    parser.add_argument("--servers", nargs="+", default=["gunicorn"], choices=["gunicorn", "flask-dev"])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=(os.cpu_count() or 1) * 2 + 1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--cache", default="none", choices=["none", "memory"])
+    parser.add_argument("--port", type=int, default=5301)
+    parser.add_argument("--output", help="Сохранить результаты в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое ухудшение p95 и req/s (доля)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        results = run(url, args, tmp)
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "cpu": os.cpu_count(),
+            "database": "postgresql" if os.getenv("BENCH_DATABASE_URL") else "sqlite",
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = compare(previous["results"], results, args.threshold)
+        print(f"\nСравнение с {args.compare} ({previous['meta'].get('revision')}), порог {args.threshold:.0%}: "
+              + ("регрессий нет" if not regressions else f"регрессий {len(regressions)}"))
+        for key, description in regressions:
+            print(f"  {key}: {description}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Бенчмарк потокового экспорта /admin/books?format=ndjson|csv&stream=1: строки/с и пиковая память.
+
+Генератор ответа прогоняется целиком (crud.stream_books + сериализация), тело никуда не сохраняется.
+Пиковая память (tracemalloc) должна оставаться постоянной при росте таблицы.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_export --sizes 10000 100000 1000000
+
+По умолчанию используется временная SQLite-база; для Postgres задайте BENCH_DATABASE_URL.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_books import seed
+from src import serializers
+from src.database.crud import stream_books
+from src.export import stream_export
+
+
+def export(app, db, fmt):
+    """Размер выгрузки в байтах"""
+    with app.test_request_context(f"/admin/books?format={fmt}&stream=1"):
+        response = stream_export(stream_books(db), serializers.BOOK_ADMIN, "books", fmt)
+        return sum(len(chunk) for chunk in response.response)
+
+
+def measure(app, db, fmt):
+    """(секунд, байт, пиковая память в МБ); tracemalloc замедляет выделение памяти,
+    поэтому время и память меряются разными прогонами"""
+    started = time.perf_counter()
+    size = export(app, db, fmt)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    export(app, db, fmt)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size, peak / 1024 / 1024
+
+
+def run(url, sizes, formats):
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+    app = Flask(__name__)
+    serializers.init_json(app)
+    print(f"{'books':>10} {'format':>7} {'rows/s':>10} {'MB out':>8} {'peak MB':>8}")
+    for size in sizes:
+        seed(engine, size)
+        for fmt in formats:
+            db = Session()
+            elapsed, out, peak = measure(app, db, fmt)
+            db.close()
+            print(f"{size:>10} {fmt:>7} {size / elapsed:>10,.0f} {out / 1024 / 1024:>8.1f} {peak:>8.1f}")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--formats", nargs="+", default=["ndjson", "csv"])
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        run(url, args.sizes, args.formats)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.sizes, args.formats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Бенчмарк рекомендаций: сборка индексов и задержка запросов на объёме Book-Crossing (1.1M оценок, 340k книг).
+
+По умолчанию данные синтетические, с распределением как у дампа: ~105k пользователей, ~340k книг,
+популярность книг и активность пользователей — степенной закон. Замеряются полная сборка,
+инкрементальное обновление на --new новых оценках и задержки similar/recommend (p50/p99)
+на индексе, открытом через mmap — как в воркере. Для контентного индекса (TF-IDF) — полная сборка
+и задержка обновления книги на месте (create_book/update_book).
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_recs
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_recs   # данные из импортированного дампа
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+import numpy as np
+
+from src import content_similarity, recommendations
+from src.recommendations import Interactions
+
+
+def synthetic(ratings, users, books, seed=0):
+    rng = np.random.default_rng(seed)
+    # Zipf-подобные веса: немного очень популярных книг и очень активных пользователей
+    book_weights = 1 / np.arange(1, books + 1) ** 0.9
+    user_weights = 1 / np.arange(1, users + 1) ** 0.8
+    user = rng.choice(users, ratings, p=user_weights / user_weights.sum()) + 1
+    book = rng.choice(books, ratings, p=book_weights / book_weights.sum()) + 1
+    # В дампе ~62% оценок неявные (0)
+    rating = np.where(rng.random(ratings) < 0.62, 0, rng.integers(1, 11, ratings))
+    weights = np.where(rating > 0, rating / 10, recommendations.IMPLICIT_WEIGHT).astype(np.float32)
+    return Interactions(user.astype(np.int64), book.astype(np.int64), weights, max_review_id=ratings)
+
+
+def synthetic_books(books, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(50000)])
+    word_weights = 1 / np.arange(1, len(words) + 1)
+    title_words = rng.choice(words, (books, 4), p=word_weights / word_weights.sum())
+    lengths = rng.integers(1, 5, books)
+    authors = rng.integers(0, 100000, books)
+    # Как в импорте дампа: у большинства книг одна и та же категория
+    categories = np.where(rng.random(books) < 0.9, "Unknown", rng.choice(["Фэнтези", "Классика", "Детектив"], books))
+    return [(i + 1, " ".join(title_words[i, :lengths[i]]), f"Author {authors[i]}", categories[i])
+            for i in range(books)]
+
+
+def from_database(url):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    engine = create_engine(url)
+    db = sessionmaker(bind=engine)()
+    try:
+        books = list(content_similarity.book_texts(db))
+        return recommendations.load_interactions(db), books
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def percentiles(fn, ids):
+    timings = []
+    for value in ids:
+        started = time.perf_counter()
+        fn(int(value))
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def run(interactions, directory, top_k, new, queries):
+    print(f"interactions {len(interactions):,}, users {len(np.unique(interactions.users)):,}, "
+          f"books {len(np.unique(interactions.books)):,}")
+
+    started = time.perf_counter()
+    arrays, meta = recommendations.build_index(interactions, top_k)
+    recommendations.save_index(arrays, meta, directory)
+    print(f"full build:        {time.perf_counter() - started:8.1f} s")
+    size = sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+    print(f"index size:        {size / 1024 / 1024:8.1f} MB")
+
+    index = recommendations.load_index(directory)
+    rng = np.random.default_rng(1)
+    fresh = Interactions(
+        users=rng.choice(index.user_ids, new),
+        books=rng.choice(index.book_ids, new),
+        weights=np.full(new, 0.8, dtype=np.float32),
+        max_review_id=meta["max_review_id"] + new,
+    )
+    started = time.perf_counter()
+    arrays, meta = recommendations.update_index(index, fresh)
+    recommendations.save_index(arrays, meta, directory)
+    print(f"incremental ({new}): {time.perf_counter() - started:6.1f} s")
+
+    index = recommendations.load_index(directory)
+    # Запросы к популярным книгам и активным пользователям — худший случай для recommend
+    books = rng.choice(index.book_ids, queries)
+    users = rng.choice(index.user_ids, queries)
+    heavy = index.user_ids[np.argsort(-np.diff(index.user_indptr))[:queries]]
+    for name, fn, ids in (("similar", index.similar, books), ("recommend", index.recommend, users),
+                          ("recommend heavy", index.recommend, heavy)):
+        p50, p99 = percentiles(fn, ids)
+        print(f"{name:<16} p50 {p50:6.3f} ms   p99 {p99:6.3f} ms")
+
+
+def run_content(books, directory, top_k, queries):
+    print(f"\ncontent: books {len(books):,}")
+    started = time.perf_counter()
+    arrays, meta = content_similarity.build_index(books, top_k)
+    recommendations.save_index(arrays, meta, directory)
+    print(f"full build:        {time.perf_counter() - started:8.1f} s")
+    size = sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+    print(f"index size:        {size / 1024 / 1024:8.1f} MB ({meta['terms']:,} terms)")
+
+    rng = np.random.default_rng(2)
+    index = recommendations.load_index(directory, content_similarity.ContentIndex, mmap_mode="r+")
+    last_id = books[-1][0]
+    # Половина — новые книги, половина — изменение существующих
+    updates = [(last_id + i + 1, *books[rng.integers(len(books))][1:]) if i % 2 else books[rng.integers(len(books))]
+               for i in range(queries)]
+    timings = []
+    for book in updates:
+        started = time.perf_counter()
+        index.put(*book)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    print(f"{'put':<16} p50 {np.percentile(timings, 50):6.3f} ms   p99 {np.percentile(timings, 99):6.3f} ms")
+    p50, p99 = percentiles(index.similar, rng.choice(index.book_ids[:index.size], queries))
+    print(f"{'similar':<16} p50 {p50:6.3f} ms   p99 {p99:6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", type=int, default=1150000)
+    parser.add_argument("--users", type=int, default=105000)
+    parser.add_argument("--books", type=int, default=340000)
+    parser.add_argument("--top-k", type=int, default=recommendations.RECS_TOP_K)
+    parser.add_argument("--new", type=int, default=1000, help="Новых оценок для инкрементального обновления")
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        interactions, books = from_database(url)
+    else:
+        interactions, books = synthetic(args.ratings, args.users, args.books), synthetic_books(args.books)
+    with tempfile.TemporaryDirectory() as tmp:
+        run(interactions, os.path.join(tmp, "recs"), args.top_k, args.new, args.queries)
+        run_content(books, os.path.join(tmp, "content"), args.top_k, args.queries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Микробенчмарк сериализации: строки/с для ответа из N книг и N обменов.
+
+Сравниваются: прежний путь (dict в цикле + стандартный jsonify), планы полей + стандартный json
+и планы полей + orjson (если установлен). БД не используется — объекты моделей создаются в памяти.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_serializers --rows 10000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from flask import Flask, jsonify
+
+from src import serializers
+from src.database.models import Book, Transaction, User
+
+
+def make_rows(count):
+    users = [User(id=i, username=f"user{i}", role="user") for i in range(1, 51)]
+    books = []
+    for i in range(count):
+        book = Book(id=i + 1, title=f"Книга {i}", author=f"Автор {i % 1000}", category="Классика",
+                    user_id=users[i % 50].id, year=1800 + i % 220 if i % 7 else None)
+        book.user = users[i % 50]
+        books.append(book)
+    transactions = []
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        transaction = Transaction(id=i + 1, date=start + timedelta(minutes=i), from_user_id=users[i % 50].id,
+                                  to_user_id=users[(i + 1) % 50].id, book_id=books[i].id, place="Библиотека",
+                                  status="pending")
+        transaction.from_user = users[i % 50]
+        transaction.to_user = users[(i + 1) % 50]
+        transaction.book = books[i]
+        transactions.append(transaction)
+    return books, transactions
+
+
+def legacy_books(books):
+    return [{
+        'id': book.id,
+        'title': book.title,
+        'author': book.author,
+        'category': book.category,
+        'user_id': book.user_id,
+        'username': book.user.username if hasattr(book, 'user') and book.user else None,
+        'year': book.year if book.year is not None else ''
+    } for book in books]
+
+
+def legacy_transactions(transactions):
+    result = []
+    for t in transactions:
+        result.append({
+            "id": t.id,
+            "date": t.date.isoformat() if t.date else None,
+            "from_user_id": t.from_user_id,
+            "to_user_id": t.to_user_id,
+            "from_user_name": t.from_user.username if hasattr(t, 'from_user') and t.from_user else None,
+            "to_user_name": t.to_user.username if hasattr(t, 'to_user') and t.to_user else None,
+            "book_id": t.book_id,
+            "place": t.place,
+            "status": t.status,
+            "book_title": t.book.title if t.book else None
+        })
+    return result
+
+
+def measure(app, build, rows, repeat):
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            jsonify(build(rows)).get_data()
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(count, repeat):
+    books, transactions = make_rows(count)
+    stdlib_app = Flask(__name__)
+    fast_app = Flask(__name__)
+    serializers.init_json(fast_app)
+
+    variants = [
+        ("dict + json", stdlib_app, legacy_books, legacy_transactions),
+        ("план + json", stdlib_app, serializers.BOOK.many, serializers.TRANSACTION.many),
+    ]
+    if isinstance(fast_app.json, serializers.OrjsonProvider):
+        variants.append(("план + orjson", fast_app, serializers.BOOK.many, serializers.TRANSACTION.many))
+    else:
+        print("orjson не установлен — вариант с ним пропущен")
+
+    print(f"{'вариант':<16}{'книги, строк/с':>18}{'обмены, строк/с':>18}")
+    baseline = None
+    for name, app, build_books, build_transactions in variants:
+        books_time = measure(app, build_books, books, repeat)
+        transactions_time = measure(app, build_transactions, transactions, repeat)
+        rates = (count / books_time, count / transactions_time)
+        baseline = baseline or rates
+        print(f"{name:<16}{rates[0]:>12,.0f} x{rates[0] / baseline[0]:.1f}"
+              f"{rates[1]:>12,.0f} x{rates[1] / baseline[1]:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
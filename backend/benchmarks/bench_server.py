@@ -0,0 +1,153 @@
+"""
+Нагрузочный тест: dev-сервер (flask run) против gunicorn (pre-fork, gunicorn.conf.py) на запросах чтения.
+
+Оба сервера запускаются подпроцессами поверх одной базы: временной SQLite или BENCH_DATABASE_URL.
+Клиенты — отдельные процессы с keep-alive соединениями; запросы идут по кругу по PATHS.
+Выводятся запросов/с, p50, p99 и число ошибок. Кэш ответов по умолчанию выключен, чтобы
+мерить приложение и БД, а не попадания в кэш (--cache memory — включить).
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_server --books 10000 --concurrency 16 --duration 10
+    python -m benchmarks.bench_server --workers 4 --threads 8
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from benchmarks.bench_books import seed
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
+SECRET_KEY = "bench-secret-key-bench-secret-key"
+PATHS = [
+    "/books?limit=20",
+    "/books?limit=20&category=%D0%9A%D0%BB%D0%B0%D1%81%D1%81%D0%B8%D0%BA%D0%B0",  # Классика
+    "/books/{book_id}",
+    "/collections?limit=20",
+]
+
+
+def server_command(name, port, workers, threads):
+    if name == "flask-dev":
+        return [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload"], {}
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"], {
+        "BIND": f"127.0.0.1:{port}",
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_THREADS": str(threads),
+    }
+
+
+def wait_ready(port, headers, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/books?limit=1", headers=headers)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Сервер на порту {port} не поднялся за {timeout} с")
+
+
+def client(port, headers, duration, books, seed_value):
+    """Один клиент: запросы по кругу до истечения времени; (задержки в секундах, ошибки)"""
+    rng = np.random.default_rng(seed_value)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    position = seed_value
+    while time.monotonic() < deadline:
+        path = PATHS[position % len(PATHS)].format(book_id=int(rng.integers(1, books + 1)))
+        position += 1
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        latencies.append(time.perf_counter() - started)
+    return latencies, errors
+
+
+def load(port, headers, concurrency, duration, books):
+    with multiprocessing.Pool(concurrency) as pool:
+        started = time.perf_counter()
+        results = pool.starmap(client, [(port, headers, duration, books, i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    latencies = np.concatenate([np.array(result[0]) for result in results]) * 1000
+    errors = sum(result[1] for result in results)
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99), errors
+
+
+def run(url, args):
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "SECRET_KEY": SECRET_KEY,
+        "RESPONSE_CACHE_BACKEND": args.cache,
+        "PASSWORD_POOL_SIZE": "0",
+    }
+    env.pop("TESTING", None)
+    os.environ["SECRET_KEY"] = SECRET_KEY
+    from src.auth_utils import create_access_token
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    print(f"books {args.books}, concurrency {args.concurrency}, duration {args.duration}s, "
+          f"gunicorn {args.workers}×{args.threads}, cpu {os.cpu_count()}")
+    print(f"{'server':>10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for port, name in enumerate(args.servers, start=args.port):
+        command, extra = server_command(name, port, args.workers, args.threads)
+        server = subprocess.Popen(command, cwd=BACKEND, env={**env, **extra},
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(port, headers)
+            # Прогрев: соединения пула, ленивые импорты, кэш страниц SQLite
+            load(port, headers, args.concurrency, 1, args.books)
+            rps, p50, p99, errors = load(port, headers, args.concurrency, args.duration, args.books)
+            print(f"{name:>10} {rps:>9,.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=(os.cpu_count() or 1) * 2 + 1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--cache", default="none", choices=["none", "memory"])
+    parser.add_argument("--port", type=int, default=5101)
+    parser.add_argument("--servers", nargs="+", default=["flask-dev", "gunicorn"])
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        seed(create_engine(url), args.books)
+        run(url, args)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(create_engine(url), args.books)
+        run(url, args)
+
+
+if __name__ == '__main__':
+    main()
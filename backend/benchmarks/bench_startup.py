@@ -0,0 +1,141 @@
+"""
+Бенчмарк холодного старта: сколько проходит от запуска процесса до первого обслуженного запроса.
+
+Каждый замер — новый процесс интерпретатора, поэтому кэш модулей не помогает (байткод .pyc — помогает,
+как и в контейнере после первой сборки). Замеряются:
+  - import app и create_app() в отдельном процессе, плюс список тяжёлых модулей, попавших в sys.modules;
+  - время от запуска сервера (flask-dev или gunicorn) до первого 200 от GET /ready;
+  - задержка первого GET /books после готовности (ленивые импорты и первое соединение с БД).
+Выводятся медианы по --runs запускам. Схема создаётся один раз заранее (flask create-tables),
+сервер при старте БД не трогает.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --servers gunicorn --workers 4
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from sqlalchemy import create_engine
+
+from benchmarks.bench_books import seed
+from benchmarks.bench_server import BACKEND, SECRET_KEY, server_command
+
+HEAVY_MODULES = ("numpy", "scipy", "passlib", "bcrypt", "jwt")
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({"import": imported - started, "create_app": created - imported,
+                  "heavy": [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import(env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    probe["process"] = time.perf_counter() - started
+    return probe
+
+
+def request(port, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def measure_server(name, port, env, headers, workers, threads, timeout=60):
+    """(секунд до первого 200 от /ready, секунд на первый GET /books)"""
+    command, extra = server_command(name, port, workers, threads)
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=BACKEND, env={**env, **extra},
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"{name} не ответил на /ready за {timeout} с")
+            try:
+                if request(port, "/ready") == 200:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.01)
+        ready = time.perf_counter() - started
+        first_started = time.perf_counter()
+        status = request(port, "/books?limit=20", headers)
+        if status != 200:
+            raise RuntimeError(f"{name}: GET /books вернул {status}")
+        return ready, time.perf_counter() - first_started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run(url, args):
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "SECRET_KEY": SECRET_KEY,
+        "PASSWORD_POOL_SIZE": "0",
+    }
+    env.pop("TESTING", None)
+    os.environ["SECRET_KEY"] = SECRET_KEY
+    from src.auth_utils import create_access_token
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    probes = [measure_import(env) for _ in range(args.runs)]
+    print(f"runs {args.runs}, books {args.books}, cpu {os.cpu_count()}")
+    for key in ("import", "create_app", "process"):
+        print(f"{key + ' ms':<22} {statistics.median(probe[key] for probe in probes) * 1000:8.1f}")
+    print(f"{'heavy modules':<22} {', '.join(probes[0]['heavy']) or '-'}")
+
+    print(f"\n{'server':>10} {'ready ms':>10} {'first req ms':>13}")
+    for port, name in enumerate(args.servers, start=args.port):
+        timings = [measure_server(name, port, env, headers, args.workers, args.threads) for _ in range(args.runs)]
+        ready = statistics.median(timing[0] for timing in timings) * 1000
+        first = statistics.median(timing[1] for timing in timings) * 1000
+        print(f"{name:>10} {ready:>10.1f} {first:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5201)
+    parser.add_argument("--servers", nargs="+", default=["flask-dev", "gunicorn"])
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        seed(create_engine(url), args.books)
+        run(url, args)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(create_engine(url), args.books)
+        run(url, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""Настройки gunicorn (pre-fork): gunicorn -c gunicorn.conf.py wsgi:app
+
+Воркеры — процессы (обходят GIL), потоки внутри воркера — под ожидание БД. Число соединений
+с Postgres: WEB_CONCURRENCY × (DB_POOL_SIZE + DB_MAX_OVERFLOW) должно укладываться в max_connections,
+а GUNICORN_THREADS — не превышать DB_POOL_SIZE + DB_MAX_OVERFLOW.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+# Приложение импортируется один раз в мастере: воркеры стартуют быстрее и делят страницы памяти (copy-on-write)
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Перезапуск воркера после N запросов — страховка от утечек памяти; 0 — выключено
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+accesslog = os.getenv("GUNICORN_ACCESSLOG")
+
+
+def post_fork(server, worker):
+    # Соединения, открытые в мастере при preload (create_all, сидирование), не должны
+    # использоваться сразу несколькими процессами: воркер начинает с пустого пула.
+    # close=False — не закрывать сокеты, которые ещё принадлежат мастеру
+    from src.database.database import engine
+    engine.dispose(close=False)
@@ -4,8 +4,10 @@ from functools import wraps
 from flask import request, jsonify
 
 from src.auth_utils import decode_token
+from src.database.crud import get_user
 from src.database.database import get_db
 from src.database.models import User
+from src.principal_cache import Principal, principal_cache
 
 def auth_required(f):
     @wraps(f)
@@ -25,14 +27,18 @@ def auth_required(f):
             if not user_id:
                 raise ValueError("Invalid token payload")
 
-            db = get_db()
-            user = db.query(User).get(int(user_id))
-            db.close()
-
-            if not user:
-                return jsonify({'error': 'User not found'}), 404
-
-            request.user = user
+            user_id = int(user_id)
+            principal = principal_cache.get(user_id)
+            if principal is None:
+                # Версия — до чтения из БД: изменение пользователя после него не закэшируется как актуальное
+                version = principal_cache.version()
+                user = get_user(get_db(), user_id)
+                if not user:
+                    return jsonify({'error': 'User not found'}), 404
+                principal = Principal(id=user.id, username=user.username, role=user.role)
+                principal_cache.set(principal, version)
+
+            request.user = principal
             return f(*args, **kwargs)
 
         except ValueError as e:
@@ -0,0 +1,214 @@
+"""Кэш ответов read-heavy эндпоинтов.
+
+Ключ ответа включает версии сущностей, от которых он зависит ("books", "collections", ...).
+crud увеличивает версию после каждой записи, поэтому устаревшие записи больше не находятся
+и со временем вытесняются LRU. Сами ответы хранятся в каждом воркере свои, а версии — общие:
+счётчики лежат в файле, открытом через mmap, и запись в одном воркере сразу меняет ключи во всех.
+"""
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 30))
+# Файл версий общий для всех воркеров одной машины (контейнера)
+RESPONSE_CACHE_VERSIONS_FILE = os.getenv("RESPONSE_CACHE_VERSIONS_FILE",
+                                         os.path.join(tempfile.gettempdir(), "response-cache-versions"))
+
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+
+
+class LRUCacheBackend:
+    """LRU в памяти процесса, ограниченный суммарным размером значений в байтах"""
+    name = "memory"
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, size, value = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._items.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.name,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class NullCacheBackend:
+    """Кэш выключен: RESPONSE_CACHE_BACKEND=none"""
+    name = "none"
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value, size: int):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+BACKENDS = {
+    LRUCacheBackend.name: LRUCacheBackend,
+    NullCacheBackend.name: NullCacheBackend,
+}
+
+
+class EntityVersions:
+    """Счётчики версий — int64 в файле через mmap. Чтение без блокировок (выровненные 8 байт),
+    увеличение — под lockf: в отличие от flock, блокировка принадлежит процессу и работает
+    и для дескриптора, унаследованного воркером от мастера при preload"""
+    ENTITIES = ("users", "books", "collections", "ratings")
+
+    def __init__(self, path: str = RESPONSE_CACHE_VERSIONS_FILE):
+        self.path = path
+        self._slots = {entity: i for i, entity in enumerate(self.ENTITIES)}
+        self._lock = threading.Lock()  # lockf не разделяет потоки одного процесса
+        self._fd = None
+        self._counters = None
+
+    def _open(self):
+        with self._lock:
+            if self._counters is None:
+                size = len(self.ENTITIES) * 8
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                finally:
+                    fcntl.lockf(fd, fcntl.LOCK_UN)
+                self._fd = fd
+                self._counters = memoryview(mmap.mmap(fd, size)).cast("q")
+        return self._counters
+
+    def bump(self, *entities):
+        counters = self._open()
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                for entity in entities:
+                    counters[self._slots[entity]] += 1
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def get(self, *entities):
+        counters = self._open()
+        return tuple(counters[self._slots[entity]] for entity in entities)
+
+    def snapshot(self):
+        return dict(zip(self.ENTITIES, self.get(*self.ENTITIES)))
+
+
+response_cache = BACKENDS[RESPONSE_CACHE_BACKEND]()
+versions = EntityVersions()
+
+
+def invalidate(*entities):
+    """Вызывается из crud после commit: все закэшированные ответы по этим сущностям устаревают"""
+    versions.bump(*entities)
+
+
+def _cache_key(entities, vary_on_user):
+    parts = [
+        request.endpoint,
+        sorted(request.view_args.items()) if request.view_args else [],
+        sorted(request.args.items(multi=True)),
+        versions.get(*entities),
+        getattr(getattr(request, "user", None), "id", None) if vary_on_user else None,
+    ]
+    return hashlib.blake2b(json.dumps(parts, default=str).encode(), digest_size=16).hexdigest()
+
+
+def cached_response(*entities, vary_on_user=False):
+    """Кэширует успешные (200) ответы эндпоинта; ставится под @auth_required"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = _cache_key(entities, vary_on_user)
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, mimetype, validators = cached
+                response = Response(body, status=200, mimetype=mimetype, headers=validators)
+                response.headers["X-Cache"] = "HIT"
+                # If-None-Match / If-Modified-Since проверяются и для ответов из кэша
+                return response.make_conditional(request)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                body = response.get_data()
+                validators = {name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers}
+                response_cache.set(key, (body, response.mimetype, validators), len(body) + len(key))
+                response.headers["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
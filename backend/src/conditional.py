@@ -0,0 +1,58 @@
+"""Условные GET-запросы: строгие ETag, Last-Modified и ответы 304.
+
+Валидаторы считаются по уже загруженным строкам (id, updated_at) до сериализации,
+поэтому 304 отдаётся без сборки JSON.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from flask import Response, request
+
+
+def make_etag(*parts) -> str:
+    """Строгий ETag (без кавычек) по значениям, от которых зависит представление"""
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def rows_etag(rows, total=None, *extra) -> str:
+    """ETag списка: число строк (или total по всему фильтру) и (id, updated_at) каждой строки страницы"""
+    return make_etag(total if total is not None else len(rows),
+                     [(row.id, getattr(row, "updated_at", None)) for row in rows], *extra)
+
+
+def last_modified_of(*values):
+    """Максимальный updated_at; None, если ни одной даты нет"""
+    dates = [value for value in values if isinstance(value, datetime)]
+    if not dates:
+        return None
+    # updated_at хранится в UTC без часового пояса, а HTTP-даты — с точностью до секунды
+    return max(dates).replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _not_modified(etag: str, last_modified=None) -> bool:
+    # If-None-Match приоритетнее If-Modified-Since (RFC 9110, 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _set_validators(response: Response, etag: str, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+
+def not_modified_response(etag: str, last_modified=None):
+    """Пустой 304, если копия клиента актуальна, иначе None"""
+    if not _not_modified(etag, last_modified):
+        return None
+    return _set_validators(Response(status=304), etag, last_modified)
+
+
+def conditional(response: Response, etag: str, last_modified=None):
+    """Добавляет валидаторы к готовому ответу 200"""
+    return _set_validators(response, etag, last_modified)
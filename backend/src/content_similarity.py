@@ -0,0 +1,331 @@
+"""Контентные «похожие книги»: TF-IDF по названию, автору и категории.
+
+У новых книг нет оценок, и коллаборативная фильтрация их не видит — здесь близость считается по тексту.
+Вектор книги — до MAX_TERMS термов с весами (float32, строки фиксированной ширины), соседи — top-K
+по косинусу. Массивы создаются с запасом ёмкости и открываются через mmap: create_book/update_book
+дописывают и правят строки на месте под файловой блокировкой, остальные воркеры видят изменения
+через общий page cache без перезагрузки. Полная пересборка — flask rebuild-recs.
+"""
+import fcntl
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database import models
+from src.recommendations import (
+    BLOCK_SIZE, RECS_TOP_K, IndexHolder, NeighborIndex, load_index, merge_neighbor, save_index, select_top_k,
+)
+
+CONTENT_DIR = os.getenv("RECS_CONTENT_DIR",
+                        os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "content"))
+MAX_TERMS = 16
+TERM_BYTES = 48
+FIELD_WEIGHTS = {"title": 1.0, "author": 1.0, "category": 0.5}
+# Термы, которые есть у большего числа книг (категория импорта, «the»), не порождают кандидатов в соседи —
+# иначе блок XXᵀ становится плотным; в оценку близости найденных кандидатов они входят
+MAX_TERM_BOOKS = int(os.getenv("RECS_CONTENT_MAX_DF", 5000))
+# При сборке частые термы добавляются к оценке только RERANK·K лучших кандидатов по редким термам:
+# для всех пар это на порядок дороже самого произведения
+RERANK = 4
+# Запас строк под книги, созданные после сборки, и под изменённые книги (их термы не в постинг-листах)
+MIN_HEADROOM = 1000
+TAIL_CAPACITY = 10000
+
+ARRAYS = ("header", "book_ids", "terms", "weights", "neighbors", "scores", "tail",
+          "vocabulary", "idf", "postings_indptr", "postings_rows")
+
+_WORD = re.compile(r"\w+")
+
+
+def _term_counts(title: str, author: str, category: str):
+    counts = Counter()
+    for field, prefix, text in (("title", "", title), ("author", "a:", author)):
+        for word in _WORD.findall((text or "").lower()):
+            if len(word) > 1:
+                counts[(prefix + word).encode()[:TERM_BYTES]] += FIELD_WEIGHTS[field]
+    if category:
+        counts[("c:" + category.strip().lower()).encode()[:TERM_BYTES]] += FIELD_WEIGHTS["category"]
+    return counts
+
+
+def _normalized(terms, weights):
+    """До MAX_TERMS самых весомых термов, L2-норма 1"""
+    nonzero = weights > 0
+    terms, weights = terms[nonzero], weights[nonzero]
+    if len(weights) > MAX_TERMS:
+        best = np.argsort(-weights, kind="stable")[:MAX_TERMS]
+        terms, weights = terms[best], weights[best]
+    norm = np.sqrt(np.dot(weights, weights))
+    return terms.astype(np.int32), (weights / norm if norm else weights).astype(np.float32)
+
+
+def _vector(counts, vocabulary, idf):
+    """(термы, веса) книги по словарю индекса; термов, которых нет в словаре, до пересборки не учитываем"""
+    if not counts or not len(vocabulary):
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    keys = np.array(list(counts), dtype=vocabulary.dtype)
+    positions = np.minimum(np.searchsorted(vocabulary, keys), len(vocabulary) - 1)
+    known = vocabulary[positions] == keys
+    terms = positions[known]
+    weights = np.array(list(counts.values()), dtype=np.float32)[known] * idf[terms]
+    return _normalized(terms, weights)
+
+
+def _padded(matrix, capacity):
+    terms = np.full((capacity, MAX_TERMS), -1, dtype=np.int32)
+    weights = np.zeros((capacity, MAX_TERMS), dtype=np.float32)
+    for row in range(matrix.shape[0]):
+        lo, hi = matrix.indptr[row], matrix.indptr[row + 1]
+        row_terms, row_weights = _normalized(matrix.indices[lo:hi], matrix.data[lo:hi])
+        terms[row, :len(row_terms)] = row_terms
+        weights[row, :len(row_weights)] = row_weights
+    return terms, weights
+
+
+def _matrix(terms, weights, size, columns):
+    present = terms[:size] >= 0
+    rows = np.nonzero(present)[0]
+    return sparse.csr_matrix((weights[:size][present], (rows, terms[:size][present])),
+                             shape=(size, columns), dtype=np.float32)
+
+
+def _common_terms(terms, weights, frequent):
+    """Частые термы каждой книги строками фиксированной ширины (обычно 1–3 терма: категория, «the»)"""
+    common = (terms >= 0) & frequent[np.maximum(terms, 0)]
+    width = int(common.sum(axis=1).max(initial=0))
+    order = np.argsort(~common, axis=1, kind="stable")[:, :width]
+    return (np.take_along_axis(np.where(common, terms, -1), order, axis=1),
+            np.take_along_axis(np.where(common, weights, 0), order, axis=1))
+
+
+def _shared(common_terms, common_weights, rows, cols):
+    """Вклад частых термов в скалярное произведение пар книг (rows[i], cols[i])"""
+    shared = np.zeros(len(rows), dtype=np.float32)
+    left_terms, left_weights = common_terms[rows], common_weights[rows]
+    right_terms, right_weights = common_terms[cols], common_weights[cols]
+    for a in range(common_terms.shape[1]):
+        for b in range(common_terms.shape[1]):
+            match = (left_terms[:, a] == right_terms[:, b]) & (left_terms[:, a] >= 0)
+            shared += np.where(match, left_weights[:, a] * right_weights[:, b], 0)
+    return shared
+
+
+def build_index(books, top_k: int = RECS_TOP_K):
+    """Полная сборка; books — (id, title, author, category) по возрастанию id. Возвращает (массивы, метаданные)"""
+    ids, docs = [], []
+    for book_id, title, author, category in books:
+        ids.append(book_id)
+        docs.append(_term_counts(title, author, category))
+    size = len(ids)
+    capacity = size + max(MIN_HEADROOM, size // 10)
+
+    vocabulary = np.array(sorted(set().union(*docs)), dtype=f"S{TERM_BYTES}")
+    keys = np.array([key for doc in docs for key in doc], dtype=vocabulary.dtype)
+    counts = np.fromiter((value for doc in docs for value in doc.values()), dtype=np.float32, count=len(keys))
+    rows = np.repeat(np.arange(size), [len(doc) for doc in docs])
+    cols = np.searchsorted(vocabulary, keys)
+    df = np.bincount(cols, minlength=len(vocabulary))
+    # Сглаженный idf без «+1»: терм, который есть у всех книг, веса не имеет
+    idf = np.log((1 + size) / (1 + df)).astype(np.float32)
+    tfidf = sparse.csr_matrix((counts * idf[cols], (rows, cols)), shape=(size, len(vocabulary)), dtype=np.float32)
+    terms, weights = _padded(tfidf, capacity)
+
+    matrix = _matrix(terms, weights, size, len(vocabulary))
+    frequent = df > MAX_TERM_BOOKS
+    rare = (matrix @ sparse.diags((~frequent).astype(np.float32))).tocsr()
+    rare.eliminate_zeros()
+    common_terms, common_weights = _common_terms(terms[:size], weights[:size], frequent)
+    postings = rare.tocsc()
+
+    neighbors = np.full((capacity, top_k), -1, dtype=np.int32)
+    scores = np.zeros((capacity, top_k), dtype=np.float32)
+    rare_t = rare.T.tocsr()
+    for start in range(0, size, BLOCK_SIZE):
+        block = np.arange(start, min(size, start + BLOCK_SIZE))
+        similarities = (rare[block] @ rare_t).tocsr()
+        candidates = []
+        for row, item in enumerate(block):
+            lo, hi = similarities.indptr[row], similarities.indptr[row + 1]
+            not_self = similarities.indices[lo:hi] != item
+            candidates.append(select_top_k(similarities.indices[lo:hi][not_self],
+                                           similarities.data[lo:hi][not_self], top_k * RERANK))
+        lengths = [len(cols) for cols, _ in candidates]
+        cols = np.concatenate([cols for cols, _ in candidates])
+        values = np.concatenate([values for _, values in candidates])
+        values += _shared(common_terms, common_weights, np.repeat(block, lengths), cols)
+        bounds = np.cumsum([0] + lengths)
+        for row, item in enumerate(block):
+            lo, hi = bounds[row], bounds[row + 1]
+            top_cols, top_values = select_top_k(cols[lo:hi], values[lo:hi], top_k)
+            neighbors[item, :len(top_cols)] = top_cols
+            scores[item, :len(top_values)] = top_values
+
+    book_ids = np.zeros(capacity, dtype=np.int64)
+    book_ids[:size] = ids
+    arrays = {
+        "header": np.array([size, 0], dtype=np.int64),
+        "book_ids": book_ids,
+        "terms": terms,
+        "weights": weights,
+        "neighbors": neighbors,
+        "scores": scores,
+        "tail": np.zeros(TAIL_CAPACITY, dtype=np.int32),
+        "vocabulary": vocabulary,
+        "idf": idf,
+        "postings_indptr": postings.indptr.astype(np.int64),
+        "postings_rows": postings.indices.astype(np.int32),
+    }
+    meta = {"built_at": datetime.utcnow().isoformat(), "top_k": top_k, "books": size,
+            "terms": len(vocabulary), "capacity": capacity}
+    return arrays, meta
+
+
+class ContentIndex(NeighborIndex):
+    """Контентный индекс; первые header[0] строк заняты, header[1] — число строк в хвосте tail"""
+    arrays = ARRAYS
+
+    @property
+    def size(self):
+        return int(self.header[0])
+
+    def _book_index(self, book_id: int):
+        size = self.size
+        position = int(np.searchsorted(self.book_ids[:size], book_id))
+        if position < size and self.book_ids[position] == book_id:
+            return position
+        return None
+
+    def _dot(self, rows, terms, weights):
+        """Косинус строк rows с вектором (terms, weights)"""
+        order = np.argsort(terms)
+        terms, weights = terms[order], weights[order]
+        row_terms = np.asarray(self.terms[rows])
+        positions = np.minimum(np.searchsorted(terms, row_terms), len(terms) - 1)
+        matched = (terms[positions] == row_terms) & (row_terms >= 0)
+        return (np.asarray(self.weights[rows]) * np.where(matched, weights[positions], 0)).sum(axis=1)
+
+    def _candidates(self, row, terms, size):
+        """Кандидаты в соседи: книги с общими редкими термами (постинг-листы сборки) и хвост —
+        книги, добавленные или изменённые после сборки"""
+        indptr = self.postings_indptr
+        lists = [np.asarray(self.postings_rows[indptr[term]:indptr[term + 1]]) for term in terms]
+        lists.append(np.asarray(self.tail[:int(self.header[1])]))
+        candidates = np.unique(np.concatenate(lists)).astype(np.int32)
+        return candidates[(candidates != row) & (candidates < size)]
+
+    def put(self, book_id: int, title: str, author: str, category: str) -> bool:
+        """Добавить или обновить книгу; False — нет места или id меньше последнего (до полной пересборки)"""
+        size = self.size
+        row = self._book_index(book_id)
+        if row is None:
+            if size == len(self.book_ids) or (size and book_id < self.book_ids[size - 1]):
+                return False
+            row = size
+            self.book_ids[row] = book_id
+
+        # Книги, у которых эта в соседях, делят с ней редкий терм старого вектора (или лежат в хвосте)
+        listing = np.empty(0, dtype=np.int32)
+        if row < size:
+            old_terms = np.asarray(self.terms[row])
+            listing = self._candidates(row, old_terms[old_terms >= 0], size)
+            listing = listing[(np.asarray(self.neighbors[listing]) == row).any(axis=1)]
+
+        terms, weights = _vector(_term_counts(title, author, category), self.vocabulary, self.idf)
+        self.terms[row] = -1
+        self.weights[row] = 0
+        self.terms[row, :len(terms)] = terms
+        self.weights[row, :len(weights)] = weights
+
+        top_k = self.neighbors.shape[1]
+        candidates = np.empty(0, dtype=np.int32)
+        values = np.empty(0, dtype=np.float32)
+        if len(terms):
+            candidates = self._candidates(row, terms, max(size, row + 1))
+            values = self._dot(candidates, terms, weights)
+            similar = values > 0
+            candidates, values = candidates[similar], values[similar]
+        top_cols, top_values = select_top_k(candidates, values, top_k)
+        self.neighbors[row] = -1
+        self.scores[row] = 0
+        self.neighbors[row, :len(top_cols)] = top_cols
+        self.scores[row, :len(top_values)] = top_values
+
+        # Общих термов больше нет — убрать книгу из чужих списков
+        for book in np.setdiff1d(listing, candidates):
+            self._drop_neighbor(book, row)
+        listed = (np.asarray(self.neighbors[candidates]) == row).any(axis=1)
+        for position in np.nonzero(listed | (values > self.scores[candidates, -1]))[0]:
+            merge_neighbor(self.neighbors, self.scores, candidates[position], row, values[position])
+
+        tail_size = int(self.header[1])
+        if tail_size < len(self.tail) and row not in self.tail[:tail_size]:
+            self.tail[tail_size] = row
+            self.header[1] = tail_size + 1
+        # Размер — последним: до этого читатели новую строку не видят
+        if row == size:
+            self.header[0] = size + 1
+        return True
+
+    def _drop_neighbor(self, book, neighbor):
+        keep = self.neighbors[book] != neighbor
+        row_neighbors, row_scores = self.neighbors[book][keep], self.scores[book][keep]
+        self.neighbors[book] = -1
+        self.scores[book] = 0
+        self.neighbors[book, :len(row_neighbors)] = row_neighbors
+        self.scores[book, :len(row_scores)] = row_scores
+
+
+@contextmanager
+def _writer(directory: str):
+    """Текущая версия индекса на запись; запись из разных воркеров сериализуется flock"""
+    with open(os.path.join(directory, "LOCK"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield load_index(directory, ContentIndex, mmap_mode="r+")
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def index_book(book: models.Book, directory: str = None) -> bool:
+    """Обновить книгу в индексе; вызывается после commit в create_book/update_book.
+    Если индекс не собран, ничего не делает"""
+    directory = directory or CONTENT_DIR
+    if not os.path.exists(os.path.join(directory, "CURRENT")):
+        return False
+    with _writer(directory) as index:
+        return index.put(book.id, book.title, book.author, book.category)
+
+
+def book_texts(db: Session, condition=None, batch_size: int = 100000):
+    query = select(models.Book.id, models.Book.title, models.Book.author, models.Book.category) \
+        .order_by(models.Book.id)
+    if condition is not None:
+        query = query.where(condition)
+    return db.execute(query.execution_options(yield_per=batch_size))
+
+
+def rebuild(db: Session, top_k: int = RECS_TOP_K, directory: str = None):
+    """Полная сборка и публикация; возвращает метаданные"""
+    directory = directory or CONTENT_DIR
+    started_at = datetime.utcnow()
+    arrays, meta = build_index(book_texts(db), top_k)
+    save_index(arrays, meta, directory)
+    # Книги, созданные или изменённые во время сборки, могли в неё не попасть
+    with _writer(directory) as index:
+        for book in book_texts(db, models.Book.updated_at >= started_at):
+            index.put(*book)
+    return meta
+
+
+content_holder = IndexHolder(CONTENT_DIR, ContentIndex)
+
+
+def get_content_index():
+    return content_holder.get()
@@ -0,0 +1,76 @@
+"""Недостающие колонки на существующей БД.
+
+create_all (flask create-tables) создаёт только новые таблицы и не меняет существующие: колонки,
+добавленные в модели позже (books.updated_at, collections.book_count, ...), нужно добавить через
+ALTER TABLE и заполнить производные данные. Повторный запуск ничего не меняет.
+"""
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
+
+from src.database import models, search
+from src.database.crud import recount_collections, recount_ratings
+from src.database.database import Base
+
+
+def missing_columns(bind):
+    """Колонки моделей, которых нет в уже существующих таблицах; bind — Engine или Connection"""
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [column for column in table.columns if column.name not in present]
+    return missing
+
+
+def _add_column_sql(column, dialect):
+    preparer = dialect.identifier_preparer
+    table = preparer.format_table(column.table)
+    default = column.server_default
+    if dialect.name == "sqlite" and default is not None and not isinstance(default.arg, str):
+        # SQLite не добавляет колонку с неконстантным DEFAULT (CURRENT_TIMESTAMP): без него и с заполнением
+        name = preparer.format_column(column)
+        return [f"ALTER TABLE {table} ADD COLUMN {name} {column.type.compile(dialect=dialect)}",
+                f"UPDATE {table} SET {name} = {default.arg.compile(dialect=dialect)}"]
+    # NOT NULL-колонки модели имеют server_default — им заполняются существующие строки
+    return [f"ALTER TABLE {table} ADD COLUMN {CreateColumn(column).compile(dialect=dialect)}"]
+
+
+def migrate_columns(engine: Engine, echo=print):
+    """Добавляет недостающие колонки одной транзакцией и заполняет зависящие от них данные.
+    Возвращает список добавленных колонок "таблица.колонка"."""
+    added = []
+    with engine.begin() as conn:
+        for column in missing_columns(conn):
+            for statement in _add_column_sql(column, engine.dialect):
+                conn.execute(text(statement))
+            added.append(f"{column.table.name}.{column.name}")
+            echo(f"{added[-1]}: добавлена")
+        reindex = "books.search_vector" in added and engine.dialect.name == "postgresql"
+        if engine.dialect.name == "sqlite" and "books_fts" not in inspect(conn).get_table_names():
+            # FTS-таблица создаётся вместе с books (models.py) — к старой books её не было
+            conn.execute(text("CREATE VIRTUAL TABLE books_fts USING fts5(title, author, tokenize='unicode61')"))
+            echo("books_fts: создана")
+            reindex = True
+
+    db = sessionmaker(bind=engine)()
+    try:
+        if "collections.book_count" in added:
+            echo(f"Счётчики коллекций пересчитаны: {recount_collections(db)}")
+        # book_ratings появилась вместе с отзывами: на старой БД она пустая, хотя отзывы есть
+        if db.scalar(select(models.Review.id).limit(1)) is not None \
+                and db.scalar(select(models.BookRating.book_id).limit(1)) is None:
+            echo(f"Агрегаты оценок пересчитаны: книг {recount_ratings(db)}")
+        if reindex:
+            echo(f"Поисковый индекс заполнен: книг {search.reindex_books(db)}")
+    finally:
+        db.close()
+    if added:
+        echo("Индексы новых колонок (isbn, search_vector): flask migrate-indexes")
+    else:
+        echo("Все колонки на месте")
+    return added
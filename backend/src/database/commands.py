@@ -1,8 +1,14 @@
 import click
-from src.database.database import get_db, init_db
-from src.database.models import User, Book, Transaction, Collection
-from src.database.crud import create_user, create_book, create_transaction, create_collection
-from src.auth_utils import hash_password
+from sqlalchemy import select
+from src import cache
+from src.database import search
+from src.database.database import engine, get_db, init_db
+from src.database.importer import BookCrossingImporter
+from src.database.search import reindex_books
+from src.database.columns import migrate_columns
+from src.database.indexes import migrate_indexes, check_query_plans
+from src.database.crud import recount_collections, recount_ratings
+from src.database.models import User, Book, Transaction, Collection, CollectionItem
 
 def register_commands(app):
     @app.cli.command("create-tables")
@@ -15,67 +21,201 @@ def register_commands(app):
             raise
 
     @app.cli.command("seed-db")
-    def seed_db():
+    def seed_db_cli():
+        """Добавить демо-данные; повторный запуск ничего не дублирует"""
         try:
-            db = get_db()
-            users = [
-                {"username": "admin", "password": hash_password("admin123"), "role": "admin"},
-                {"username": "user1", "password": hash_password("user123"), "role": "user"},
-                {"username": "user2", "password": hash_password("user123"), "role": "user"},
-                {"username": "user3", "password": hash_password("user123"), "role": "user"}
-            ]
-            user_objs = []
-            for user_data in users:
-                user_objs.append(create_user(db, user_data))
-
-            books = [
-                {"title": "Война и мир", "author": "Лев Толстой", "user_id": user_objs[1].id, "category": "Классика", "year": 1869},
-                {"title": "1984", "author": "Джордж Оруэлл", "user_id": user_objs[1].id, "category": "Антиутопия", "year": 1949},
-                {"title": "Анна Каренина", "author": "Лев Толстой", "user_id": user_objs[1].id, "category": "Классика", "year": 1877},
-                {"title": "Три мушкетёра", "author": "Александр Дюма", "user_id": user_objs[1].id, "category": "Приключения", "year": 1844},
-                {"title": "Мастер и Маргарита", "author": "Михаил Булгаков", "user_id": user_objs[2].id, "category": "Фантастика", "year": 1940},
-                {"title": "Преступление и наказание", "author": "Федор Достоевский", "user_id": user_objs[2].id, "category": "Классика", "year": 1866},
-                {"title": "Идиот", "author": "Федор Достоевский", "user_id": user_objs[2].id, "category": "Классика", "year": 1869},
-                {"title": "Братья Карамазовы", "author": "Федор Достоевский", "user_id": user_objs[2].id, "category": "Классика", "year": 1880},
-                {"title": "Гарри Поттер", "author": "Джоан Роулинг", "user_id": user_objs[3].id, "category": "Фэнтези", "year": 1997},
-                {"title": "Три товарища", "author": "Эрих Мария Ремарк", "user_id": user_objs[3].id, "category": "Роман", "year": 1936},
-                {"title": "Над пропастью во ржи", "author": "Джером Сэлинджер", "user_id": user_objs[3].id, "category": "Классика", "year": 1951},
-                {"title": "Унесённые ветром", "author": "Маргарет Митчелл", "user_id": user_objs[3].id, "category": "Роман", "year": 1936},
-                {"title": "Старик и море", "author": "Эрнест Хемингуэй", "user_id": user_objs[0].id, "category": "Классика", "year": 1952},
-                {"title": "Шерлок Холмс", "author": "Артур Конан Дойл", "user_id": user_objs[0].id, "category": "Детектив", "year": 1892}
-            ]
-            book_objs = []
-            for book_data in books:
-                book_objs.append(create_book(db, book_data))
-
-            collections = [
-                {"title": "Служебные admin", "user_id": user_objs[0].id, "book_ids": [book_objs[12].id, book_objs[13].id]},
-                {"title": "Русская классика", "user_id": user_objs[0].id, "book_ids": [book_objs[0].id, book_objs[2].id, book_objs[5].id, book_objs[6].id, book_objs[7].id]}
-            ]
-            for col in collections:
-                create_collection(db, col)
-
-            exchanges = [
-                {"from_user_id": user_objs[1].id, "to_user_id": user_objs[2].id, "book_id": book_objs[2].id, "place": "Библиотека", "status": "pending"},
-                {"from_user_id": user_objs[1].id, "to_user_id": user_objs[2].id, "book_id": book_objs[3].id, "place": "Кафе", "status": "completed"},
-                {"from_user_id": user_objs[2].id, "to_user_id": user_objs[1].id, "book_id": book_objs[0].id, "place": "Парк", "status": "in_progress"},
-                {"from_user_id": user_objs[3].id, "to_user_id": user_objs[1].id, "book_id": book_objs[0].id, "place": "Университет", "status": "canceled"},
-                {"from_user_id": user_objs[0].id, "to_user_id": user_objs[3].id, "book_id": book_objs[4].id, "place": "Офис", "status": "pending"}
-            ]
-            for exchange_data in exchanges:
-                create_transaction(db, exchange_data)
-
-            db.close()
-            click.echo("Тестовые данные успешно добавлены в БД")
+            added = seed_db(get_db())
+            if any(added.values()):
+                click.echo("Тестовые данные добавлены: " + ", ".join(f"{k} {v}" for k, v in added.items()))
+            else:
+                click.echo("Тестовые данные уже есть")
         except Exception as e:
             click.echo(f"Ошибка при добавлении тестовых данных: {e}", err=True)
             raise
 
+    @app.cli.command("import-bookcrossing")
+    @click.option("--users", "users_path", type=click.Path(exists=True, dir_okay=False), help="BX-Users.csv / .jsonl")
+    @click.option("--books", "books_path", type=click.Path(exists=True, dir_okay=False), help="BX-Books.csv / .jsonl")
+    @click.option("--ratings", "ratings_path", type=click.Path(exists=True, dir_okay=False),
+                  help="BX-Book-Ratings.csv / .jsonl")
+    @click.option("--batch-size", default=5000, show_default=True)
+    @click.option("--delimiter", default=";", show_default=True)
+    @click.option("--encoding", default="latin-1", show_default=True)
+    @click.option("--include-implicit", is_flag=True, help="Загружать неявные оценки (0) как отзывы")
+    def import_bookcrossing(users_path, books_path, ratings_path, batch_size, delimiter, encoding, include_implicit):
+        """Импорт дампа Book-Crossing; повторный запуск продолжает с последнего батча"""
+        def progress(source, position, inserted, rate):
+            click.echo(f"{source}: прочитано {position}, добавлено {inserted} ({rate:.0f} строк/с)")
+
+        importer = BookCrossingImporter(engine, batch_size=batch_size, delimiter=delimiter, encoding=encoding,
+                                        include_implicit=include_implicit, progress=progress)
+        # Порядок важен: оценки ссылаются на пользователей и книги
+        for kind, path in (("users", users_path), ("books", books_path), ("ratings", ratings_path)):
+            if path:
+                inserted = getattr(importer, f"import_{kind}")(path)
+                click.echo(f"{kind}: добавлено {inserted}")
+        if books_path:
+            click.echo("Обновите поисковый индекс: flask reindex-books")
+        if ratings_path:
+            click.echo("Пересчитайте агрегаты оценок: flask recount-ratings")
+
+    @app.cli.command("reindex-books")
+    @click.option("--batch-size", default=10000, show_default=True)
+    def reindex_books_cli(batch_size):
+        """Заполнить полнотекстовый индекс книг (после импорта или миграции)"""
+        db = get_db()
+        total = reindex_books(db, batch_size=batch_size)
+        click.echo(f"Проиндексировано книг: {total}")
+
+    @app.cli.command("migrate-columns")
+    def migrate_columns_cli():
+        """Добавить колонки, появившиеся в моделях, в существующие таблицы (после create-tables)"""
+        migrate_columns(engine, echo=click.echo)
+
+    @app.cli.command("migrate-indexes")
+    def migrate_indexes_cli():
+        """Построить недостающие индексы на существующей БД (Postgres — CONCURRENTLY, без блокировки записи)"""
+        failed = migrate_indexes(engine, echo=click.echo)
+        if failed:
+            raise click.ClickException(f"Не удалось построить индексы: {', '.join(failed)}")
+
+    @app.cli.command("check-indexes")
+    def check_indexes_cli():
+        """Проверить через EXPLAIN, что горячие crud-запросы не делают полный проход по таблицам"""
+        failed = []
+        for name, plan, uses_index in check_query_plans(get_db()):
+            click.echo(f"{'ok ' if uses_index else 'FAIL'} {name}: {'; '.join(plan)}")
+            if not uses_index:
+                failed.append(name)
+        if failed:
+            raise click.ClickException(f"Запросы без индекса: {', '.join(sorted(set(failed)))}")
+
+    @app.cli.command("recount-collections")
+    def recount_collections_cli():
+        """Пересчитать кэш book_count у коллекций по collection_items"""
+        fixed = recount_collections(get_db())
+        click.echo(f"Исправлено коллекций: {fixed}")
+
+    @app.cli.command("recount-ratings")
+    def recount_ratings_cli():
+        """Пересчитать агрегаты оценок книг (book_ratings) по таблице reviews"""
+        rated = recount_ratings(get_db())
+        click.echo(f"Книг с оценками: {rated}")
+
+    @app.cli.command("rebuild-recs")
+    @click.option("--incremental", is_flag=True,
+                  help="Учесть только новые оценки и обмены с прошлой сборки; контентный индекс не пересобирать")
+    @click.option("--top-k", type=int, help="Соседей на книгу (по умолчанию RECS_TOP_K)")
+    def rebuild_recs_cli(incremental, top_k):
+        """Пересобрать индексы рекомендаций (похожие книги); воркеры подхватят их без перезапуска"""
+        # numpy/scipy нужны только здесь — не грузим их при старте приложения
+        from src import content_similarity, recommendations
+        top_k = top_k or recommendations.RECS_TOP_K
+        db = get_db()
+        meta = recommendations.rebuild(db, incremental=incremental, top_k=top_k)
+        click.echo(f"Индекс рекомендаций ({meta['mode']}): книг {meta['books']}, "
+                   f"пользователей {meta['users']}, взаимодействий {meta['interactions']}")
+        # Контентный индекс обновляется в create_book/update_book; полная сборка — для новых термов и idf
+        if not incremental:
+            meta = content_similarity.rebuild(db, top_k=top_k)
+            click.echo(f"Контентный индекс: книг {meta['books']}, термов {meta['terms']}")
+
     @app.cli.command("seed-admin-collections")
     def seed_admin_collections_cli():
         db = get_db()
         seed_admin_collections(db)
 
+# bcrypt-хэши паролей демо-пользователей (admin123, user123) посчитаны заранее: сидирование не тратит секунды на bcrypt
+ADMIN_PASSWORD_HASH = "$2b$12$3nRxk0f96KAC6eJlWfW8nuDeGuKKWv5kdHRyjziBvomxPTP2ClKMK"
+USER_PASSWORD_HASH = "$2b$12$fh8dSKs9nVfzhoHA20Drk.NMV9uVT/LiBN.jc8M75vxMoi/2ppuiS"
+
+SEED_USERS = [
+    {"username": "admin", "password": ADMIN_PASSWORD_HASH, "role": "admin"},
+    {"username": "user1", "password": USER_PASSWORD_HASH, "role": "user"},
+    {"username": "user2", "password": USER_PASSWORD_HASH, "role": "user"},
+    {"username": "user3", "password": USER_PASSWORD_HASH, "role": "user"},
+]
+# (название, автор, владелец, категория, год)
+SEED_BOOKS = [
+    ("Война и мир", "Лев Толстой", "user1", "Классика", 1869),
+    ("1984", "Джордж Оруэлл", "user1", "Антиутопия", 1949),
+    ("Анна Каренина", "Лев Толстой", "user1", "Классика", 1877),
+    ("Три мушкетёра", "Александр Дюма", "user1", "Приключения", 1844),
+    ("Мастер и Маргарита", "Михаил Булгаков", "user2", "Фантастика", 1940),
+    ("Преступление и наказание", "Федор Достоевский", "user2", "Классика", 1866),
+    ("Идиот", "Федор Достоевский", "user2", "Классика", 1869),
+    ("Братья Карамазовы", "Федор Достоевский", "user2", "Классика", 1880),
+    ("Гарри Поттер", "Джоан Роулинг", "user3", "Фэнтези", 1997),
+    ("Три товарища", "Эрих Мария Ремарк", "user3", "Роман", 1936),
+    ("Над пропастью во ржи", "Джером Сэлинджер", "user3", "Классика", 1951),
+    ("Унесённые ветром", "Маргарет Митчелл", "user3", "Роман", 1936),
+    ("Старик и море", "Эрнест Хемингуэй", "admin", "Классика", 1952),
+    ("Шерлок Холмс", "Артур Конан Дойл", "admin", "Детектив", 1892),
+]
+# (название, владелец, книги по названию)
+SEED_COLLECTIONS = [
+    ("Служебные admin", "admin", ["Старик и море", "Шерлок Холмс"]),
+    ("Русская классика", "admin",
+     ["Война и мир", "Анна Каренина", "Преступление и наказание", "Идиот", "Братья Карамазовы"]),
+]
+# (от кого, кому, книга, место, статус)
+SEED_EXCHANGES = [
+    ("user1", "user2", "Анна Каренина", "Библиотека", "pending"),
+    ("user1", "user2", "Три мушкетёра", "Кафе", "completed"),
+    ("user2", "user1", "Война и мир", "Парк", "in_progress"),
+    ("user3", "user1", "Война и мир", "Университет", "canceled"),
+    ("admin", "user3", "Мастер и Маргарита", "Офис", "pending"),
+]
+
+
+def seed_db(db):
+    """Демо-данные одной транзакцией. Идемпотентно: строки ищутся по естественным ключам (имя пользователя,
+    название и автор книги, название и владелец коллекции, участники, книга и место обмена) и вставляются
+    только недостающие. Возвращает число добавленных строк по таблицам"""
+    users = dict(db.execute(select(User.username, User.id)
+                            .where(User.username.in_([user["username"] for user in SEED_USERS]))).all())
+    new_users = [User(**user) for user in SEED_USERS if user["username"] not in users]
+    db.add_all(new_users)
+    db.flush()
+    users.update((user.username, user.id) for user in new_users)
+
+    books = {(title, author): book_id for title, author, book_id in db.execute(
+        select(Book.title, Book.author, Book.id).where(Book.title.in_([book[0] for book in SEED_BOOKS]))
+    )}
+    new_books = [Book(title=title, author=author, user_id=users[owner], category=category, year=year)
+                 for title, author, owner, category, year in SEED_BOOKS if (title, author) not in books]
+    db.add_all(new_books)
+    db.flush()
+    for book in new_books:
+        search.index_book(db, book)
+    books.update(((book.title, book.author), book.id) for book in new_books)
+    book_ids = {title: books[(title, author)] for title, author, *_ in SEED_BOOKS}
+
+    collections = set(db.execute(select(Collection.title, Collection.user_id)
+                                 .where(Collection.title.in_([title for title, *_ in SEED_COLLECTIONS]))).all())
+    new_collections = [(Collection(title=title, user_id=users[owner], book_count=len(titles)), titles)
+                       for title, owner, titles in SEED_COLLECTIONS if (title, users[owner]) not in collections]
+    db.add_all([collection for collection, _ in new_collections])
+    db.flush()
+    db.add_all([CollectionItem(collection_id=collection.id, book_id=book_ids[title])
+                for collection, titles in new_collections for title in titles])
+
+    exchanges = set(db.execute(select(Transaction.from_user_id, Transaction.to_user_id, Transaction.book_id,
+                                      Transaction.place)
+                               .where(Transaction.book_id.in_(book_ids.values()))).all())
+    new_exchanges = [
+        Transaction(from_user_id=users[sender], to_user_id=users[receiver], book_id=book_ids[title],
+                    place=place, status=status)
+        for sender, receiver, title, place, status in SEED_EXCHANGES
+        if (users[sender], users[receiver], book_ids[title], place) not in exchanges
+    ]
+    db.add_all(new_exchanges)
+    db.commit()
+    cache.invalidate("users", "books", "collections")
+    return {"users": len(new_users), "books": len(new_books), "collections": len(new_collections),
+            "transactions": len(new_exchanges)}
+
+
 def seed_admin_collections(db):
     from src.database.models import Collection, User
     admin = db.query(User).filter(User.role == 'admin').first()
@@ -1,8 +1,33 @@
-from sqlalchemy import and_
+import logging
+
+from sqlalchemy import Float, and_, case, cast, delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, joinedload
-from src.database import models
+from sqlalchemy.orm import Session, aliased, joinedload, raiseload
+from src import cache
+from src.database import database, models, search
 from src.database.models import Collection, CollectionItem
+from src.principal_cache import principal_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _loader_options(*options):
+    """Явные стратегии загрузки связей для списков; в строгом режиме остальное — raiseload"""
+    if database.STRICT_LOADING:
+        return [*options, raiseload("*")]
+    return list(options)
+
+
+def _index_content(book):
+    # Книга уже сохранена: ошибка индекса (файлы, переполнение, битый .npy) не должна превращать
+    # запись в 500 — клиент повторил бы запрос и создал дубликат. Индекс догонит flask rebuild-recs
+    try:
+        # numpy/scipy контентного индекса импортируются при первой записи книги, а не при старте приложения
+        from src import content_similarity
+        content_similarity.index_book(book)
+    except Exception:
+        logger.exception("Content index update failed for book %s, run: flask rebuild-recs", book.id)
 
 
 # Books
@@ -14,26 +39,114 @@ def create_book(db: Session, book: dict):
     try:
         db_book = models.Book(**book)
         db.add(db_book)
+        db.flush()
+        search.index_book(db, db_book)
         db.commit()
+        cache.invalidate("books")
         db.refresh(db_book)
+        _index_content(db_book)
         return db_book
     except IntegrityError as e:
         db.rollback()
         raise ValueError(f"Database integrity error: {e}")
 
 
-def get_books(db: Session, skip: int = 0, limit: int = 100, category: str = None, author: str = None, user_id: int = None):
+BOOK_SORT_FIELDS = {
+    "id": models.Book.id,
+    "title": models.Book.title,
+    "year": models.Book.year,
+    "rating": models.BookRating.avg,
+}
+
+
+def _books_query(db: Session, category: str = None, author: str = None, user_id: int = None,
+                 exclude_user_id: int = None, min_rating: float = None, sort: str = None):
+    """Базовый запрос по книгам со всеми фильтрами — общий для выборки и подсчёта"""
     query = db.query(models.Book)
+    # Средняя оценка берётся из book_ratings — без GROUP BY по отзывам
+    if min_rating is not None:
+        query = query.join(models.BookRating).filter(models.BookRating.avg >= min_rating)
+    elif sort and sort.lstrip("-") == "rating":
+        query = query.outerjoin(models.BookRating)
     if category:
         query = query.filter(models.Book.category == category)
     if author:
         query = query.filter(models.Book.author == author)
     if user_id:
         query = query.filter(models.Book.user_id == user_id)
-    return query.offset(skip).limit(limit).all()
+    if exclude_user_id:
+        query = query.filter(models.Book.user_id != exclude_user_id)
+    return query
+
+
+def _book_order_by(sort: str = None):
+    """Сортировка вида 'title' или '-title'; id всегда добавляется для стабильных страниц"""
+    if not sort:
+        return [models.Book.id]
+    field = sort.lstrip("-")
+    if field not in BOOK_SORT_FIELDS:
+        raise ValueError(f"Unsupported sort field: {field}")
+    column = BOOK_SORT_FIELDS[field]
+    descending = sort.startswith("-")
+    order = [column.desc() if descending else column]
+    if field == "rating":
+        # Книги без оценок — в конце в обоих направлениях
+        order = [order[0].nulls_last()]
+    if field != "id":
+        order.append(models.Book.id.desc() if descending else models.Book.id)
+    return order
+
+
+def get_books(db: Session, skip: int = 0, limit: int = 100, category: str = None, author: str = None,
+              user_id: int = None, exclude_user_id: int = None, sort: str = None, after_id: int = None,
+              min_rating: float = None):
+    query = _books_query(db, category=category, author=author, user_id=user_id, exclude_user_id=exclude_user_id,
+                         min_rating=min_rating, sort=sort)
+    # Роуты отдают book.user.username — подтягиваем владельца тем же запросом
+    query = query.options(*_loader_options(joinedload(models.Book.user)))
+    if after_id is not None:
+        # Keyset-пагинация: страница начинается сразу после последнего отданного id
+        if sort not in (None, "id"):
+            raise ValueError("Cursor pagination supports only sort=id")
+        query = query.filter(models.Book.id > after_id)
+    return query.order_by(*_book_order_by(sort)).offset(skip).limit(limit).all()
+
+
+def count_books(db: Session, category: str = None, author: str = None, user_id: int = None,
+                exclude_user_id: int = None, min_rating: float = None):
+    """Количество книг по тем же фильтрам, что и get_books — одним COUNT(*) в БД"""
+    query = _books_query(db, category=category, author=author, user_id=user_id, exclude_user_id=exclude_user_id,
+                         min_rating=min_rating)
+    return query.with_entities(func.count(models.Book.id)).scalar()
+
+def _stream(db: Session, query, batch_size: int):
+    # Серверный курсор (stream_results) и выдача партиями: память не зависит от размера таблицы
+    return db.execute(query.execution_options(yield_per=batch_size))
+
+
+def stream_books(db: Session, batch_size: int = 5000):
+    """Все книги для экспорта: только колонки, без объектов ORM"""
+    return _stream(db, select(
+        models.Book.id, models.Book.title, models.Book.author, models.Book.category,
+        models.Book.user_id, models.Book.year
+    ).order_by(models.Book.id), batch_size)
+
 
 def get_book(db: Session, book_id: int):
-    return db.query(models.Book).filter(models.Book.id == book_id).first()
+    return db.query(models.Book) \
+        .options(joinedload(models.Book.user)) \
+        .filter(models.Book.id == book_id) \
+        .first()
+
+
+def get_books_by_ids(db: Session, book_ids: list):
+    """Книги в порядке book_ids (выдача рекомендаций); удалённые пропускаются"""
+    if not book_ids:
+        return []
+    rows = db.execute(select(models.Book.id, models.Book.title, models.Book.author, models.Book.category)
+                      .where(models.Book.id.in_(book_ids))).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[book_id] for book_id in book_ids if book_id in by_id]
 
 
 def update_book(db: Session, book_id: int, book: dict):
@@ -42,16 +155,57 @@ def update_book(db: Session, book_id: int, book: dict):
         return None
     for key, value in book.items():
         setattr(db_book, key, value)
+    if "title" in book or "author" in book:
+        db.flush()
+        search.index_book(db, db_book)
     db.commit()
+    # Название книги показывается и в составе коллекций
+    cache.invalidate("books")
     db.refresh(db_book)
+    if book.keys() & {"title", "author", "category"}:
+        _index_content(db_book)
     return db_book
 
+def _delete_where(db: Session, model, condition):
+    result = db.execute(
+        delete(model).where(condition).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _delete_books(db: Session, book_ids):
+    """Удаление книг вместе со всем, что на них ссылается; book_ids — список или подзапрос.
+    Без commit: вызывающий код удаляет всё одной транзакцией."""
+    # Счётчики коллекций уменьшаются до удаления связей, пока их ещё можно посчитать
+    removed_items = select(func.count()) \
+        .where(CollectionItem.collection_id == Collection.id, CollectionItem.book_id.in_(book_ids)) \
+        .scalar_subquery()
+    db.execute(
+        update(Collection)
+        .where(Collection.id.in_(select(CollectionItem.collection_id).where(CollectionItem.book_id.in_(book_ids))))
+        .values(book_count=Collection.book_count - removed_items)
+        .execution_options(synchronize_session=False)
+    )
+    counts = {
+        "collection_items": _delete_where(db, CollectionItem, CollectionItem.book_id.in_(book_ids)),
+        "reviews": _delete_where(db, models.Review, models.Review.book_id.in_(book_ids)),
+        "transactions": _delete_where(db, models.Transaction, models.Transaction.book_id.in_(book_ids)),
+    }
+    _delete_where(db, models.BookRating, models.BookRating.book_id.in_(book_ids))
+    search.unindex_books(db, book_ids)
+    counts["books"] = _delete_where(db, models.Book, models.Book.id.in_(book_ids))
+    return counts
+
+
 def delete_book(db: Session, book_id: int):
-    db_book = get_book(db, book_id)
-    if db_book:
-        db.delete(db_book)
-        db.commit()
-    return db_book
+    """Удаление книги; возвращает число удалённых строк по таблицам или None, если книги нет"""
+    exists = db.query(models.Book.id).filter(models.Book.id == book_id).scalar()
+    if exists is None:
+        return None
+    counts = _delete_books(db, [book_id])
+    db.commit()
+    cache.invalidate("books", "collections")
+    return counts
 
 # Users
 def create_user(db: Session, user: dict):
@@ -89,37 +243,131 @@ def update_user(db: Session, user_id: int, user: dict):
         if hasattr(db_user, key):
             setattr(db_user, key, value)
     db.commit()
+    # Имя или роль могли измениться — следующий запрос перечитает пользователя из БД
+    principal_cache.invalidate(user_id)
+    # Имя владельца отдаётся вместе с книгами
+    cache.invalidate("users")
     db.refresh(db_user)
     return db_user
 
 
 def delete_user(db: Session, user_id: int):
-    db_user = get_user(db, user_id)
-    if not db_user:
-        return False
-
-    # Удаляем все книги пользователя
-    books = db.query(models.Book).filter(models.Book.user_id == user_id).all()
-    for book in books:
-        db.delete(book)
-
-    # Удаляем все коллекции пользователя
-    collections = db.query(models.Collection).filter(models.Collection.user_id == user_id).all()
-    for col in collections:
-        db.delete(col)
-
-    # Удаляем все транзакции, где пользователь был отправителем или получателем
-    transactions = db.query(models.Transaction).filter(
-        (models.Transaction.from_user_id == user_id) | (models.Transaction.to_user_id == user_id)
-    ).all()
-    for t in transactions:
-        db.delete(t)
+    """Удаление пользователя со всеми его данными несколькими DELETE ... WHERE в одной транзакции.
+    Возвращает число удалённых строк по таблицам или None, если пользователя нет."""
+    exists = db.query(models.User.id).filter(models.User.id == user_id).scalar()
+    if exists is None:
+        return None
 
-    db.delete(db_user)
+    user_books = select(models.Book.id).where(models.Book.user_id == user_id)
+    user_collections = select(models.Collection.id).where(models.Collection.user_id == user_id)
+    # Оценки пользователя уходят из агрегатов чужих книг — запоминаем их до удаления отзывов
+    rated_books = list(db.execute(
+        select(models.Review.book_id.distinct()).where(models.Review.user_id == user_id)
+    ).scalars())
+
+    counts = {
+        "collection_items": _delete_where(db, CollectionItem, CollectionItem.collection_id.in_(user_collections)),
+        "reviews": _delete_where(db, models.Review, models.Review.user_id == user_id),
+        "transactions": _delete_where(db, models.Transaction, or_(
+            models.Transaction.from_user_id == user_id,
+            models.Transaction.to_user_id == user_id
+        )),
+        "collections": _delete_where(db, models.Collection, models.Collection.user_id == user_id),
+    }
+    # Книги пользователя — вместе с чужими отзывами, обменами и включениями в чужие коллекции
+    for table, count in _delete_books(db, user_books).items():
+        counts[table] = counts.get(table, 0) + count
+    recount_ratings(db, rated_books)
+
+    _delete_where(db, models.User, models.User.id == user_id)
     db.commit()
-    return True
+    principal_cache.invalidate(user_id)
+    cache.invalidate("users", "books", "collections", "ratings")
+    return counts
 
 # Reviews
+RATING_RANGE = range(1, 11)
+
+
+def _dialect_insert(db: Session):
+    """insert() с ON CONFLICT для Postgres и SQLite, иначе None"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    return None
+
+
+def _apply_rating(db: Session, book_id: int, rating: int, sign: int):
+    """Добавляет (sign=1) или вычитает (sign=-1) одну оценку из агрегатов книги — без чтения отзывов.
+    Неявные оценки (0) из импорта в агрегаты не входят."""
+    if rating not in RATING_RANGE:
+        return
+    bucket = f"r{rating}"
+    count = models.BookRating.count + sign
+    total = models.BookRating.sum + sign * rating
+    values = {
+        "count": count,
+        "sum": total,
+        "avg": case((count > 0, cast(total, Float) / count), else_=None),
+        bucket: getattr(models.BookRating, bucket) + sign,
+    }
+    dialect_insert = _dialect_insert(db)
+    if sign > 0 and dialect_insert is not None:
+        db.execute(
+            dialect_insert(models.BookRating)
+            .values(book_id=book_id, count=1, sum=rating, avg=float(rating), **{bucket: 1})
+            .on_conflict_do_update(index_elements=[models.BookRating.book_id], set_=values)
+        )
+        return
+    updated = db.execute(update(models.BookRating).where(models.BookRating.book_id == book_id).values(values))
+    if sign > 0 and not updated.rowcount:
+        db.execute(insert(models.BookRating).values(book_id=book_id, count=1, sum=rating, avg=float(rating),
+                                                    **{bucket: 1}))
+
+
+def recount_ratings(db: Session, book_ids: list = None):
+    """Пересчёт агрегатов по таблице reviews: для всех книг (после импорта) или только для book_ids.
+    Без commit, если передан book_ids — вызывается внутри удаления."""
+    reviews = models.Review
+    rated = reviews.rating.between(RATING_RANGE.start, RATING_RANGE.stop - 1)
+    if book_ids is None:
+        db.execute(delete(models.BookRating))
+        db.execute(insert(models.BookRating).from_select(
+            ["book_id", "count", "sum", "avg", *(f"r{rating}" for rating in RATING_RANGE)],
+            select(
+                reviews.book_id, func.count(), func.sum(reviews.rating), func.avg(cast(reviews.rating, Float)),
+                *(func.sum(case((reviews.rating == rating, 1), else_=0)) for rating in RATING_RANGE)
+            ).where(rated).group_by(reviews.book_id)
+        ))
+        db.commit()
+        # Средние оценки входят в ответы /books (sort=rating, min_rating)
+        cache.invalidate("ratings", "books")
+        return db.query(func.count(models.BookRating.book_id)).scalar()
+
+    if not book_ids:
+        return 0
+
+    def aggregate(expression, *conditions):
+        return select(expression) \
+            .where(reviews.book_id == models.BookRating.book_id, rated, *conditions) \
+            .scalar_subquery()
+
+    result = db.execute(
+        update(models.BookRating)
+        .where(models.BookRating.book_id.in_(book_ids))
+        .values({
+            "count": aggregate(func.count()),
+            "sum": aggregate(func.coalesce(func.sum(reviews.rating), 0)),
+            "avg": aggregate(func.avg(cast(reviews.rating, Float))),
+            **{f"r{rating}": aggregate(func.count(), reviews.rating == rating) for rating in RATING_RANGE},
+        })
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
 def create_review(db: Session, review: dict):
     required_fields = {"rating", "text", "user_id", "book_id"}
     if not all(field in review for field in required_fields):
@@ -128,7 +376,10 @@ def create_review(db: Session, review: dict):
     try:
         db_review = models.Review(**review)
         db.add(db_review)
+        db.flush()
+        _apply_rating(db, db_review.book_id, db_review.rating, 1)
         db.commit()
+        cache.invalidate("ratings")
         db.refresh(db_review)
         return db_review
     except IntegrityError as e:
@@ -140,6 +391,28 @@ def get_reviews(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Review).offset(skip).limit(limit).all()
 
 
+def _reviews_page(db: Session, condition, relation, skip: int = 0, limit: int = 100, before_id: int = None):
+    # Новые первыми; before_id — keyset-пагинация по индексам (book_id, id) / (user_id, id)
+    query = db.query(models.Review).options(*_loader_options(joinedload(relation))).filter(condition)
+    if before_id is not None:
+        query = query.filter(models.Review.id < before_id)
+    return query.order_by(models.Review.id.desc()).offset(skip).limit(limit).all()
+
+
+def get_book_reviews(db: Session, book_id: int, skip: int = 0, limit: int = 100, before_id: int = None):
+    """Отзывы о книге вместе с авторами"""
+    return _reviews_page(db, models.Review.book_id == book_id, models.Review.user, skip, limit, before_id)
+
+
+def get_user_reviews(db: Session, user_id: int, skip: int = 0, limit: int = 100, before_id: int = None):
+    """Отзывы пользователя вместе с книгами"""
+    return _reviews_page(db, models.Review.user_id == user_id, models.Review.book, skip, limit, before_id)
+
+
+def get_book_rating(db: Session, book_id: int):
+    return db.query(models.BookRating).filter(models.BookRating.book_id == book_id).first()
+
+
 def get_review(db: Session, review_id: int):
     return db.query(models.Review).filter(models.Review.id == review_id).first()
 
@@ -149,10 +422,15 @@ def update_review(db: Session, review_id: int, review: dict):
     if not db_review:
         return None
 
+    previous = (db_review.book_id, db_review.rating)
     for key, value in review.items():
         if hasattr(db_review, key):
             setattr(db_review, key, value)
+    if (db_review.book_id, db_review.rating) != previous:
+        _apply_rating(db, previous[0], previous[1], -1)
+        _apply_rating(db, db_review.book_id, db_review.rating, 1)
     db.commit()
+    cache.invalidate("ratings")
     db.refresh(db_review)
     return db_review
 
@@ -162,11 +440,54 @@ def delete_review(db: Session, review_id: int):
     if not db_review:
         return False
 
+    _apply_rating(db, db_review.book_id, db_review.rating, -1)
     db.delete(db_review)
     db.commit()
+    cache.invalidate("ratings")
     return True
 
 # Collections
+def _unique_ids(book_ids):
+    return list(dict.fromkeys(int(book_id) for book_id in book_ids))
+
+
+def _insert_collection_items(db: Session, collection_id: int, book_ids: list):
+    """Один INSERT ... SELECT ... ON CONFLICT DO NOTHING: уже добавленные и несуществующие книги пропускаются.
+    Возвращает число добавленных строк."""
+    if not book_ids:
+        return 0
+    rows = select(literal(collection_id), models.Book.id).where(models.Book.id.in_(book_ids))
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        stmt = dialect_insert(CollectionItem).from_select(["collection_id", "book_id"], rows) \
+            .on_conflict_do_nothing()
+    else:
+        existing = select(CollectionItem.book_id).where(CollectionItem.collection_id == collection_id)
+        stmt = insert(CollectionItem).from_select(
+            ["collection_id", "book_id"], rows.where(models.Book.id.not_in(existing))
+        )
+    return db.execute(stmt).rowcount
+
+
+def _bump_book_count(db: Session, collection_id: int, delta: int, touch: bool = False):
+    # Атомарно в БД, без чтения текущего значения; UPDATE заодно обновляет updated_at.
+    # touch — состав изменился без изменения числа книг (замена одной книги другой)
+    if delta or touch:
+        db.execute(
+            update(Collection)
+            .where(Collection.id == collection_id)
+            .values(book_count=Collection.book_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _collection_book_ids(db: Session, collection_id: int, book_ids: list = None):
+    query = select(CollectionItem.book_id).where(CollectionItem.collection_id == collection_id)
+    if book_ids is not None:
+        query = query.where(CollectionItem.book_id.in_(book_ids))
+    return set(db.execute(query).scalars())
+
+
 def create_collection(db: Session, collection_data: dict):
     """Создание новой коллекции с книгами"""
     collection = Collection(
@@ -174,24 +495,21 @@ def create_collection(db: Session, collection_data: dict):
         user_id=collection_data["user_id"]
     )
     db.add(collection)
-    db.commit()
-    db.refresh(collection)
+    db.flush()
 
     if "book_ids" in collection_data:
-        for book_id in collection_data["book_ids"]:
-            item = CollectionItem(
-                collection_id=collection.id,
-                book_id=book_id
-            )
-            db.add(item)
-        db.commit()
+        added = _insert_collection_items(db, collection.id, _unique_ids(collection_data["book_ids"]))
+        _bump_book_count(db, collection.id, added)
 
+    db.commit()
+    cache.invalidate("collections")
     return collection
 
 
 def get_collections(db: Session, skip: int = 0, limit: int = 100, user_id: int = None):
     """Получение списка коллекций"""
-    query = db.query(Collection)
+    # book_count хранится в самой коллекции — items не нужны
+    query = db.query(Collection).options(*_loader_options())
 
     if user_id:
         query = query.filter(Collection.user_id == user_id)
@@ -199,6 +517,52 @@ def get_collections(db: Session, skip: int = 0, limit: int = 100, user_id: int =
     return query.offset(skip).limit(limit).all()
 
 
+def recount_collections(db: Session):
+    """Починка счётчиков: одним UPDATE только для коллекций, где book_count разошёлся с collection_items"""
+    actual = select(func.count()) \
+        .where(CollectionItem.collection_id == Collection.id) \
+        .scalar_subquery()
+    result = db.execute(
+        update(Collection)
+        .where(Collection.book_count != actual)
+        .values(book_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    cache.invalidate("collections")
+    return result.rowcount
+
+
+def stream_collections(db: Session, batch_size: int = 5000):
+    """Все коллекции для экспорта"""
+    return _stream(db, select(
+        Collection.id, Collection.title, Collection.user_id, Collection.book_count
+    ).order_by(Collection.id), batch_size)
+
+
+def get_collection(db: Session, collection_id: int):
+    """Только строка коллекции (с кэшем book_count), без книг"""
+    return db.query(Collection).filter(Collection.id == collection_id).first()
+
+
+def get_collection_books(db: Session, collection_id: int, limit: int = 100, sort: str = "id", after: tuple = None):
+    """Страница книг коллекции: только (id, title, author, updated_at), keyset-пагинация по id или (title, id)"""
+    query = db.query(models.Book.id, models.Book.title, models.Book.author, models.Book.updated_at) \
+        .join(CollectionItem, CollectionItem.book_id == models.Book.id) \
+        .filter(CollectionItem.collection_id == collection_id)
+    if sort == "title":
+        if after is not None:
+            query = query.filter(tuple_(models.Book.title, models.Book.id) > tuple_(*after))
+        order = (models.Book.title, models.Book.id)
+    elif sort == "id":
+        if after is not None:
+            query = query.filter(models.Book.id > after[0])
+        order = (models.Book.id,)
+    else:
+        raise ValueError(f"Unsupported sort field: {sort}")
+    return query.order_by(*order).limit(limit).all()
+
+
 def get_collection_with_items(db: Session, collection_id: int):
     """Получение коллекции с книгами"""
     return db.query(Collection) \
@@ -209,31 +573,35 @@ def get_collection_with_items(db: Session, collection_id: int):
 
 
 def update_collection(db: Session, collection_id: int, update_data: dict):
-    """Обновление коллекции"""
+    """Обновление коллекции; список книг применяется как разница с текущим составом.
+    Возвращает (коллекция, {"added", "removed", "unchanged"}) или (None, None)."""
     collection = db.query(Collection).filter(Collection.id == collection_id).first()
     if not collection:
-        return None
+        return None, None
 
     if "title" in update_data:
         collection.title = update_data["title"]
 
+    changes = {"added": 0, "removed": 0, "unchanged": 0}
     if "book_ids" in update_data:
-        # Удаляем старые связи
-        db.query(CollectionItem) \
-            .filter(CollectionItem.collection_id == collection_id) \
-            .delete()
-
-        # Добавляем новые
-        for book_id in update_data["book_ids"]:
-            item = CollectionItem(
-                collection_id=collection.id,
-                book_id=book_id
-            )
-            db.add(item)
+        book_ids = _unique_ids(update_data["book_ids"])
+        current = _collection_book_ids(db, collection_id)
+        removed = current.difference(book_ids)
+        if removed:
+            changes["removed"] = _delete_where(db, CollectionItem, and_(
+                CollectionItem.collection_id == collection_id,
+                CollectionItem.book_id.in_(removed)
+            ))
+        changes["unchanged"] = len(current) - len(removed)
+        changes["added"] = _insert_collection_items(
+            db, collection_id, [book_id for book_id in book_ids if book_id not in current]
+        )
+        _bump_book_count(db, collection_id, changes["added"] - changes["removed"],
+                         touch=bool(changes["added"] or changes["removed"]))
 
     db.commit()
-    db.refresh(collection)
-    return collection
+    cache.invalidate("collections")
+    return collection, changes
 
 
 def delete_collection(db: Session, collection_id: int):
@@ -242,50 +610,43 @@ def delete_collection(db: Session, collection_id: int):
     if not collection:
         return False
 
-    db.delete(collection)
+    _delete_where(db, CollectionItem, CollectionItem.collection_id == collection_id)
+    _delete_where(db, Collection, Collection.id == collection_id)
     db.commit()
+    cache.invalidate("collections")
     return True
 
 
 def add_books_to_collection(db: Session, collection_id: int, book_ids: list[int]):
-    """Добавление книг в коллекцию"""
+    """Добавление книг в коллекцию.
+    Возвращает (коллекция, {"added", "removed", "unchanged"}) или (None, None)."""
     collection = db.query(Collection).filter(Collection.id == collection_id).first()
     if not collection:
-        return None
+        return None, None
 
-    for book_id in book_ids:
-        # Проверяем, нет ли уже такой связи
-        exists = db.query(CollectionItem) \
-            .filter(and_(
-            CollectionItem.collection_id == collection_id,
-            CollectionItem.book_id == book_id
-        )) \
-            .first()
-        if not exists:
-            item = CollectionItem(
-                collection_id=collection_id,
-                book_id=book_id
-            )
-            db.add(item)
+    book_ids = _unique_ids(book_ids)
+    unchanged = len(_collection_book_ids(db, collection_id, book_ids)) if book_ids else 0
+    added = _insert_collection_items(db, collection_id, book_ids)
+    _bump_book_count(db, collection_id, added)
 
     db.commit()
-    db.refresh(collection)
-    return collection
+    cache.invalidate("collections")
+    return collection, {"added": added, "removed": 0, "unchanged": unchanged}
 
 
 def remove_book_from_collection(db: Session, collection_id: int, book_id: int):
     """Удаление книги из коллекции"""
-    item = db.query(CollectionItem) \
-        .filter(and_(
+    removed = _delete_where(db, CollectionItem, and_(
         CollectionItem.collection_id == collection_id,
         CollectionItem.book_id == book_id
-    )) \
-        .first()
-    if not item:
+    ))
+    if not removed:
+        db.rollback()
         return False
 
-    db.delete(item)
+    _bump_book_count(db, collection_id, -removed)
     db.commit()
+    cache.invalidate("collections")
     return True
 
 # Transactions
@@ -336,9 +697,15 @@ def get_transactions(
         status: str = None,
         user_id: int = None,
         book_id: int = None,
-        exclude_status: str = None
+        exclude_status: str = None,
+        after: tuple = None
 ):
-    query = db.query(models.Transaction)
+    # Роуты отдают названия книги и имена участников — все связи many-to-one, один JOIN
+    query = db.query(models.Transaction).options(*_loader_options(
+        joinedload(models.Transaction.book),
+        joinedload(models.Transaction.from_user),
+        joinedload(models.Transaction.to_user)
+    ))
 
     if status:
         # Поддержка списка статусов через запятую
@@ -360,12 +727,37 @@ def get_transactions(
         )
     if book_id:
         query = query.filter(models.Transaction.book_id == book_id)
+    if after is not None:
+        # Keyset-пагинация по (date, id) — использует индекс ix_transactions_date_id
+        after_date, after_id = after
+        query = query.filter(tuple_(models.Transaction.date, models.Transaction.id) < tuple_(after_date, after_id))
 
-    return query.order_by(models.Transaction.date.desc()) \
+    return query.order_by(models.Transaction.date.desc(), models.Transaction.id.desc()) \
         .offset(skip).limit(limit) \
         .all()
 
 
+def stream_transactions(db: Session, batch_size: int = 5000):
+    """Все обмены для экспорта: плоские строки с названием книги и именами участников"""
+    from_user = aliased(models.User)
+    to_user = aliased(models.User)
+    return _stream(db, select(
+        models.Transaction.id,
+        models.Transaction.date,
+        models.Transaction.from_user_id,
+        from_user.username.label("from_user_name"),
+        models.Transaction.to_user_id,
+        to_user.username.label("to_user_name"),
+        models.Transaction.book_id,
+        models.Book.title.label("book_title"),
+        models.Transaction.place,
+        models.Transaction.status,
+    ).outerjoin(from_user, from_user.id == models.Transaction.from_user_id)
+        .outerjoin(to_user, to_user.id == models.Transaction.to_user_id)
+        .outerjoin(models.Book, models.Book.id == models.Transaction.book_id)
+        .order_by(models.Transaction.id), batch_size)
+
+
 def get_transaction(db: Session, transaction_id: int):
     return db.query(models.Transaction) \
         .options(
@@ -0,0 +1,210 @@
+"""Потоковый импорт дампа Book-Crossing (BX-Users, BX-Books, BX-Book-Ratings).
+
+Файлы читаются построчно, записи вставляются батчами; позиция каждого источника
+сохраняется в import_checkpoints в той же транзакции, что и батч, поэтому
+прерванный импорт продолжается с места остановки.
+"""
+import csv
+import html
+import io
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+
+from src.database.models import Book, ImportCheckpoint, Review, User
+
+IMPORT_OWNER = "bookcrossing"
+USERNAME_PREFIX = "bx_"
+DEFAULT_CATEGORY = "Book-Crossing"
+
+
+def read_records(path: str, delimiter: str = ";", encoding: str = "latin-1"):
+    """Записи файла по одной; битые строки CSV отдаются как None, чтобы не сбивать позицию"""
+    with open(path, encoding=encoding, newline="") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        reader = csv.reader(f, delimiter=delimiter, strict=False)
+        header = next(reader, None)
+        if header is None:
+            return
+        for row in reader:
+            yield dict(zip(header, row)) if len(row) == len(header) else None
+
+
+def _batches(records, start: int, batch_size: int):
+    """Пропускает уже загруженные записи и режет поток на батчи: (позиция после батча, записи)"""
+    position = 0
+    batch = []
+    for record in records:
+        position += 1
+        if position <= start:
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield position, batch
+            batch = []
+    if batch:
+        yield position, batch
+
+
+def _parse_int(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_year(value):
+    year = _parse_int(value)
+    if year is None or not 0 < year <= datetime.now().year:
+        return None
+    return year
+
+
+class BookCrossingImporter:
+    def __init__(self, engine: Engine, batch_size: int = 5000, delimiter: str = ";",
+                 encoding: str = "latin-1", include_implicit: bool = False, progress=None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.include_implicit = include_implicit
+        self.progress = progress or (lambda source, position, inserted, rate: None)
+        # Отображения внешних ключей дампа на id в нашей БД
+        self.user_ids = {}
+        self.book_ids = {}
+        self.owner_id = None
+        self._password = None
+        self._load_id_maps()
+
+    def _load_id_maps(self):
+        with self.engine.begin() as conn:
+            for user_id, username in conn.execute(
+                    select(User.id, User.username).where(User.username.like(f"{USERNAME_PREFIX}%"))):
+                bx_id = _parse_int(username[len(USERNAME_PREFIX):])
+                if bx_id is not None:
+                    self.user_ids[bx_id] = user_id
+            self.book_ids = dict(conn.execute(select(Book.isbn, Book.id).where(Book.isbn.isnot(None))).all())
+            self.owner_id = conn.execute(select(User.id).where(User.username == IMPORT_OWNER)).scalar()
+            if self.owner_id is None:
+                self.owner_id = conn.execute(
+                    insert(User).values(username=IMPORT_OWNER, password=self._unusable_password(), role="user")
+                ).inserted_primary_key[0]
+
+    def _unusable_password(self):
+        # Один bcrypt-хэш случайного пароля на весь импорт: войти под импортированным пользователем нельзя
+        if self._password is None:
+            from src.auth_utils import hash_password
+            self._password = hash_password(secrets.token_urlsafe(32))
+        return self._password
+
+    def _run(self, kind: str, path: str, insert_batch):
+        source = f"{kind}:{os.path.basename(path)}"
+        with self.engine.begin() as conn:
+            start = conn.execute(
+                select(ImportCheckpoint.position).where(ImportCheckpoint.source == source)
+            ).scalar() or 0
+
+        records = read_records(path, delimiter=self.delimiter, encoding=self.encoding)
+        inserted = 0
+        started = time.perf_counter()
+        for position, batch in _batches(records, start, self.batch_size):
+            with self.engine.begin() as conn:
+                inserted += insert_batch(conn, [r for r in batch if r is not None])
+                self._save_checkpoint(conn, source, position)
+            self.progress(source, position, inserted, inserted / max(time.perf_counter() - started, 1e-9))
+        return inserted
+
+    @staticmethod
+    def _save_checkpoint(conn, source: str, position: int):
+        updated = conn.execute(
+            update(ImportCheckpoint).where(ImportCheckpoint.source == source).values(position=position)
+        )
+        if not updated.rowcount:
+            conn.execute(insert(ImportCheckpoint).values(source=source, position=position))
+
+    # Users
+    def import_users(self, path: str) -> int:
+        return self._run("users", path, self._insert_users)
+
+    def _insert_users(self, conn, records) -> int:
+        rows = {}
+        for record in records:
+            bx_id = _parse_int(record.get("User-ID"))
+            if bx_id is not None and bx_id not in self.user_ids:
+                rows[bx_id] = {"username": f"{USERNAME_PREFIX}{bx_id}", "password": self._unusable_password(),
+                               "role": "user"}
+        if not rows:
+            return 0
+        for user_id, username in conn.execute(insert(User).returning(User.id, User.username), list(rows.values())):
+            self.user_ids[int(username[len(USERNAME_PREFIX):])] = user_id
+        return len(rows)
+
+    # Books
+    def import_books(self, path: str) -> int:
+        return self._run("books", path, self._insert_books)
+
+    def _insert_books(self, conn, records) -> int:
+        rows = {}
+        for record in records:
+            isbn = (record.get("ISBN") or "").strip()
+            title = html.unescape(record.get("Book-Title") or "").strip()
+            if not isbn or not title or isbn in self.book_ids:
+                continue
+            rows[isbn] = {
+                "isbn": isbn,
+                "title": title,
+                "author": html.unescape(record.get("Book-Author") or "").strip() or "Неизвестен",
+                "category": DEFAULT_CATEGORY,
+                "user_id": self.owner_id,
+                "year": _parse_year(record.get("Year-Of-Publication")),
+            }
+        if not rows:
+            return 0
+        for book_id, isbn in conn.execute(insert(Book).returning(Book.id, Book.isbn), list(rows.values())):
+            self.book_ids[isbn] = book_id
+        return len(rows)
+
+    # Ratings
+    def import_ratings(self, path: str) -> int:
+        return self._run("ratings", path, self._insert_ratings)
+
+    def _insert_ratings(self, conn, records) -> int:
+        now = datetime.utcnow()
+        rows = []
+        for record in records:
+            rating = _parse_int(record.get("Book-Rating"))
+            user_id = self.user_ids.get(_parse_int(record.get("User-ID")))
+            book_id = self.book_ids.get((record.get("ISBN") or "").strip())
+            if rating is None or user_id is None or book_id is None:
+                continue
+            if rating == 0 and not self.include_implicit:
+                continue
+            rows.append({"rating": rating, "text": "", "user_id": user_id, "book_id": book_id, "date": now})
+        if not rows:
+            return 0
+        if conn.dialect.name == "postgresql":
+            self._copy_reviews(conn, rows)
+        else:
+            conn.execute(insert(Review), rows)
+        return len(rows)
+
+    @staticmethod
+    def _copy_reviews(conn, rows):
+        # COPY в рамках той же транзакции, что и чекпоинт
+        buffer = io.StringIO()
+        # QUOTE_NONNUMERIC: пустой text должен прийти как '', а не как NULL
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        for row in rows:
+            writer.writerow([row["rating"], row["text"], row["user_id"], row["book_id"], row["date"].isoformat()])
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert("COPY reviews (rating, text, user_id, book_id, date) FROM STDIN WITH (FORMAT csv)", buffer)
@@ -0,0 +1,146 @@
+"""Индексы горячих запросов: онлайн-миграция на существующей БД и проверка планов через EXPLAIN."""
+import json
+
+from sqlalchemy import and_, event, func, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from src.database import crud
+from src.database.database import Base
+
+
+def declared_indexes(dialect_name: str):
+    for table in Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            ddl_if = getattr(index, "_ddl_if", None)
+            if ddl_if is not None and ddl_if.dialect not in (None, dialect_name):
+                continue
+            yield index
+
+
+def _create_index_sql(index, dialect):
+    # CONCURRENTLY включается только на время компиляции: create_all работает в транзакции и с ним несовместим
+    options = index.dialect_options["postgresql"]
+    previous = options["concurrently"]
+    options["concurrently"] = dialect.name == "postgresql"
+    try:
+        return str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    finally:
+        options["concurrently"] = previous
+
+
+def duplicate_keys(conn, index, limit: int = 20):
+    """Значения, которые встречаются больше одного раза и не дадут построить уникальный индекс"""
+    columns = list(index.columns)
+    query = select(*columns, func.count()).where(and_(*(column.isnot(None) for column in columns))) \
+        .group_by(*columns).having(func.count() > 1).order_by(func.count().desc()).limit(limit)
+    return conn.execute(query).all()
+
+
+def migrate_indexes(engine: Engine, echo=print):
+    """Создаёт недостающие индексы; на Postgres — CREATE INDEX CONCURRENTLY без блокировки записи.
+    Возвращает список имён индексов, которые построить не удалось."""
+    failed = []
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        for index in declared_indexes(engine.dialect.name):
+            existing = {i["name"] for i in inspector.get_indexes(index.table.name)} \
+                if index.table.name in tables else set()
+            if engine.dialect.name == "postgresql":
+                # Прерванная сборка CONCURRENTLY оставляет невалидный индекс — пересобираем его
+                invalid = conn.execute(text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ), {"name": index.name}).scalar()
+                if invalid:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    existing.discard(index.name)
+            if index.unique and index.name not in existing:
+                # Например, users.username: прежний seed-db добавлял user1…user3 при каждом запуске
+                duplicates = duplicate_keys(conn, index)
+                if duplicates:
+                    failed.append(index.name)
+                    values = ", ".join(f"{'/'.join(map(str, row[:-1]))} ({row[-1]})" for row in duplicates)
+                    columns = ", ".join(column.name for column in index.columns)
+                    echo(f"{index.name}: в {index.table.name}.{columns} есть повторы: {values} — "
+                         f"объедините или переименуйте эти строки и запустите снова")
+                    continue
+            try:
+                conn.execute(text(_create_index_sql(index, engine.dialect)))
+                echo(f"{index.name}: ok")
+            except Exception as e:
+                failed.append(index.name)
+                echo(f"{index.name}: ошибка — {e}")
+    return failed
+
+
+def _hot_queries():
+    """Запросы crud с фильтрами по горячим колонкам"""
+    return [
+        ("get_books(category)", lambda db: crud.get_books(db, category="Классика")),
+        ("get_books(author)", lambda db: crud.get_books(db, author="Лев Толстой")),
+        ("get_books(user_id)", lambda db: crud.get_books(db, user_id=1)),
+        ("get_user_by_name", lambda db: crud.get_user_by_name(db, "admin")),
+        ("get_transactions(status)", lambda db: crud.get_transactions(db, status="pending")),
+        ("get_transactions(user_id)", lambda db: crud.get_transactions(db, user_id=1)),
+        ("get_transactions(book_id)", lambda db: crud.get_transactions(db, book_id=1)),
+        ("get_collections(user_id)", lambda db: crud.get_collections(db, user_id=1)),
+        ("get_book_reviews", lambda db: crud.get_book_reviews(db, 1, before_id=100)),
+        ("get_user_reviews", lambda db: crud.get_user_reviews(db, 1, before_id=100)),
+        ("get_book_rating", lambda db: crud.get_book_rating(db, 1)),
+        ("get_books(min_rating, sort=-rating)", lambda db: crud.get_books(db, min_rating=9, sort="-rating")),
+    ]
+
+
+def _captured_selects(db: Session, run):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        run(db)
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def _plan(db: Session, statement, parameters):
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        # На маленьких таблицах планировщик и так выберет seq scan; запрещаем его, чтобы увидеть,
+        # есть ли вообще подходящий индекс
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        plan = rows if isinstance(rows, list) else json.loads(rows)
+        nodes = []
+        stack = [plan[0]["Plan"]]
+        while stack:
+            node = stack.pop()
+            nodes.append(f'{node["Node Type"]} {node.get("Relation Name", "")}'.strip())
+            stack.extend(node.get("Plans", []))
+        return nodes, not any(node.startswith("Seq Scan") for node in nodes)
+
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    details = [row[-1] for row in rows]
+    # SEARCH — поиск по индексу; SCAN — полный проход по таблице (или по всему индексу)
+    return details, not any(d.startswith("SCAN") for d in details)
+
+
+def check_query_plans(db: Session):
+    """[(имя запроса, план, использует ли индексы)] для каждого SELECT горячих crud-запросов"""
+    results = []
+    try:
+        for name, run in _hot_queries():
+            for statement, parameters in _captured_selects(db, run):
+                plan, uses_index = _plan(db, statement, parameters)
+                results.append((name, plan, uses_index))
+    finally:
+        db.rollback()
+    return results
@@ -1,28 +1,52 @@
-from sqlalchemy import Integer, String, Column, ForeignKey, Enum, DateTime, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Integer, String, Text, Float, Column, ForeignKey, Enum, DateTime, Index, DDL, event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
+from datetime import datetime
 from src.database.database import Base
 
 
 class Book(Base):
     __tablename__ = "books"
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
-    author = Column(String, nullable=False)
-    category = Column(String, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False, index=True)
+    author = Column(String, nullable=False, index=True)
+    category = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     year = Column(Integer)
+    # Естественный ключ книг из внешних каталогов (Book-Crossing)
+    isbn = Column(String, unique=True, index=True)
+    # Полнотекстовый индекс по названию и автору (Postgres); заполняется в src.database.search
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql")))
+    # Для ETag/Last-Modified; время UTC на стороне приложения — у CURRENT_TIMESTAMP SQLite точность в секунду
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now(),
+                        nullable=False)
 
     # relationships
     user = relationship("User", back_populates="books")
     reviews = relationship("Review", back_populates="book")
     collection_items = relationship("CollectionItem", back_populates="book")
     transactions = relationship("Transaction", back_populates="book")
+    rating = relationship("BookRating", uselist=False, viewonly=True)
+
+    __table_args__ = (
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+
+# В SQLite вместо tsvector используется отдельная FTS5-таблица (rowid = books.id)
+event.listen(
+    Book.__table__,
+    "after_create",
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(title, author, tokenize='unicode61')")
+    .execute_if(dialect="sqlite")
+)
+event.listen(Book.__table__, "before_drop", DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite"))
 
 
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, nullable=False)
+    username = Column(String, nullable=False, unique=True, index=True)
     password = Column(String(255), nullable=False)
     role = Column(Enum("admin", "moderator", "user", name="user_roles"), default="user")
 
@@ -55,11 +79,42 @@ class Review(Base):
     user = relationship("User", back_populates="reviews")
     book = relationship("Book", back_populates="reviews")
 
+    __table_args__ = (
+        # Отзывы книги и пользователя, новые первыми, с keyset-пагинацией по id
+        Index("ix_reviews_book_id_id", book_id, id),
+        Index("ix_reviews_user_id_id", user_id, id),
+    )
+
+
+class BookRating(Base):
+    """Агрегаты оценок книги (1–10): crud обновляет их инкрементально вместе с отзывами"""
+    __tablename__ = "book_ratings"
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Integer, nullable=False, default=0)
+    avg = Column(Float, index=True)
+    # Гистограмма: r1 … r10 — число оценок с этим значением
+    r1 = Column(Integer, nullable=False, default=0)
+    r2 = Column(Integer, nullable=False, default=0)
+    r3 = Column(Integer, nullable=False, default=0)
+    r4 = Column(Integer, nullable=False, default=0)
+    r5 = Column(Integer, nullable=False, default=0)
+    r6 = Column(Integer, nullable=False, default=0)
+    r7 = Column(Integer, nullable=False, default=0)
+    r8 = Column(Integer, nullable=False, default=0)
+    r9 = Column(Integer, nullable=False, default=0)
+    r10 = Column(Integer, nullable=False, default=0)
+
+    @property
+    def histogram(self):
+        # Ключи — строки, как в JSON: int-ключи json и orjson сортируют по-разному (2 < 10, но "10" < "2")
+        return {str(rating): getattr(self, f"r{rating}") for rating in range(1, 11)}
+
 
 class CollectionItem(Base):
     __tablename__ = "collection_items"
     collection_id = Column(Integer, ForeignKey("collections.id"), primary_key=True)
-    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True, index=True)
 
     # relationships
     collection = relationship("Collection", back_populates="items")
@@ -70,7 +125,12 @@ class Collection(Base):
     __tablename__ = "collections"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Кэш числа книг: поддерживается в crud, чинится командой recount-collections
+    book_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Обновляется и при изменении состава (через UPDATE book_count)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now(),
+                        nullable=False)
     # relationships
     user = relationship("User", back_populates="collections")
     items = relationship("CollectionItem", back_populates="collection")
@@ -80,17 +140,34 @@ class Transaction(Base):
     __tablename__ = "transactions"
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime, default=func.now(), nullable=False)
-    from_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    from_user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     to_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
     place = Column(String, nullable=False)
     status = Column(
         Enum("completed", "pending", "canceled", "in_progress", "accepted", "rejected", name="transaction_status"),
         default="pending",
         nullable=False
     )
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now(),
+                        nullable=False)
 
     # Relationships
     from_user = relationship("User", foreign_keys=[from_user_id], back_populates="sent_transactions")
     to_user = relationship("User", foreign_keys=[to_user_id], back_populates="received_transactions")
-    book = relationship("Book", back_populates="transactions")
\ No newline at end of file
+    book = relationship("Book", back_populates="transactions")
+
+    __table_args__ = (
+        # Для сортировки и keyset-пагинации ленты обменов по (date, id)
+        Index("ix_transactions_date_id", date.desc(), id.desc()),
+        # Фильтр по статусу с сортировкой по дате; to_user_id — входящие обмены пользователя
+        Index("ix_transactions_status_date", status, date.desc()),
+        Index("ix_transactions_to_user_id_status", to_user_id, status),
+    )
+
+
+class ImportCheckpoint(Base):
+    """Сколько записей источника уже загружено — обновляется в одной транзакции с батчем"""
+    __tablename__ = "import_checkpoints"
+    source = Column(String, primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
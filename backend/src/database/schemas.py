@@ -19,11 +19,17 @@ def validate_collections(data):
             raise ValueError(f"Field '{field}' is required")
     return data
 
+def is_rating(value):
+    # bool — подкласс int: JSON true не должен превращаться в оценку 1
+    return isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= 10
+
 def validate_reviews(data):
     required_fields = ["rating", "text", "user_id", "book_id"]
     for field in required_fields:
         if field not in data or not data[field]:
             raise ValueError(f"Field '{field}' is required")
+    if not is_rating(data["rating"]):
+        raise ValueError("Rating must be an integer from 1 to 10")
     return data
 
 def validate_transactions(data):
@@ -0,0 +1,112 @@
+"""Полнотекстовый поиск книг по названию и автору.
+
+Postgres: колонка books.search_vector (tsvector, GIN-индекс) в конфигурациях russian и english,
+ранжирование ts_rank_cd. SQLite (локально и в тестах): FTS5-таблица books_fts, ранжирование bm25.
+"""
+import re
+
+from sqlalchemy import column, delete, func, select, table, text, update
+from sqlalchemy.orm import Session, joinedload
+
+from src.database import models
+
+SEARCH_CONFIGS = ("russian", "english")
+_WORD = re.compile(r"\w+", re.UNICODE)
+_books_fts = table("books_fts", column("rowid"))
+
+
+def _is_postgres(db: Session):
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _search_vector():
+    """Название весит больше автора; каждое поле разбирается обеими конфигурациями"""
+    parts = []
+    for column, weight in ((models.Book.title, "A"), (models.Book.author, "B")):
+        for config in SEARCH_CONFIGS:
+            parts.append(func.setweight(func.to_tsvector(config, func.coalesce(column, "")), weight))
+    vector = parts[0]
+    for part in parts[1:]:
+        vector = vector.op("||")(part)
+    return vector
+
+
+def _search_query(q: str):
+    query = func.websearch_to_tsquery(SEARCH_CONFIGS[0], q)
+    for config in SEARCH_CONFIGS[1:]:
+        query = query.op("||")(func.websearch_to_tsquery(config, q))
+    return query
+
+
+def _fts5_query(q: str):
+    # Каждое слово в кавычках — пользовательский ввод не разбирается как синтаксис FTS5
+    return " ".join(f'"{word}"' for word in _WORD.findall(q))
+
+
+def index_book(db: Session, book: models.Book):
+    """Обновить поисковый индекс одной книги; вызывается до commit в create_book/update_book"""
+    if _is_postgres(db):
+        db.execute(update(models.Book).where(models.Book.id == book.id).values(search_vector=_search_vector()))
+    elif db.get_bind().dialect.name == "sqlite":
+        db.execute(text("DELETE FROM books_fts WHERE rowid = :id"), {"id": book.id})
+        db.execute(text("INSERT INTO books_fts (rowid, title, author) VALUES (:id, :title, :author)"),
+                   {"id": book.id, "title": book.title, "author": book.author})
+
+
+def unindex_books(db: Session, book_ids):
+    """Убрать книги из индекса; book_ids — список или подзапрос с id (в Postgres индекс живёт в самой строке)"""
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(delete(_books_fts).where(_books_fts.c.rowid.in_(book_ids)))
+
+
+def reindex_books(db: Session, batch_size: int = 10000):
+    """Полная перестройка индекса; возвращает число проиндексированных книг"""
+    if _is_postgres(db):
+        total = 0
+        last_id = 0
+        while True:
+            ids = db.execute(
+                select(models.Book.id).where(models.Book.id > last_id).order_by(models.Book.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            db.execute(update(models.Book).where(models.Book.id.between(ids[0], ids[-1]))
+                       .values(search_vector=_search_vector()))
+            db.commit()
+            total += len(ids)
+            last_id = ids[-1]
+        return total
+    db.execute(text("DELETE FROM books_fts"))
+    result = db.execute(text("INSERT INTO books_fts (rowid, title, author) SELECT id, title, author FROM books"))
+    db.commit()
+    return result.rowcount
+
+
+def search_books(db: Session, q: str, skip: int = 0, limit: int = 20):
+    """Книги по релевантности: (список книг, общее число совпадений)"""
+    if _is_postgres(db):
+        query = _search_query(q)
+        rank = func.ts_rank_cd(models.Book.search_vector, query)
+        matches = models.Book.search_vector.op("@@")(query)
+        total = db.query(func.count(models.Book.id)).filter(matches).scalar()
+        books = db.query(models.Book) \
+            .options(joinedload(models.Book.user)) \
+            .filter(matches) \
+            .order_by(rank.desc(), models.Book.id) \
+            .offset(skip).limit(limit) \
+            .all()
+        return books, total
+
+    match = _fts5_query(q)
+    if not match:
+        return [], 0
+    params = {"q": match, "skip": skip, "limit": limit}
+    total = db.execute(text("SELECT count(*) FROM books_fts WHERE books_fts MATCH :q"), params).scalar()
+    ids = db.execute(text(
+        "SELECT rowid FROM books_fts WHERE books_fts MATCH :q ORDER BY bm25(books_fts, 10.0, 1.0), rowid LIMIT :limit OFFSET :skip"
+    ), params).scalars().all()
+    by_id = {
+        book.id: book
+        for book in db.query(models.Book).options(joinedload(models.Book.user)).filter(models.Book.id.in_(ids))
+    }
+    return [by_id[book_id] for book_id in ids if book_id in by_id], total
@@ -0,0 +1,97 @@
+"""Синтетические данные заданного объёма: пользователи, книги, отзывы, обмены и коллекции.
+
+Нужны тестам бюджета запросов (tests/conftest.py) и бенчмаркам. Данные детерминированы seed-ом,
+вставляются батчами через insert() без ORM; производные данные — агрегаты оценок, счётчики коллекций
+и поисковый индекс — пересчитываются теми же функциями, что чинят их после импорта.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import models, search
+from src.database.crud import recount_collections, recount_ratings
+
+CATEGORIES = ["Классика", "Фантастика", "Детектив", "Роман", "Фэнтези"]
+PLACES = ["Библиотека", "Кафе", "Университет", "Офис", "Парк"]
+STATUSES = ["completed", "pending", "canceled", "in_progress", "accepted", "rejected"]
+BATCH = 10000
+START = datetime(2024, 1, 1)
+
+
+def _batches(engine: Engine, model, rows):
+    batch = []
+    with engine.begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH:
+                conn.execute(insert(model), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(model), batch)
+
+
+def _reset_sequences(engine: Engine):
+    # id заданы явно — в Postgres последовательности нужно догнать, иначе следующий INSERT упрётся в дубликат
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for table in ("users", "books", "reviews", "transactions", "collections"):
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                              f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"))
+
+
+def generate(engine: Engine, books: int, users: int = None, reviews: int = None, transactions: int = None,
+             collections: int = None, collection_size: int = 5, seed: int = 0):
+    """Заполнить пустую схему. По умолчанию на пользователя ~20 книг, на книгу — 2 отзыва и 1 обмен,
+    на пользователя — коллекция. Пользователь 1 — admin. Возвращает число строк по таблицам"""
+    rng = random.Random(seed)
+    users = users if users is not None else max(2, books // 20)
+    reviews = reviews if reviews is not None else books * 2
+    transactions = transactions if transactions is not None else books
+    collections = collections if collections is not None else users
+
+    _batches(engine, models.User, (
+        {"id": i, "username": f"user{i}", "password": "x", "role": "admin" if i == 1 else "user"}
+        for i in range(1, users + 1)
+    ))
+    _batches(engine, models.Book, (
+        {"id": i, "title": f"Книга {i}", "author": f"Автор {i % 1000}", "category": CATEGORIES[i % len(CATEGORIES)],
+         "user_id": rng.randint(1, users), "year": 1800 + i % 220, "updated_at": START + timedelta(minutes=i)}
+        for i in range(1, books + 1)
+    ))
+    _batches(engine, models.Review, (
+        {"id": i, "rating": rng.randint(1, 10), "text": f"Отзыв {i}", "user_id": rng.randint(1, users),
+         "book_id": rng.randint(1, books), "date": START + timedelta(minutes=i)}
+        for i in range(1, reviews + 1)
+    ))
+    _batches(engine, models.Transaction, (
+        {"id": i, "from_user_id": rng.randint(1, users), "to_user_id": rng.randint(1, users),
+         "book_id": rng.randint(1, books), "place": rng.choice(PLACES), "status": rng.choice(STATUSES),
+         "date": START + timedelta(minutes=i), "updated_at": START + timedelta(minutes=i)}
+        for i in range(1, transactions + 1)
+    ))
+    _batches(engine, models.Collection, (
+        {"id": i, "title": f"Коллекция {i}", "user_id": rng.randint(1, users), "book_count": 0,
+         "updated_at": START + timedelta(minutes=i)}
+        for i in range(1, collections + 1)
+    ))
+    size = min(collection_size, books)
+    _batches(engine, models.CollectionItem, (
+        {"collection_id": i, "book_id": book_id}
+        for i in range(1, collections + 1) for book_id in rng.sample(range(1, books + 1), size)
+    ))
+
+    _reset_sequences(engine)
+
+    db = sessionmaker(bind=engine)()
+    try:
+        recount_ratings(db)
+        recount_collections(db)
+        search.reindex_books(db)
+    finally:
+        db.close()
+    return {"users": users, "books": books, "reviews": reviews, "transactions": transactions,
+            "collections": collections, "collection_items": collections * size}
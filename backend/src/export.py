@@ -0,0 +1,59 @@
+"""Потоковая выгрузка таблиц для админки: ?format=ndjson|csv&stream=1.
+
+Строки читаются из БД партиями через серверный курсор и сразу пишутся в ответ,
+поэтому память не зависит от размера таблицы.
+"""
+import csv
+import io
+
+from flask import Response, current_app, request, stream_with_context
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Строк на один кусок ответа: меньше — больше накладных расходов на yield, больше — больше память
+CHUNK_ROWS = 1000
+
+
+def export_requested() -> bool:
+    return request.args.get("stream") == "1" or request.args.get("format") in EXPORT_FORMATS
+
+
+def export_format() -> str:
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return fmt
+
+
+def _ndjson(rows, plan):
+    dumps = current_app.json.dumps
+    one = plan.one
+    for chunk in rows.partitions(CHUNK_ROWS):
+        yield "".join([dumps(one(row)) + "\n" for row in chunk])
+
+
+def _csv(rows, plan):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(plan.fields)
+    one = plan.one
+    for chunk in rows.partitions(CHUNK_ROWS):
+        writer.writerows([one(row).values() for row in chunk])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Пустая таблица — только заголовок
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(rows, plan, name: str, fmt: str):
+    """Ответ-генератор; rows — результат crud.stream_*, plan — план полей serializers"""
+    generate = _ndjson if fmt == "ndjson" else _csv
+    return Response(
+        stream_with_context(generate(rows, plan)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"},
+    )
@@ -3,6 +3,8 @@ from src.routes.reviews import reviews_routes
 from src.routes.users import users_routes
 from src.routes.transactions import transactions_routes
 from src.routes.collections import collections_routes
+from src.routes.system import system_routes
+from src.routes.recommendations import recommendations_routes
 
 def init_routes(app):
     books_routes(app)
@@ -10,3 +12,5 @@ def init_routes(app):
     reviews_routes(app)
     transactions_routes(app)
     collections_routes(app)
+    system_routes(app)
+    recommendations_routes(app)
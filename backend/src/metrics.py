@@ -0,0 +1,197 @@
+"""Метрики запросов и SQL в текстовом формате Prometheus (GET /metrics).
+
+Каждый поток пишет только в свой шард, без блокировок; /metrics копирует шарды и складывает их.
+Копия словаря или списка под GIL атомарна, поэтому запись и чтение друг другу не мешают,
+а счётчики лишь монотонно растут. Шарды завершившихся потоков (dev-сервер заводит поток на запрос)
+при чтении сливаются в общий и удаляются. Значения — на процесс: под gunicorn каждый воркер
+отдаёт свои.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Границы корзин гистограмм: длительность запроса в секундах и число SQL-запросов на HTTP-запрос
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Метка маршрута для запросов, не попавших ни в одно правило: сырой путь раздул бы число рядов
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Shard:
+    """Счётчики одного потока. Гистограмма — [по корзинам..., +Inf, сумма]"""
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.in_flight = 0
+        self.requests = {}   # (метод, маршрут, статус) → число
+        self.latency = {}    # (метод, маршрут) → гистограмма длительности
+        self.queries = {}    # (метод, маршрут) → гистограмма числа SQL-запросов
+        self.db_time = {}    # (метод, маршрут) → секунд в БД
+        # SQL текущего HTTP-запроса; сбрасываются в начале запроса
+        self.request_queries = 0
+        self.request_db_time = 0.0
+
+    def merge(self, other: "Shard"):
+        self.in_flight += other.in_flight
+        for mine, theirs in ((self.requests, other.requests), (self.db_time, other.db_time)):
+            for key, value in theirs.copy().items():
+                mine[key] = mine.get(key, 0) + value
+        for mine, theirs in ((self.latency, other.latency), (self.queries, other.queries)):
+            for key, histogram in theirs.copy().items():
+                histogram = list(histogram)
+                current = mine.get(key)
+                mine[key] = histogram if current is None else [a + b for a, b in zip(current, histogram)]
+
+
+def _observe(histograms: dict, key, buckets, value):
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = [0] * (len(buckets) + 2)
+    histogram[bisect_left(buckets, value)] += 1
+    histogram[-1] += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # только для списка шардов: регистрация потока и чтение
+        self._shards = []
+        self._retired = Shard()
+
+    def shard(self) -> Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def start_request(self):
+        shard = self.shard()
+        shard.in_flight += 1
+        shard.request_queries = 0
+        shard.request_db_time = 0.0
+        return shard
+
+    def finish_request(self, shard: Shard, method: str, route: str, status: int, duration: float):
+        shard.in_flight -= 1
+        key = (method, route, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        key = (method, route)
+        _observe(shard.latency, key, LATENCY_BUCKETS, duration)
+        _observe(shard.queries, key, QUERY_BUCKETS, shard.request_queries)
+        shard.db_time[key] = shard.db_time.get(key, 0.0) + shard.request_db_time
+
+    def record_query(self, duration: float):
+        shard = self.shard()
+        shard.request_queries += 1
+        shard.request_db_time += duration
+
+    def collect(self) -> Shard:
+        """Сумма по всем потокам"""
+        with self._lock:
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    self._retired.merge(shard)
+            self._shards = alive
+            total = Shard()
+            total.merge(self._retired)
+            for shard in alive:
+                total.merge(shard)
+        return total
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.__init__(shard.thread)
+            self._retired = Shard()
+
+    def render(self) -> str:
+        total = self.collect()
+        lines = []
+        _counter(lines, "http_requests_total", "HTTP requests by route and status",
+                 {("method", "route", "status"): total.requests})
+        _histogram(lines, "http_request_duration_seconds", "HTTP request latency", LATENCY_BUCKETS, total.latency)
+        lines += ["# HELP http_requests_in_flight HTTP requests being served",
+                  "# TYPE http_requests_in_flight gauge",
+                  f"http_requests_in_flight {total.in_flight}"]
+        _counter(lines, "db_query_seconds_total", "Time spent in SQL queries by route",
+                 {("method", "route"): total.db_time})
+        _counter(lines, "db_queries_total", "SQL queries by route",
+                 {("method", "route"): {key: histogram[-1] for key, histogram in total.queries.items()}})
+        _histogram(lines, "http_request_db_queries", "SQL queries per HTTP request", QUERY_BUCKETS, total.queries)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _counter(lines, name, help_text, series):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for names, values in series.items():
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+
+
+def _histogram(lines, name, help_text, buckets, histograms):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    names = ("method", "route")
+    for key, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip((*buckets, "+Inf"), histogram):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(names, key, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(names, key)} {_number(histogram[-1])}")
+        lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+
+
+registry = MetricsRegistry()
+
+
+def init_metrics(app):
+    """Хуки замера запросов; SQL считают слушатели движка в database.py"""
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics = (registry.start_request(), time.perf_counter())
+
+    @app.after_request
+    def record_request_metrics(response):
+        _finish(response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exception=None):
+        # after_request не вызывается, если исключение пробросилось наружу (PROPAGATE_EXCEPTIONS)
+        _finish(500)
+
+
+def _finish(status: int):
+    state = g.pop("metrics", None)
+    if state is None:
+        return
+    shard, started = state
+    route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+    registry.finish_request(shard, request.method, route, status, time.perf_counter() - started)
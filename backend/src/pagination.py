@@ -0,0 +1,58 @@
+import base64
+import json
+from datetime import datetime
+
+
+def parse_limit(value, maximum: int = None) -> int:
+    """Размер страницы из ?limit=: целое не меньше 1, сверху ограничено maximum.
+    Keyset-страницы запрашивают limit + 1 строку и берут последнюю — 0 и отрицательные недопустимы"""
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum) if maximum is not None else limit
+
+
+# Курсоры для keyset-пагинации: непрозрачная для клиента base64-строка со значениями
+# ключа сортировки последней отданной строки.
+def encode_cursor(*values) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Курсор по id: [id]"""
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise ValueError("Invalid cursor")
+    return values[0]
+
+
+def decode_date_id_cursor(cursor: str) -> tuple:
+    """Курсор по (date, id): [iso-дата, id]"""
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+        raise ValueError("Invalid cursor")
+    try:
+        return datetime.fromisoformat(values[0]), values[1]
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def decode_title_id_cursor(cursor: str) -> tuple:
+    """Курсор по (title, id): [название, id]"""
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+        raise ValueError("Invalid cursor")
+    return values[0], values[1]
@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src import auth_utils
+
+# bcrypt считается в отдельных процессах, чтобы не держать поток воркера и GIL.
+# PASSWORD_POOL_SIZE=0 — считать в текущем потоке (тесты, отладка).
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", min(4, os.cpu_count() or 1)))
+# Сколько задач может ждать сверх занятых процессов, прежде чем отвечать 503
+PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", 16))
+PASSWORD_RETRY_AFTER = int(os.getenv("PASSWORD_RETRY_AFTER", 1))
+PASSWORD_CAPACITY = max(1, PASSWORD_POOL_SIZE) + PASSWORD_QUEUE_SIZE
+
+
+class PasswordPoolBusy(Exception):
+    def __init__(self, retry_after: int = PASSWORD_RETRY_AFTER):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordPoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= PASSWORD_CAPACITY:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "workers": PASSWORD_POOL_SIZE,
+                "capacity": PASSWORD_CAPACITY,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - max(1, PASSWORD_POOL_SIZE)),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "latency_avg_ms": round(self.latency_total * 1000 / self.completed, 3) if self.completed else 0.0,
+                "latency_max_ms": round(self.latency_max * 1000, 3),
+            }
+
+
+stats = PasswordPoolStats()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # Пул создаётся лениво и заново после fork, чтобы воркеры сервера не делили процессы.
+    # Воркер gthread многопоточный: fork из него унёс бы в дочерний процесс блокировки, захваченные
+    # другими потоками (logging, пул SQLAlchemy, шарды метрик). forkserver запускает процессы пула
+    # из чистого однопоточного процесса — им нужен только bcrypt
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_POOL_SIZE,
+                                            mp_context=multiprocessing.get_context("forkserver"))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(fn, *args):
+    if not stats.acquire():
+        raise PasswordPoolBusy()
+    started = time.perf_counter()
+    try:
+        if PASSWORD_POOL_SIZE <= 0:
+            return fn(*args)
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        stats.release(time.perf_counter() - started)
+
+
+def hash_password(password: str) -> str:
+    return _run(auth_utils.hash_password, password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _run(auth_utils.verify_password, plain_password, hashed_password)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,86 @@
+"""Кэш пользователей для auth_required.
+
+Записи — на процесс, но сверяются с общей для всех воркеров версией "users" (src.cache.versions):
+update_user/delete_user в любом воркере увеличивают её, и остальные перечитывают пользователя
+из БД на следующем же запросе — разжалованный admin или удалённый пользователь не ждут TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from src import cache
+
+# Минимальные данные пользователя, которые нужны авторизации
+Principal = namedtuple("Principal", ["id", "username", "role"])
+
+# TTL ограничивает задержку отзыва прав, если инвалидация прошла мимо crud (например, правка в БД руками)
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+
+
+class PrincipalCache:
+    """Ограниченный LRU-кэш с TTL: user_id -> Principal"""
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL,
+                 versions: cache.EntityVersions = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.versions = versions or cache.versions
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version(self) -> int:
+        """Текущая версия "users"; читать до запроса пользователя из БД и передавать в set"""
+        return self.versions.get("users")[0]
+
+    def get(self, user_id: int):
+        version = self.version()
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is None or entry[1] < time.monotonic() or entry[2] != version:
+                if entry is not None:
+                    del self._items[user_id]
+                self.misses += 1
+                return None
+            self._items.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, principal: Principal, version: int = None):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        version = self.version() if version is None else version
+        with self._lock:
+            self._items[principal.id] = (principal, time.monotonic() + self.ttl, version)
+            self._items.move_to_end(principal.id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            if self._items.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
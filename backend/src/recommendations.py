@@ -0,0 +1,386 @@
+"""Рекомендации: «похожие книги» и «вам может понравиться» (item-item collaborative filtering).
+
+Матрица пользователь × книга (scipy CSR) строится по оценкам из reviews и завершённым обменам.
+Для каждой книги заранее считаются top-K соседей по косинусной близости. Индекс сохраняется
+в каталог RECS_DIR массивами .npy и открывается воркерами через mmap: страницы общие для всех
+процессов, а запрос к индексу — O(K) для похожих книг и O(K · книги пользователя) для рекомендаций.
+
+Версии индекса лежат в подкаталогах; файл CURRENT указывает на актуальную и подменяется атомарно,
+поэтому воркеры подхватывают пересобранный индекс без перезапуска.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database import models
+
+RECS_DIR = os.getenv("RECS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "recs"))
+RECS_TOP_K = int(os.getenv("RECS_TOP_K", 20))
+# Как часто воркер проверяет, не опубликована ли новая версия индекса
+RECS_RELOAD_INTERVAL = float(os.getenv("RECS_RELOAD_INTERVAL", 10))
+# Пользователи с тысячами книг (библиотеки, боты) дают плотные блоки в XᵀX и почти не несут сигнала:
+# в расчёт близости они не входят, но рекомендации получают
+MAX_USER_ITEMS = int(os.getenv("RECS_MAX_USER_ITEMS", 1000))
+# Книг в одном блоке произведения XᵀX — ограничивает память при сборке
+BLOCK_SIZE = 1024
+POPULAR_SIZE = 1000
+
+# Вес взаимодействия: явная оценка r → r/10, неявная (0) и завершённый обмен — фиксированные веса
+IMPLICIT_WEIGHT = 0.3
+EXCHANGE_WEIGHT = 0.8
+
+ARRAYS = ("book_ids", "neighbors", "scores", "user_ids", "user_indptr", "user_items", "user_weights", "popular")
+
+
+@dataclass
+class Interactions:
+    users: np.ndarray
+    books: np.ndarray
+    weights: np.ndarray
+    max_review_id: int = 0
+    transactions_updated_at: str = None
+
+    def __len__(self):
+        return len(self.users)
+
+
+def load_interactions(db: Session, after_review_id: int = 0, after_updated_at: str = None,
+                      batch_size: int = 100000) -> Interactions:
+    """Взаимодействия из БД; after_* — водяные знаки прошлой сборки для инкрементального обновления"""
+    users, books, weights = [], [], []
+    max_review_id = after_review_id
+
+    reviews = select(models.Review.id, models.Review.user_id, models.Review.book_id, models.Review.rating) \
+        .where(models.Review.id > after_review_id)
+    for part in db.execute(reviews.execution_options(yield_per=batch_size)).partitions():
+        rows = np.array(part, dtype=np.int64)
+        users.append(rows[:, 1])
+        books.append(rows[:, 2])
+        ratings = rows[:, 3].astype(np.float32)
+        weights.append(np.where(ratings > 0, ratings / 10, IMPLICIT_WEIGHT).astype(np.float32))
+        max_review_id = max(max_review_id, int(rows[:, 0].max()))
+
+    # Статус обмена меняется после создания — водяной знак по updated_at, а не по id
+    exchanges = select(models.Transaction.to_user_id, models.Transaction.book_id, models.Transaction.updated_at) \
+        .where(models.Transaction.status == "completed")
+    if after_updated_at:
+        exchanges = exchanges.where(models.Transaction.updated_at > datetime.fromisoformat(after_updated_at))
+    updated_at = after_updated_at
+    for part in db.execute(exchanges.execution_options(yield_per=batch_size)).partitions():
+        users.append(np.array([row[0] for row in part], dtype=np.int64))
+        books.append(np.array([row[1] for row in part], dtype=np.int64))
+        weights.append(np.full(len(part), EXCHANGE_WEIGHT, dtype=np.float32))
+        latest = max(row[2] for row in part).isoformat()
+        updated_at = max(updated_at, latest) if updated_at else latest
+
+    if not users:
+        empty = np.empty(0, dtype=np.int64)
+        return Interactions(empty, empty, np.empty(0, dtype=np.float32), max_review_id, updated_at)
+    return Interactions(np.concatenate(users), np.concatenate(books), np.concatenate(weights),
+                        max_review_id, updated_at)
+
+
+def _matrix(interactions: Interactions, user_ids: np.ndarray, book_ids: np.ndarray):
+    rows = np.searchsorted(user_ids, interactions.users)
+    cols = np.searchsorted(book_ids, interactions.books)
+    matrix = sparse.csr_matrix((interactions.weights, (rows, cols)),
+                               shape=(len(user_ids), len(book_ids)), dtype=np.float32)
+    # Повторные взаимодействия (оценка + обмен) складываются — вес не больше 1
+    np.minimum(matrix.data, 1.0, out=matrix.data)
+    return matrix
+
+
+def _normalized_columns(matrix):
+    """Матрица без «тяжёлых» пользователей, столбцы нормированы: XᵀX даёт косинусную близость"""
+    light = (np.diff(matrix.indptr) <= MAX_USER_ITEMS).astype(np.float32)
+    matrix = sparse.diags(light) @ matrix
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return (matrix @ sparse.diags(inverse.astype(np.float32))).tocsr()
+
+
+def _similarity_rows(normalized, items):
+    """(книга, индексы соседей, близости) для каждой книги items — полные строки XᵀX блоками"""
+    transposed = normalized.T.tocsr()
+    for start in range(0, len(items), BLOCK_SIZE):
+        block = items[start:start + BLOCK_SIZE]
+        similarities = (transposed[block] @ normalized).tocsr()
+        for row, item in enumerate(block):
+            lo, hi = similarities.indptr[row], similarities.indptr[row + 1]
+            cols, values = similarities.indices[lo:hi], similarities.data[lo:hi]
+            not_self = cols != item
+            yield item, cols[not_self], values[not_self]
+
+
+def _best(values, keys, size):
+    """Позиции size наибольших values по убыванию; при равенстве — меньший key (детерминированно)"""
+    if len(values) > size:
+        threshold = np.partition(values, len(values) - size)[len(values) - size]
+        positions = np.nonzero(values >= threshold)[0]
+    else:
+        positions = np.arange(len(values))
+    return positions[np.lexsort((keys[positions], -values[positions]))][:size]
+
+
+def select_top_k(cols, values, top_k):
+    """top_k соседей строки близостей по убыванию"""
+    best = _best(values, cols, top_k)
+    return cols[best], values[best]
+
+
+def _popular(matrix):
+    counts = np.diff(matrix.tocsc().indptr)
+    return _best(counts, np.arange(len(counts)), POPULAR_SIZE).astype(np.int32)
+
+
+def _user_arrays(matrix):
+    return {
+        "user_indptr": matrix.indptr.astype(np.int64),
+        "user_items": matrix.indices.astype(np.int32),
+        "user_weights": matrix.data.astype(np.float32),
+    }
+
+
+def build_index(interactions: Interactions, top_k: int = RECS_TOP_K):
+    """Полная сборка: (массивы индекса, метаданные)"""
+    user_ids = np.unique(interactions.users)
+    book_ids = np.unique(interactions.books)
+    matrix = _matrix(interactions, user_ids, book_ids)
+
+    neighbors = np.full((len(book_ids), top_k), -1, dtype=np.int32)
+    scores = np.zeros((len(book_ids), top_k), dtype=np.float32)
+    for item, cols, values in _similarity_rows(_normalized_columns(matrix), np.arange(len(book_ids))):
+        cols, values = select_top_k(cols, values, top_k)
+        neighbors[item, :len(cols)] = cols
+        scores[item, :len(values)] = values
+
+    arrays = {"book_ids": book_ids, "neighbors": neighbors, "scores": scores, "user_ids": user_ids,
+              "popular": _popular(matrix), **_user_arrays(matrix)}
+    return arrays, _meta(interactions, interactions, arrays, top_k, "full")
+
+
+def update_index(index, interactions: Interactions):
+    """Инкрементальное обновление по новым взаимодействиям: пересчитываются строки затронутых книг,
+    а сами книги добавляются в списки соседей тех книг, для которых стали ближе K-го соседа.
+    Удалённые отзывы и «выпадение» соседей из чужих списков учитывает только полная пересборка."""
+    top_k = index.neighbors.shape[1]
+    user_ids = np.union1d(index.user_ids, interactions.users)
+    book_ids = np.union1d(index.book_ids, interactions.books)
+    user_map = np.searchsorted(user_ids, index.user_ids)
+    book_map = np.searchsorted(book_ids, index.book_ids)
+
+    # Старая матрица в новых координатах + новые взаимодействия
+    counts = np.diff(index.user_indptr)
+    previous = Interactions(
+        users=np.repeat(index.user_ids, counts),
+        books=index.book_ids[np.asarray(index.user_items)],
+        weights=np.asarray(index.user_weights),
+    )
+    matrix = _matrix(previous, user_ids, book_ids) + _matrix(interactions, user_ids, book_ids)
+    np.minimum(matrix.data, 1.0, out=matrix.data)
+
+    neighbors = np.full((len(book_ids), top_k), -1, dtype=np.int32)
+    scores = np.zeros((len(book_ids), top_k), dtype=np.float32)
+    old_neighbors = np.asarray(index.neighbors)
+    neighbors[book_map] = np.where(old_neighbors >= 0, book_map[np.maximum(old_neighbors, 0)], -1)
+    scores[book_map] = index.scores
+
+    affected = np.unique(np.searchsorted(book_ids, interactions.books))
+    for item, cols, values in _similarity_rows(_normalized_columns(matrix), affected):
+        top_cols, top_values = select_top_k(cols, values, top_k)
+        neighbors[item] = -1
+        scores[item] = 0
+        neighbors[item, :len(top_cols)] = top_cols
+        scores[item, :len(top_values)] = top_values
+        # Близость симметрична: item мог войти в top-K соседей книг cols или поменять там оценку
+        listed = (neighbors[cols] == item).any(axis=1)
+        candidates = np.nonzero(listed | (values > scores[cols, -1]))[0]
+        for position in candidates:
+            merge_neighbor(neighbors, scores, cols[position], item, values[position])
+
+    arrays = {"book_ids": book_ids, "neighbors": neighbors, "scores": scores, "user_ids": user_ids,
+              "popular": _popular(matrix), **_user_arrays(matrix)}
+    return arrays, _meta(index.meta, interactions, arrays, top_k, "incremental")
+
+
+def merge_neighbor(neighbors, scores, book, neighbor, score):
+    """Вставить или обновить соседа в отсортированной строке top-K книги book"""
+    row_neighbors, row_scores = neighbors[book], scores[book]
+    present = np.nonzero(row_neighbors == neighbor)[0]
+    slot = present[0] if len(present) else len(row_scores) - 1
+    row_neighbors[slot], row_scores[slot] = neighbor, score
+    order = np.lexsort((row_neighbors, row_neighbors < 0, -row_scores))
+    neighbors[book], scores[book] = row_neighbors[order], row_scores[order]
+
+
+def _meta(previous, interactions, arrays, top_k, mode):
+    previous = previous if isinstance(previous, dict) else {}
+    updated_at = [value for value in (previous.get("transactions_updated_at"),
+                                      interactions.transactions_updated_at) if value]
+    return {
+        "mode": mode,
+        "built_at": datetime.utcnow().isoformat(),
+        "top_k": top_k,
+        "max_review_id": max(previous.get("max_review_id", 0), interactions.max_review_id),
+        "transactions_updated_at": max(updated_at) if updated_at else None,
+        "books": len(arrays["book_ids"]),
+        "users": len(arrays["user_ids"]),
+        "interactions": len(arrays["user_items"]),
+    }
+
+
+class NeighborIndex:
+    """Опубликованная версия индекса top-K соседей книг; массивы открыты через mmap"""
+    arrays = ("book_ids", "neighbors", "scores")
+
+    def __init__(self, path: str, mmap_mode: str = "r"):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        for name in self.arrays:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+
+    def _book_index(self, book_id: int):
+        position = int(np.searchsorted(self.book_ids, book_id))
+        if position < len(self.book_ids) and self.book_ids[position] == book_id:
+            return position
+        return None
+
+    def similar(self, book_id: int, limit: int = 10):
+        """[(id книги, близость)] по убыванию близости"""
+        item = self._book_index(book_id)
+        if item is None:
+            return []
+        neighbors = self.neighbors[item, :limit]
+        known = neighbors >= 0
+        return list(zip(self.book_ids[neighbors[known]].tolist(), self.scores[item, :limit][known].tolist()))
+
+
+
+class RecommendationIndex(NeighborIndex):
+    """Индекс коллаборативной фильтрации: соседи книг и взаимодействия пользователей"""
+    arrays = ARRAYS
+
+    def recommend(self, user_id: int, limit: int = 10):
+        """[(id книги, оценка)]: сумма близостей к книгам пользователя с весами его взаимодействий;
+        без истории — самые популярные книги"""
+        position = int(np.searchsorted(self.user_ids, user_id))
+        if position >= len(self.user_ids) or self.user_ids[position] != user_id:
+            items = np.empty(0, dtype=np.int32)
+        else:
+            lo, hi = self.user_indptr[position], self.user_indptr[position + 1]
+            items, weights = np.asarray(self.user_items[lo:hi]), np.asarray(self.user_weights[lo:hi])
+        if not len(items):
+            popular = np.asarray(self.popular[:limit])
+            return [(book_id, None) for book_id in self.book_ids[popular].tolist()]
+
+        neighbors = np.asarray(self.neighbors[items])
+        scores = np.asarray(self.scores[items]) * weights[:, None]
+        known = neighbors >= 0
+        candidates, inverse = np.unique(neighbors[known], return_inverse=True)
+        totals = np.bincount(inverse, weights=scores[known]).astype(np.float64)
+        totals[np.isin(candidates, items)] = -np.inf
+        size = min(limit, int(np.isfinite(totals).sum()))
+        if not size:
+            return []
+        best = _best(totals, candidates, size)
+        return list(zip(self.book_ids[candidates[best]].tolist(), totals[best].tolist()))
+
+
+def save_index(arrays, meta, directory: str = RECS_DIR):
+    """Пишет новую версию и атомарно переключает на неё CURRENT; старые версии, кроме предыдущей, удаляются"""
+    os.makedirs(directory, exist_ok=True)
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(directory, version)
+    os.makedirs(path)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    previous = _current_version(directory)
+    pointer = os.path.join(directory, "CURRENT")
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+    # Воркеры, ещё читающие предыдущую версию, продолжают работать; более старые не нужны
+    for name in os.listdir(directory):
+        if name not in (version, previous) and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return path
+
+
+def _current_version(directory: str):
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_index(directory: str = RECS_DIR, index_class=RecommendationIndex, mmap_mode: str = "r"):
+    version = _current_version(directory)
+    return index_class(os.path.join(directory, version), mmap_mode) if version else None
+
+
+def rebuild(db: Session, incremental: bool = False, top_k: int = RECS_TOP_K, directory: str = RECS_DIR):
+    """Сборка и публикация индекса; возвращает метаданные новой версии (или текущей, если нового нет)"""
+    index = load_index(directory) if incremental else None
+    if index is None:
+        arrays, meta = build_index(load_interactions(db), top_k)
+    else:
+        interactions = load_interactions(db, after_review_id=index.meta["max_review_id"],
+                                         after_updated_at=index.meta["transactions_updated_at"])
+        if not len(interactions):
+            return index.meta
+        arrays, meta = update_index(index, interactions)
+    save_index(arrays, meta, directory)
+    return meta
+
+
+class IndexHolder:
+    """Индекс текущего процесса; версия на диске перепроверяется не чаще RECS_RELOAD_INTERVAL"""
+
+    def __init__(self, directory: str = RECS_DIR, index_class=RecommendationIndex):
+        self.directory = directory
+        self.index_class = index_class
+        self._index = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._checked < RECS_RELOAD_INTERVAL:
+            return self._index
+        with self._lock:
+            if now - self._checked >= RECS_RELOAD_INTERVAL:
+                version = _current_version(self.directory)
+                if version is None:
+                    self._index = None
+                elif self._index is None or os.path.basename(self._index.path) != version:
+                    self._index = self.index_class(os.path.join(self.directory, version))
+                self._checked = now
+        return self._index
+
+    def reset(self):
+        with self._lock:
+            self._index = None
+            self._checked = 0.0
+
+
+index_holder = IndexHolder()
+
+
+def get_index():
+    return index_holder.get()
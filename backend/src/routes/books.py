@@ -1,43 +1,67 @@
 from flask import jsonify, request
-from src.database.crud import create_book, get_books, get_book, update_book, delete_book
+from src.database.crud import create_book, get_books, count_books, get_book, update_book, delete_book, stream_books
+from src.database.search import search_books
 from src.database.database import get_db
 from src.database import schemas
+from src.serializers import BOOK, BOOK_ADMIN
+from src.export import export_format, export_requested, stream_export
+from src.pagination import encode_cursor, decode_id_cursor, parse_limit
 from src.auth import auth_required
 from src.auth import role_required
+from src.cache import cached_response
+from src.conditional import conditional, last_modified_of, not_modified_response, rows_etag
+
+def _owner_names(books):
+    # Имя владельца входит в ответ, но не меняет updated_at книги
+    return [book.user.username if book.user else None for book in books]
+
 
 def books_routes(app):
     @app.route('/books', methods=['GET'])
     @auth_required
+    @cached_response("books", "users", "ratings")
     def get_books_route():
         try:
             db = get_db()
             category = request.args.get('category')
             author = request.args.get('author')
-            user_id = request.args.get('user_id')
-            exclude_user_id = request.args.get('exclude_user_id')
+            user_id = request.args.get('user_id', type=int)
+            exclude_user_id = request.args.get('exclude_user_id', type=int)
+            min_rating = request.args.get('min_rating', type=float)
+            sort = request.args.get('sort')
+            cursor = request.args.get('cursor')
             skip = int(request.args.get('skip', 0))
-            limit = int(request.args.get('limit', 12))
+            limit = parse_limit(request.args.get('limit', 12))
 
-            books_list = get_books(db, category=category, author=author, user_id=user_id)
-            if exclude_user_id:
-                books_list = [b for b in books_list if str(b.user_id) != str(exclude_user_id)]
-            total_count = len(books_list)
-            books = books_list[skip:skip + limit]
+            filters = dict(category=category, author=author, user_id=user_id, exclude_user_id=exclude_user_id,
+                           min_rating=min_rating)
+            if cursor is not None:
+                # Keyset-режим: пустой cursor — первая страница; лишняя строка показывает, есть ли следующая
+                after_id = decode_id_cursor(cursor) if cursor else 0
+                books = get_books(db, limit=limit + 1, sort=sort, after_id=after_id, **filters)
+                has_more = len(books) > limit
+                books = books[:limit]
+                etag = rows_etag(books, None, has_more, _owner_names(books))
+            else:
+                books = get_books(db, skip=skip, limit=limit, sort=sort, **filters)
+                total_count = count_books(db, **filters)
+                etag = rows_etag(books, total_count, _owner_names(books))
 
-            books_data = [{
-                'id': book.id,
-                'title': book.title,
-                'author': book.author,
-                'category': book.category,
-                'user_id': book.user_id,
-                'username': book.user.username if hasattr(book, 'user') and book.user else None,
-                'year': book.year if book.year is not None else ''
-            } for book in books]
+            not_modified = not_modified_response(etag)
+            if not_modified:
+                return not_modified
 
-            return jsonify({
+            books_data = BOOK.many(books)
+
+            if cursor is not None:
+                return conditional(jsonify({
+                    'books': books_data,
+                    'next_cursor': encode_cursor(books[-1].id) if has_more else None
+                }), etag)
+            return conditional(jsonify({
                 'books': books_data,
                 'total': total_count
-            })
+            }), etag)
 
         except ValueError as e:
             return jsonify({'error': 'Invalid parameters', 'details': str(e)}), 400
@@ -48,22 +72,45 @@ def books_routes(app):
             return jsonify({'error': str(e)}), 500
 
 
+    @app.route('/books/search', methods=['GET'])
+    @auth_required
+    def search_books_route():
+        try:
+            db = get_db()
+            q = (request.args.get('q') or '').strip()
+            if not q:
+                return jsonify({'error': 'Query parameter q is required'}), 400
+            skip = int(request.args.get('skip', 0))
+            if skip < 0:
+                raise ValueError("skip must not be negative")
+            limit = parse_limit(request.args.get('limit', 12))
+
+            books, total_count = search_books(db, q, skip=skip, limit=limit)
+            books_data = BOOK.many(books)
+
+            return jsonify({
+                'books': books_data,
+                'total': total_count
+            })
+        except ValueError as e:
+            return jsonify({'error': 'Invalid parameters', 'details': str(e)}), 400
+
     @app.route('/books/<int:book_id>', methods=['GET'])
     @auth_required
+    @cached_response("books", "users")
     def get_book_route(book_id):
         try:
             db = get_db()
             book = get_book(db, book_id)
-            book_data = {
-                'id': book.id,
-                'title': book.title,
-                'author': book.author,
-                'category': book.category,
-                'user_id': book.user_id,
-                'username': book.user.username if hasattr(book, 'user') and book.user else None,
-                'year': book.year if book.year is not None else ''
-            }
-            return jsonify(book_data)
+            if not book:
+                return jsonify({'error': 'Book not found'}), 404
+            etag = rows_etag([book], None, _owner_names([book]))
+            last_modified = last_modified_of(book.updated_at)
+            not_modified = not_modified_response(etag, last_modified)
+            if not_modified:
+                return not_modified
+
+            return conditional(jsonify(BOOK.one(book)), etag, last_modified)
         except ValueError as e:
             return jsonify({'error': str(e)}), 404
 
@@ -103,8 +150,8 @@ def books_routes(app):
     def delete_book_route(book_id):
         try:
             db = get_db()
-            delete_book(db, book_id)
-            return jsonify({'message': 'Book deleted'}), 200
+            deleted = delete_book(db, book_id)
+            return jsonify({'message': 'Book deleted', 'deleted': deleted}), 200
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
 
@@ -113,17 +160,21 @@ def books_routes(app):
     @role_required('admin')
     def admin_get_books():
         db = get_db()
+        if export_requested():
+            try:
+                fmt = export_format()
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return stream_export(stream_books(db), BOOK_ADMIN, "books", fmt)
         books = get_books(db)
-        return jsonify([
-            {"id": b.id, "title": b.title, "author": b.author, "category": b.category, "user_id": b.user_id, "year": b.year} for b in books
-        ])
+        return jsonify(BOOK_ADMIN.many(books))
 
     @app.route('/admin/books/<int:book_id>', methods=['DELETE'])
     @auth_required
     @role_required('admin')
     def admin_delete_book(book_id):
         db = get_db()
-        book = delete_book(db, book_id)
-        if not book:
+        deleted = delete_book(db, book_id)
+        if not deleted:
             return jsonify({"error": "Book not found"}), 404
-        return jsonify({"status": "deleted", "id": book_id})
+        return jsonify({"status": "deleted", "id": book_id, "deleted": deleted})
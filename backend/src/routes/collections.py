@@ -1,15 +1,25 @@
 from flask import request, jsonify
 from src.auth import auth_required, role_required
+from src.cache import cached_response
+from src.serializers import BOOK_REF, COLLECTION
+from src.export import export_format, export_requested, stream_export
+from src.conditional import conditional, last_modified_of, not_modified_response, rows_etag
 from src.database.crud import (
     create_collection,
     get_collections,
     delete_collection,
     add_books_to_collection,
     remove_book_from_collection,
-    get_collection_with_items,
+    get_collection,
+    get_collection_books,
     update_collection,
+    stream_collections,
 )
 from src.database.database import get_db
+from src.pagination import encode_cursor, decode_id_cursor, decode_title_id_cursor, parse_limit
+
+# Максимальный размер страницы книг коллекции
+MAX_COLLECTION_PAGE = 1000
 
 
 def collections_routes(app):
@@ -19,6 +29,7 @@ def collections_routes(app):
 
     @app.route('/collections', methods=['GET'])
     @auth_required
+    @cached_response("collections")
     def get_collections_route():
         try:
             db = get_db()
@@ -26,17 +37,12 @@ def collections_routes(app):
             skip = int(request.args.get('skip', 0))
             user_id = request.args.get('user_id', type=int)
             collections = get_collections(db, limit=limit, skip=skip, user_id=user_id)
+            etag = rows_etag(collections)
+            not_modified = not_modified_response(etag)
+            if not_modified:
+                return not_modified
 
-            collections_data = []
-            for collection in collections:
-                collections_data.append({
-                    "id": collection.id,
-                    "title": collection.title,
-                    "user_id": collection.user_id,
-                    "book_count": len(collection.items)
-                })
-
-            return jsonify(collections_data)
+            return conditional(jsonify(COLLECTION.many(collections)), etag)
         except Exception as e:
             return handle_exception(e)
 
@@ -70,28 +76,42 @@ def collections_routes(app):
 
     @app.route('/collections/<int:collection_id>', methods=['GET'])
     @auth_required
+    @cached_response("collections", "books")
     def get_collection_route(collection_id):
         try:
             db = get_db()
-            collection = get_collection_with_items(db, collection_id)
+            limit = parse_limit(request.args.get('limit', 100), MAX_COLLECTION_PAGE)
+            sort = request.args.get('sort', 'id')
+            cursor = request.args.get('cursor')
+            after = None
+            if cursor:
+                after = decode_title_id_cursor(cursor) if sort == 'title' else (decode_id_cursor(cursor),)
+
+            collection = get_collection(db, collection_id)
             if not collection:
                 return jsonify({"error": "Collection not found"}), 404
 
-            collection_data = {
-                "id": collection.id,
-                "title": collection.title,
-                "user_id": collection.user_id,
-                "books": [
-                    {
-                        "id": item.book.id,
-                        "title": item.book.title,
-                        "author": item.book.author
-                    }
-                    for item in collection.items
-                ]
-            }
-
-            return jsonify(collection_data)
+            books = get_collection_books(db, collection_id, limit=limit + 1, sort=sort, after=after)
+            has_more = len(books) > limit
+            books = books[:limit]
+            etag = rows_etag(books, None, has_more, collection.id, collection.updated_at)
+            last_modified = last_modified_of(collection.updated_at, *(book.updated_at for book in books))
+            not_modified = not_modified_response(etag, last_modified)
+            if not_modified:
+                return not_modified
+
+            next_cursor = None
+            if has_more:
+                last = books[-1]
+                next_cursor = encode_cursor(last.title, last.id) if sort == 'title' else encode_cursor(last.id)
+
+            collection_data = COLLECTION.one(collection)
+            collection_data["books"] = BOOK_REF.many(books)
+            collection_data["next_cursor"] = next_cursor
+
+            return conditional(jsonify(collection_data), etag, last_modified)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return handle_exception(e)
 
@@ -111,7 +131,7 @@ def collections_routes(app):
             if not update_data:
                 return jsonify({"error": "No fields to update"}), 400
 
-            collection = update_collection(db, collection_id, update_data)
+            collection, changes = update_collection(db, collection_id, update_data)
 
             if not collection:
                 return jsonify({"error": "Collection not found"}), 404
@@ -119,7 +139,8 @@ def collections_routes(app):
             return jsonify({
                 "id": collection.id,
                 "title": collection.title,
-                "status": "updated"
+                "status": "updated",
+                **changes
             })
         except Exception as e:
             return handle_exception(e)
@@ -146,7 +167,7 @@ def collections_routes(app):
             if "book_ids" not in data:
                 return jsonify({"error": "book_ids is required"}), 400
 
-            collection = add_books_to_collection(db, collection_id, data["book_ids"])
+            collection, changes = add_books_to_collection(db, collection_id, data["book_ids"])
 
             if not collection:
                 return jsonify({"error": "Collection not found"}), 404
@@ -154,7 +175,8 @@ def collections_routes(app):
             return jsonify({
                 "id": collection.id,
                 "title": collection.title,
-                "added_books": len(data["book_ids"])
+                "added_books": changes["added"],
+                **changes
             })
         except Exception as e:
             return handle_exception(e)
@@ -182,10 +204,14 @@ def collections_routes(app):
     @role_required('admin')
     def admin_get_collections():
         db = get_db()
+        if export_requested():
+            try:
+                fmt = export_format()
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return stream_export(stream_collections(db), COLLECTION, "collections", fmt)
         collections = get_collections(db)
-        return jsonify([
-            {"id": c.id, "title": c.title, "user_id": c.user_id, "book_count": len(c.items)} for c in collections
-        ])
+        return jsonify(COLLECTION.many(collections))
 
     @app.route('/admin/collections/<int:collection_id>', methods=['DELETE'])
     @auth_required
@@ -0,0 +1,71 @@
+from flask import request, jsonify
+from src.database.database import get_db
+from src.database.crud import get_books_by_ids
+from src.auth import auth_required
+from src.pagination import parse_limit
+from src.serializers import BOOK_REF
+
+# Максимальный размер выдачи рекомендаций
+MAX_RECOMMENDATIONS = 50
+# collaborative — по оценкам и обменам, content — по названию, автору и категории (работает и для новых книг)
+SIMILAR_MODES = ("collaborative", "content")
+
+
+def _recommended_books(pairs):
+    """[(id, оценка)] из индекса → книги с оценкой; одним запросом по первичному ключу"""
+    scores = dict(pairs)
+    books = get_books_by_ids(get_db(), list(scores))
+    return [{**BOOK_REF.one(book), "category": book.category, "score": scores[book.id]} for book in books]
+
+
+def _index(mode: str = "collaborative"):
+    # numpy/scipy импортируются при первом запросе рекомендаций, а не при старте приложения
+    if mode == "content":
+        from src.content_similarity import get_content_index
+        return get_content_index()
+    from src.recommendations import get_index
+    return get_index()
+
+
+def _limit():
+    """?limit= от 1 до MAX_RECOMMENDATIONS; None — неверное значение (срез [:-3] отдал бы хвост списка)"""
+    try:
+        return parse_limit(request.args.get('limit', 10), MAX_RECOMMENDATIONS)
+    except ValueError:
+        return None
+
+
+def _invalid_limit():
+    return jsonify({"error": f"limit must be an integer from 1 to {MAX_RECOMMENDATIONS}"}), 400
+
+
+def _not_built():
+    return jsonify({"error": "Recommendations index is not built, run: flask rebuild-recs"}), 503
+
+
+def recommendations_routes(app):
+    @app.route('/books/<int:book_id>/similar', methods=['GET'])
+    @auth_required
+    def get_similar_books_route(book_id):
+        limit = _limit()
+        if limit is None:
+            return _invalid_limit()
+        mode = request.args.get('mode', 'collaborative')
+        if mode not in SIMILAR_MODES:
+            return jsonify({"error": f"Unknown mode, expected one of: {', '.join(SIMILAR_MODES)}"}), 400
+        index = _index(mode)
+        if index is None:
+            return _not_built()
+        return jsonify({"book_id": book_id, "mode": mode,
+                        "similar": _recommended_books(index.similar(book_id, limit))})
+
+    @app.route('/users/<int:user_id>/recommendations', methods=['GET'])
+    @auth_required
+    def get_user_recommendations_route(user_id):
+        limit = _limit()
+        if limit is None:
+            return _invalid_limit()
+        index = _index()
+        if index is None:
+            return _not_built()
+        return jsonify({"user_id": user_id, "recommendations": _recommended_books(index.recommend(user_id, limit))})
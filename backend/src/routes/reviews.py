@@ -2,11 +2,127 @@ from flask import request, jsonify
 from src.database.database import get_db
 from src.database.crud import (
     create_review,
-    get_reviews,
-    get_review
+    get_review,
+    update_review,
+    delete_review,
+    get_book_reviews,
+    get_user_reviews,
+    get_book_rating,
 )
 from src.auth import auth_required
-from src.database.schemas import validate_reviews
+from src.database.schemas import is_rating, validate_reviews
+from src.pagination import encode_cursor, decode_id_cursor, parse_limit
+from src.serializers import BOOK_RATING, BOOK_REVIEW, REVIEW, USER_REVIEW
+
+# Максимальный размер страницы отзывов
+MAX_REVIEWS_PAGE = 100
+
+
+def _reviews_page(fetch, owner_id, plan):
+    """Страница отзывов: ?cursor= — keyset по id ({"reviews", "next_cursor"}), иначе skip/limit (список)"""
+    limit = parse_limit(request.args.get('limit', 20), MAX_REVIEWS_PAGE)
+    skip = int(request.args.get('skip', 0))
+    cursor = request.args.get('cursor')
+    db = get_db()
+    if cursor is None:
+        return jsonify(plan.many(fetch(db, owner_id, skip=skip, limit=limit)))
+
+    before_id = decode_id_cursor(cursor) if cursor else None
+    reviews = fetch(db, owner_id, limit=limit + 1, before_id=before_id)
+    has_more = len(reviews) > limit
+    reviews = reviews[:limit]
+    return jsonify({
+        "reviews": plan.many(reviews),
+        "next_cursor": encode_cursor(reviews[-1].id) if has_more else None
+    })
+
+
+def _can_modify(review):
+    return review.user_id == request.user.id or request.user.role == 'admin'
+
 
 def reviews_routes(app):
-    pass
\ No newline at end of file
+    @app.route('/books/<int:book_id>/reviews', methods=['GET'])
+    @auth_required
+    def get_book_reviews_route(book_id):
+        try:
+            return _reviews_page(get_book_reviews, book_id, BOOK_REVIEW)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/users/<int:user_id>/reviews', methods=['GET'])
+    @auth_required
+    def get_user_reviews_route(user_id):
+        try:
+            return _reviews_page(get_user_reviews, user_id, USER_REVIEW)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/books/<int:book_id>/rating', methods=['GET'])
+    @auth_required
+    def get_book_rating_route(book_id):
+        rating = get_book_rating(get_db(), book_id)
+        if not rating:
+            return jsonify({"book_id": book_id, "count": 0, "avg": None,
+                            "histogram": dict.fromkeys(map(str, range(1, 11)), 0)})
+        return jsonify(BOOK_RATING.one(rating))
+
+    @app.route('/reviews', methods=['POST'])
+    @auth_required
+    def create_review_route():
+        data = request.get_json() or {}
+        # Отзыв от имени другого пользователя может оставить только admin
+        user_id = data.setdefault("user_id", request.user.id)
+        if user_id != request.user.id and request.user.role != 'admin':
+            return jsonify({"error": "Forbidden"}), 403
+        try:
+            validate_reviews(data)
+            review = create_review(get_db(), {
+                "rating": data["rating"],
+                "text": data["text"],
+                "user_id": data["user_id"],
+                "book_id": data["book_id"]
+            })
+            return jsonify(REVIEW.one(review)), 201
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/reviews/<int:review_id>', methods=['GET'])
+    @auth_required
+    def get_review_route(review_id):
+        review = get_review(get_db(), review_id)
+        if not review:
+            return jsonify({"error": "Review not found"}), 404
+        return jsonify(REVIEW.one(review))
+
+    @app.route('/reviews/<int:review_id>', methods=['PUT'])
+    @auth_required
+    def update_review_route(review_id):
+        data = request.get_json() or {}
+        update_data = {k: v for k, v in data.items() if k in ("rating", "text")}
+        if not update_data:
+            return jsonify({"error": "No valid fields to update"}), 400
+        rating = update_data.get("rating")
+        if rating is not None and not is_rating(rating):
+            return jsonify({"error": "Rating must be an integer from 1 to 10"}), 400
+
+        db = get_db()
+        review = get_review(db, review_id)
+        if not review:
+            return jsonify({"error": "Review not found"}), 404
+        if not _can_modify(review):
+            return jsonify({"error": "Forbidden"}), 403
+        review = update_review(db, review_id, update_data)
+        return jsonify(REVIEW.one(review))
+
+    @app.route('/reviews/<int:review_id>', methods=['DELETE'])
+    @auth_required
+    def delete_review_route(review_id):
+        db = get_db()
+        review = get_review(db, review_id)
+        if not review:
+            return jsonify({"error": "Review not found"}), 404
+        if not _can_modify(review):
+            return jsonify({"error": "Forbidden"}), 403
+        delete_review(db, review_id)
+        return jsonify({"status": "deleted", "id": review_id})
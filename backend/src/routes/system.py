@@ -0,0 +1,49 @@
+from flask import jsonify, Response
+from src.auth import auth_required, role_required
+from src.database.database import get_pool_status, check_db
+from src.principal_cache import principal_cache
+from src import cache, metrics, password_pool
+
+
+def system_routes(app):
+    # Без авторизации: их опрашивают балансировщик и оркестратор
+    @app.route('/health', methods=['GET'])
+    def health():
+        """Процесс жив и обслуживает запросы; БД не трогает"""
+        return jsonify({"status": "ok"})
+
+    @app.route('/ready', methods=['GET'])
+    def ready():
+        """Готовность принимать трафик: БД доступна и схема создана"""
+        checks = check_db()
+        ok = checks.get("database") == "ok" and checks.get("schema") == "ok"
+        return jsonify({"status": "ok" if ok else "unavailable", "checks": checks}), 200 if ok else 503
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        """Для Prometheus; закрывать от внешнего мира на уровне прокси"""
+        return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+    @app.route('/admin/db/pool', methods=['GET'])
+    @auth_required
+    @role_required('admin')
+    def admin_db_pool():
+        return jsonify(get_pool_status())
+
+    @app.route('/admin/auth/principal-cache', methods=['GET'])
+    @auth_required
+    @role_required('admin')
+    def admin_principal_cache():
+        return jsonify(principal_cache.stats())
+
+    @app.route('/admin/auth/password-pool', methods=['GET'])
+    @auth_required
+    @role_required('admin')
+    def admin_password_pool():
+        return jsonify(password_pool.stats.snapshot())
+
+    @app.route('/admin/cache', methods=['GET'])
+    @auth_required
+    @role_required('admin')
+    def admin_response_cache():
+        return jsonify({**cache.response_cache.stats(), "versions": cache.versions.snapshot()})
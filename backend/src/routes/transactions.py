@@ -5,10 +5,24 @@ from src.database.crud import (
     get_transaction,
     update_transaction,
     delete_transaction,
+    stream_transactions,
 )
 from src.database.database import get_db
 from src.auth import auth_required, role_required
 from src.database.schemas import validate_transactions
+from src.pagination import encode_cursor, decode_date_id_cursor, parse_limit
+from src.serializers import TRANSACTION, TRANSACTION_ADMIN, TRANSACTION_DETAIL, TRANSACTION_EXPORT
+from src.export import export_format, export_requested, stream_export
+from src.conditional import conditional, last_modified_of, not_modified_response, rows_etag
+
+
+def _related_state(transactions):
+    # Ответ включает книгу и имена участников: их изменения не трогают updated_at обмена
+    return [(
+        t.book.updated_at if t.book else None,
+        t.from_user.username if t.from_user else None,
+        t.to_user.username if t.to_user else None,
+    ) for t in transactions]
 
 
 def transactions_routes(app):
@@ -21,11 +35,12 @@ def transactions_routes(app):
     def get_transactions_route():
         try:
             db = get_db()
-            limit = int(request.args.get('limit', 100))
+            limit = parse_limit(request.args.get('limit', 100))
             skip = int(request.args.get('skip', 0))
             status = request.args.get('status')
             user_id = request.args.get('user_id')
             book_id = request.args.get('book_id')
+            cursor = request.args.get('cursor')
             exclude_completed = request.args.get('exclude_completed', 'false').lower() == 'true'
 
             try:
@@ -37,37 +52,38 @@ def transactions_routes(app):
             except Exception:
                 book_id = None
 
-            transactions = get_transactions(
-                db,
-                limit=limit,
-                skip=skip,
+            filters = dict(
                 status=status,
                 user_id=user_id,
                 book_id=book_id,
                 exclude_status="completed" if exclude_completed else None
             )
-
-            transactions_data = []
-            for t in transactions:
-                book_title = t.book.title if t.book else None
-                from_user_id = t.from_user_id
-                to_user_id = t.to_user_id
-                from_user_name = t.from_user.username if hasattr(t, 'from_user') and t.from_user else None
-                to_user_name = t.to_user.username if hasattr(t, 'to_user') and t.to_user else None
-                transactions_data.append({
-                    "id": t.id,
-                    "date": t.date.isoformat() if t.date else None,
-                    "from_user_id": from_user_id,
-                    "to_user_id": to_user_id,
-                    "from_user_name": from_user_name,
-                    "to_user_name": to_user_name,
-                    "book_id": t.book_id,
-                    "place": t.place,
-                    "status": t.status,
-                    "book_title": book_title
-                })
-
-            return jsonify(transactions_data)
+            if cursor is not None:
+                # Keyset-режим по (date, id): пустой cursor — первая страница
+                after = decode_date_id_cursor(cursor) if cursor else None
+                transactions = get_transactions(db, limit=limit + 1, after=after, **filters)
+                has_more = len(transactions) > limit
+                transactions = transactions[:limit]
+            else:
+                has_more = None
+                transactions = get_transactions(db, limit=limit, skip=skip, **filters)
+
+            etag = rows_etag(transactions, None, has_more, _related_state(transactions))
+            not_modified = not_modified_response(etag)
+            if not_modified:
+                return not_modified
+
+            transactions_data = TRANSACTION.many(transactions)
+
+            if cursor is not None:
+                last = transactions[-1] if transactions else None
+                return conditional(jsonify({
+                    "transactions": transactions_data,
+                    "next_cursor": encode_cursor(last.date, last.id) if has_more else None
+                }), etag)
+            return conditional(jsonify(transactions_data), etag)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return handle_exception(e)
 
@@ -79,28 +95,13 @@ def transactions_routes(app):
             transaction = get_transaction(db, transaction_id)
             if not transaction:
                 return jsonify({"error": "Transaction not found"}), 404
+            etag = rows_etag([transaction], None, _related_state([transaction]))
+            last_modified = last_modified_of(transaction.updated_at, transaction.book.updated_at)
+            not_modified = not_modified_response(etag, last_modified)
+            if not_modified:
+                return not_modified
 
-            transaction_data = {
-                "id": transaction.id,
-                "date": transaction.date.isoformat(),
-                "from_user": {
-                    "id": transaction.from_user.id,
-                    "username": transaction.from_user.username
-                },
-                "to_user": {
-                    "id": transaction.to_user.id,
-                    "username": transaction.to_user.username
-                },
-                "book": {
-                    "id": transaction.book.id,
-                    "title": transaction.book.title,
-                    "author": transaction.book.author
-                },
-                "place": transaction.place,
-                "status": transaction.status
-            }
-
-            return jsonify(transaction_data)
+            return conditional(jsonify(TRANSACTION_DETAIL.one(transaction)), etag, last_modified)
         except Exception as e:
             return handle_exception(e)
 
@@ -203,28 +204,14 @@ def transactions_routes(app):
     @role_required('admin')
     def admin_get_transactions():
         db = get_db()
+        if export_requested():
+            try:
+                fmt = export_format()
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return stream_export(stream_transactions(db), TRANSACTION_EXPORT, "transactions", fmt)
         transactions = get_transactions(db)
-        result = []
-        for t in transactions:
-            result.append({
-                "id": t.id,
-                "from_user": {
-                    "id": t.from_user.id if t.from_user else None,
-                    "username": t.from_user.username if t.from_user else None
-                },
-                "to_user": {
-                    "id": t.to_user.id if t.to_user else None,
-                    "username": t.to_user.username if t.to_user else None
-                },
-                "book": {
-                    "id": t.book.id if t.book else None,
-                    "title": t.book.title if t.book else None
-                },
-                "place": t.place,
-                "status": t.status,
-                "date": t.date.isoformat() if t.date else None
-            })
-        return jsonify(result)
+        return jsonify(TRANSACTION_ADMIN.many(transactions))
 
     @app.route('/admin/transactions/<int:transaction_id>', methods=['DELETE'])
     @auth_required
@@ -1,16 +1,20 @@
 from flask import request, jsonify
 from src.database.crud import create_user, get_user_by_name, get_users, delete_user
 from src.database.database import get_db
-from src.auth_utils import (
-    hash_password,
-    verify_password,
-    create_access_token,
-    ACCESS_TOKEN_EXPIRE_MINUTES
-)
+from src.auth_utils import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from src.password_pool import hash_password, verify_password, PasswordPoolBusy
 from src.database import schemas
 from datetime import timedelta
 from src.database.models import User
 from src.auth import auth_required, role_required
+from src.serializers import USER
+
+
+def _password_pool_busy(e: PasswordPoolBusy):
+    response = jsonify({'error': 'Server is busy, try again later'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 
 def users_routes(app):
@@ -20,7 +24,10 @@ def users_routes(app):
         data = request.get_json() or {}
         username = data.get("username")
         role = "user"
-        hashed_password = hash_password(data["password"])
+        try:
+            hashed_password = hash_password(data["password"])
+        except PasswordPoolBusy as e:
+            return _password_pool_busy(e)
 
         user_data = {
             "username": username,
@@ -39,9 +46,11 @@ def users_routes(app):
             return jsonify({'error': 'Username and password required'}), 400
         db = get_db()
         user = get_user_by_name(db, data["username"])
-        print("Пароль из базы:", user.password)
-        if not user or not verify_password(data['password'], user.password):
-            return jsonify({'error': 'Invalid credentials'}), 401
+        try:
+            if not user or not verify_password(data['password'], user.password):
+                return jsonify({'error': 'Invalid credentials'}), 401
+        except PasswordPoolBusy as e:
+            return _password_pool_busy(e)
 
         access_token = create_access_token(
             data={"sub": str(user.id)},
@@ -62,16 +71,14 @@ def users_routes(app):
     def get_all_users():
         db = get_db()
         users = get_users(db)
-        return jsonify([
-            {"id": u.id, "username": u.username, "role": u.role} for u in users
-        ])
+        return jsonify(USER.many(users))
 
     @app.route("/users/<int:user_id>", methods=["DELETE"])
     @auth_required
     @role_required("admin")
     def delete_user_route(user_id):
         db = get_db()
-        success = delete_user(db, user_id)
-        if not success:
+        deleted = delete_user(db, user_id)
+        if not deleted:
             return jsonify({"error": "User not found"}), 404
-        return jsonify({"status": "deleted", "id": user_id})
+        return jsonify({"status": "deleted", "id": user_id, "deleted": deleted})
@@ -0,0 +1,165 @@
+"""Сериализация моделей для ответов API.
+
+Для каждой формы ответа один раз описывается план полей; из плана генерируется функция,
+которая собирает dict одним литералом без циклов и getattr по именам полей.
+"""
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость, без неё работает стандартный json
+    orjson = None
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "orjson")
+
+
+class FieldPlan:
+    """План полей: ключ ответа → путь атрибута ("book.title") или функция от объекта"""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        namespace = {}
+        items = []
+        for i, (key, source) in enumerate(fields.items()):
+            if isinstance(source, str):
+                items.append(f"{key!r}: obj.{source}")
+            else:
+                namespace[f"_f{i}"] = source
+                items.append(f"{key!r}: _f{i}(obj)")
+        exec(f"def serialize(obj):\n    return {{{', '.join(items)}}}\n", namespace)
+        self.one = namespace["serialize"]
+
+    def many(self, objects):
+        one = self.one
+        return [one(obj) for obj in objects]
+
+
+def related(relation: str, attr: str):
+    """Атрибут связанного объекта или None, если связи нет"""
+    def get(obj):
+        target = getattr(obj, relation)
+        return getattr(target, attr) if target else None
+    return get
+
+
+def nested(relation: str, plan: FieldPlan, optional: bool = False):
+    """Вложенный объект по плану; optional — при отсутствии связи все поля None"""
+    empty = dict.fromkeys(plan.fields)
+
+    def get(obj):
+        target = getattr(obj, relation)
+        if optional and not target:
+            return dict(empty)
+        return plan.one(target)
+    return get
+
+
+def isoformat(attr: str):
+    def get(obj):
+        value = getattr(obj, attr)
+        return value.isoformat() if value else None
+    return get
+
+
+# Books
+BOOK = FieldPlan(
+    id="id",
+    title="title",
+    author="author",
+    category="category",
+    user_id="user_id",
+    username=related("user", "username"),
+    year=lambda book: book.year if book.year is not None else '',
+)
+BOOK_ADMIN = FieldPlan(id="id", title="title", author="author", category="category", user_id="user_id", year="year")
+BOOK_REF = FieldPlan(id="id", title="title", author="author")
+
+# Collections
+COLLECTION = FieldPlan(id="id", title="title", user_id="user_id", book_count="book_count")
+
+# Users
+USER = FieldPlan(id="id", username="username", role="role")
+USER_REF = FieldPlan(id="id", username="username")
+
+# Reviews
+REVIEW = FieldPlan(id="id", rating="rating", text="text", user_id="user_id", book_id="book_id", date=isoformat("date"))
+BOOK_REVIEW = FieldPlan(**REVIEW.fields, username=related("user", "username"))
+USER_REVIEW = FieldPlan(**REVIEW.fields, book_title=related("book", "title"))
+BOOK_RATING = FieldPlan(book_id="book_id", count="count", avg="avg", histogram="histogram")
+
+# Transactions
+TRANSACTION = FieldPlan(
+    id="id",
+    date=isoformat("date"),
+    from_user_id="from_user_id",
+    to_user_id="to_user_id",
+    from_user_name=related("from_user", "username"),
+    to_user_name=related("to_user", "username"),
+    book_id="book_id",
+    place="place",
+    status="status",
+    book_title=related("book", "title"),
+)
+TRANSACTION_DETAIL = FieldPlan(
+    id="id",
+    date=lambda t: t.date.isoformat(),
+    from_user=nested("from_user", USER_REF),
+    to_user=nested("to_user", USER_REF),
+    book=nested("book", BOOK_REF),
+    place="place",
+    status="status",
+)
+TRANSACTION_ADMIN = FieldPlan(
+    id="id",
+    from_user=nested("from_user", USER_REF, optional=True),
+    to_user=nested("to_user", USER_REF, optional=True),
+    book=nested("book", FieldPlan(id="id", title="title"), optional=True),
+    place="place",
+    status="status",
+    date=isoformat("date"),
+)
+# Плоская форма для потокового экспорта (строки crud.stream_transactions, колонки CSV)
+TRANSACTION_EXPORT = FieldPlan(
+    id="id",
+    date=isoformat("date"),
+    from_user_id="from_user_id",
+    from_user_name="from_user_name",
+    to_user_id="to_user_id",
+    to_user_name="to_user_name",
+    book_id="book_id",
+    book_title="book_title",
+    place="place",
+    status="status",
+)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """app.json на orjson: тот же вывод, что у стандартного провайдера (ключи отсортированы,
+    даты — в формате HTTP), но сериализация в байты без промежуточной строки.
+    Совпадение — для строковых ключей: int-ключи json сортирует как числа, а orjson — после
+    приведения к строке, поэтому в ответы они попадают уже строками (BookRating.histogram)"""
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # indent, sort_keys=False и т.п. — отдаём стандартному json
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def init_json(app):
+    """Подключает orjson, если он установлен и не выбран JSON_BACKEND=stdlib"""
+    if orjson is not None and JSON_BACKEND == "orjson":
+        app.json = OrjsonProvider(app)
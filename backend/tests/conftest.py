@@ -0,0 +1,157 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import re
+import tempfile
+from collections import Counter
+import pytest
+from flask import Flask
+
+# Индексы рекомендаций из тестов не должны попадать в data/ разработчика (create_book обновляет контентный индекс)
+os.environ["RECS_DIR"] = tempfile.mkdtemp(prefix="recs-")
+os.environ["RECS_CONTENT_DIR"] = tempfile.mkdtemp(prefix="content-")
+# Версии кэша ответов общие для всех процессов через файл — у тестов свой
+os.environ["RESPONSE_CACHE_VERSIONS_FILE"] = os.path.join(tempfile.mkdtemp(prefix="cache-"), "versions")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from src import cache
+from src.database import database, synthetic
+from src.init_routes import init_routes
+
+# Бюджеты запросов проверяются на двух объёмах: число SQL-запросов не должно зависеть от числа строк.
+# TEST_DATABASE_URL — локальный Postgres (схема в нём пересоздаётся), иначе SQLite в памяти
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+BUDGET_SCALES = {"small": 40, "large": 400}
+# Модули маршрутов, которые берут сессию через get_db
+ROUTE_MODULES = ("books", "collections", "transactions", "reviews", "recommendations", "users")
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # crud в тестах подменяется моками и версии не увеличивает — кэш не должен переживать тест
+    cache.response_cache.clear()
+    yield
+    cache.response_cache.clear()
+
+
+def sqlite_engine():
+    """SQLite в памяти: StaticPool — одно соединение на все сессии и потоки, иначе у каждого своя пустая база"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    return engine
+
+
+@pytest.fixture
+def engine():
+    """Пустая схема моделей; данные каждый тестовый модуль добавляет сам"""
+    engine = sqlite_engine()
+    database.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db, mocker):
+    """Маршруты без хуков create_app поверх db; авторизацию пропускает TESTING=1"""
+    for module in ROUTE_MODULES:
+        mocker.patch(f"src.routes.{module}.get_db", return_value=db)
+    app = Flask(__name__)
+    init_routes(app)
+    app.config.update({"TESTING": True})
+    return app.test_client()
+
+
+class QueryRecorder:
+    """SQL, отправленные движком внутри with; сравнивает их число с бюджетом"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def report(self, label: str, budget: int) -> str:
+        shapes = [" ".join(statement.split()) for statement in self.statements]
+        counts = Counter(shapes)
+        lines = [f"{label}: {len(shapes)} SQL statements, budget {budget} (+{len(shapes) - budget})"]
+        repeated = [(count, shape) for shape, count in counts.items() if count > 1]
+        if repeated:
+            lines.append("repeated statements (N+1?):")
+            lines += [f"  {count:>4}× {_shorten(shape)}" for count, shape in sorted(repeated, reverse=True)]
+        lines.append("all statements:")
+        lines += [f"  {number:>4}. {_shorten(shape)}" for number, shape in enumerate(shapes, start=1)]
+        return "\n".join(lines)
+
+
+def _shorten(statement: str, width: int = 160) -> str:
+    # Список колонок в SELECT длинный и одинаковый — оставляем таблицы и условия
+    statement = re.sub(r"^SELECT .+? FROM ", "SELECT … FROM ", statement)
+    return statement if len(statement) <= width else statement[:width - 1] + "…"
+
+
+@pytest.fixture(scope="module", params=list(BUDGET_SCALES), ids=lambda scale: f"{scale}")
+def budget_engine(request):
+    """База с синтетическими данными; одна на модуль и объём"""
+    if TEST_DATABASE_URL:
+        engine = create_engine(TEST_DATABASE_URL)
+        database.Base.metadata.drop_all(bind=engine)
+    else:
+        engine = sqlite_engine()
+    database.Base.metadata.create_all(bind=engine)
+    synthetic.generate(engine, books=BUDGET_SCALES[request.param])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def budget_client(budget_engine, mocker):
+    """Настоящее приложение поверх budget_engine: сессии, хуки и crud без моков"""
+    from app import create_app
+    mocker.patch.object(database, "engine", budget_engine)
+    mocker.patch.object(database, "SessionLocal",
+                        scoped_session(sessionmaker(bind=budget_engine), scopefunc=database._session_scope))
+    return create_app({"TESTING": True}).test_client()
+
+
+@pytest.fixture
+def query_budget(budget_engine):
+    """with query_budget(3): ... — не больше 3 SQL-запросов внутри блока; при превышении — список запросов"""
+
+    class Budget:
+        def __init__(self, budget: int, label: str = "block"):
+            self.budget = budget
+            self.label = label
+            self.recorder = QueryRecorder(budget_engine)
+
+        def __enter__(self):
+            self.recorder.__enter__()
+            return self.recorder
+
+        def __exit__(self, exc_type, *exc_info):
+            self.recorder.__exit__(exc_type, *exc_info)
+            if exc_type is None and len(self.recorder.statements) > self.budget:
+                pytest.fail(self.recorder.report(self.label, self.budget), pytrace=False)
+
+    return Budget
@@ -0,0 +1,79 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import runpy
+import subprocess
+import pytest
+from sqlalchemy import func, select
+from app import create_app
+from src.database import database, models
+from src.database.commands import seed_db
+
+os.environ["TESTING"] = "1"
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
+
+
+def test_create_app_does_not_touch_database(mocker):
+    mock_connect = mocker.patch("src.database.database.engine.connect")
+    app = create_app({"TESTING": True})
+    mock_connect.assert_not_called()
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+    assert {"/books", "/books/<int:book_id>/similar", "/admin/cache", "/health", "/ready"} <= rules
+    assert {"create-tables", "seed-db", "rebuild-recs"} <= set(app.cli.commands)
+
+    # Каждый вызов фабрики — независимое приложение
+    other = create_app({"TESTING": True, "CORS_ORIGINS": ["https://example.org"]})
+    assert other is not app
+    assert other.config["CORS_ORIGINS"] == ["https://example.org"]
+
+
+def test_import_does_not_load_heavy_modules():
+    code = ("import sys, app; app.create_app(); "
+            "print(' '.join(m for m in ('numpy', 'scipy', 'passlib', 'jwt', 'bcrypt') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True,
+                            env={**os.environ, "DATABASE_URL": "sqlite://"}, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_ready_reports_missing_schema(engine, mocker):
+    # Схема ещё не создана (flask create-tables не запускали)
+    database.Base.metadata.drop_all(bind=engine)
+    mocker.patch("src.database.database.engine", engine)
+    client = create_app({"TESTING": True}).test_client()
+    assert client.get("/health").get_json() == {"status": "ok"}
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["checks"]["database"] == "ok"
+    assert response.get_json()["checks"]["schema"].startswith("missing tables: ")
+
+    database.Base.metadata.create_all(bind=engine)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok", "checks": {"database": "ok", "schema": "ok"}}
+
+
+def test_seed_db_is_idempotent(db, mocker):
+    mock_invalidate = mocker.patch("src.database.commands.cache.invalidate")
+    added = seed_db(db)
+    assert all(added.values())
+    counts = {model: db.scalar(select(func.count()).select_from(model))
+              for model in (models.User, models.Book, models.Collection, models.CollectionItem,
+                            models.Transaction)}
+    assert counts[models.User] == added["users"] and counts[models.Book] == added["books"]
+    mock_invalidate.assert_called_with("users", "books", "collections")
+
+    assert seed_db(db) == {"users": 0, "books": 0, "collections": 0, "transactions": 0}
+    assert counts == {model: db.scalar(select(func.count()).select_from(model)) for model in counts}
+
+
+def test_gunicorn_post_fork_disposes_engine(mocker, monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.setenv("GUNICORN_THREADS", "8")
+    config = runpy.run_path(os.path.join(BACKEND, "gunicorn.conf.py"))
+    assert (config["workers"], config["threads"], config["preload_app"]) == (3, 8, True)
+
+    mock_dispose = mocker.patch("src.database.database.engine.dispose")
+    config["post_fork"](server=None, worker=None)
+    mock_dispose.assert_called_once_with(close=False)
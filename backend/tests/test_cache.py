@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import multiprocessing
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src import cache
+from src.database import crud, database
+from src.init_routes import init_routes
+
+os.environ["TESTING"] = "1"
+
+HEADERS = {"Authorization": "Bearer test_jwt_token"}
+
+
+def _app():
+    app = Flask(__name__)
+    init_routes(app)
+    app.config.update({"TESTING": True})
+    return app
+
+
+def _session(url):
+    return sessionmaker(bind=create_engine(url))()
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'books.db'}"
+    engine = create_engine(url)
+    database.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    owner = crud.create_user(session, {"username": "owner", "password": "x"})
+    crud.create_book(session, {"title": "Старое", "author": "Автор", "category": "Классика", "user_id": owner.id})
+    session.close()
+    engine.dispose()
+    return url
+
+
+def _update_in_other_worker(url, done):
+    # Отдельный процесс со своим приложением, своей сессией и своим LRU — как второй воркер gunicorn
+    import src.routes.books as books_routes
+    session = _session(url)
+    books_routes.get_db = lambda: session
+    response = _app().test_client().put("/books/1", json={"title": "Новое"}, headers=HEADERS)
+    done.put(response.status_code)
+
+
+def test_write_in_another_worker_invalidates_cache(db_url, mocker):
+    session = _session(db_url)
+    mocker.patch("src.routes.books.get_db", return_value=session)
+    client = _app().test_client()
+    assert client.get("/books/1", headers=HEADERS).headers["X-Cache"] == "MISS"
+    assert client.get("/books/1", headers=HEADERS).headers["X-Cache"] == "HIT"
+
+    context = multiprocessing.get_context("fork")
+    done = context.Queue()
+    worker = context.Process(target=_update_in_other_worker, args=(db_url, done))
+    worker.start()
+    assert done.get(timeout=30) == 200
+    worker.join(timeout=30)
+
+    session.expire_all()
+    response = client.get("/books/1", headers=HEADERS)
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json["title"] == "Новое"
+    session.close()
+
+
+def test_versions_shared_between_instances(tmp_path):
+    first = cache.EntityVersions(str(tmp_path / "versions"))
+    second = cache.EntityVersions(str(tmp_path / "versions"))
+    before = second.get("books", "collections")
+    first.bump("books")
+    assert second.get("books", "collections") == (before[0] + 1, before[1])
+    assert second.snapshot() == first.snapshot()
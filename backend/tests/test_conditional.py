@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import time
+import pytest
+from src import cache
+from src.database import crud
+
+os.environ["TESTING"] = "1"
+
+HEADERS = {"Authorization": "Bearer test_jwt_token"}
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    # Меряем сам обработчик: кэш ответов отключён
+    monkeypatch.setattr(cache, "response_cache", cache.NullCacheBackend())
+
+
+@pytest.fixture
+def books(db):
+    owner = crud.create_user(db, {"username": "owner", "password": "x"})
+    return [
+        crud.create_book(db, {"title": f"Book {i}", "author": f"Author {i}", "category": "Category",
+                              "user_id": owner.id, "year": 1900 + i})
+        for i in range(500)
+    ]
+
+
+def test_book_list_etag_changes_on_update(client, db, books):
+    first = client.get("/books?limit=20", headers=HEADERS)
+    etag = first.headers["ETag"]
+
+    assert client.get("/books?limit=20", headers={**HEADERS, "If-None-Match": etag}).status_code == 304
+
+    crud.update_book(db, books[3].id, {"title": "Renamed"})
+    second = client.get("/books?limit=20", headers={**HEADERS, "If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
+
+
+def test_book_if_modified_since(client, db, books):
+    response = client.get(f"/books/{books[0].id}", headers=HEADERS)
+    last_modified = response.headers["Last-Modified"]
+    cached = client.get(f"/books/{books[0].id}", headers={**HEADERS, "If-Modified-Since": last_modified})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+
+def test_collection_etag_follows_membership(client, db, books):
+    collection = crud.create_collection(db, {"title": "C", "user_id": books[0].user_id,
+                                             "book_ids": [books[0].id, books[1].id]})
+    etag = client.get(f"/collections/{collection.id}", headers=HEADERS).headers["ETag"]
+    # Замена книги: число книг то же, состав — другой
+    crud.update_collection(db, collection.id, {"book_ids": [books[0].id, books[2].id]})
+    response = client.get(f"/collections/{collection.id}", headers={**HEADERS, "If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_transaction_list_etag_follows_status(client, db, books):
+    receiver = crud.create_user(db, {"username": "receiver", "password": "x"})
+    transaction = crud.create_transaction(db, {"from_user_id": books[0].user_id, "to_user_id": receiver.id,
+                                               "book_id": books[0].id, "place": "Library"})
+    etag = client.get("/transactions", headers=HEADERS).headers["ETag"]
+    assert client.get("/transactions", headers={**HEADERS, "If-None-Match": etag}).status_code == 304
+
+    crud.update_transaction(db, transaction.id, {"status": "completed"})
+    assert client.get("/transactions", headers={**HEADERS, "If-None-Match": etag}).status_code == 200
+
+
+def test_not_modified_saves_bytes_and_cpu(client, books):
+    url = "/books?limit=500"
+    full = client.get(url, headers=HEADERS)
+    assert full.status_code == 200
+    etag = full.headers["ETag"]
+    client.get(url, headers={**HEADERS, "If-None-Match": etag})
+
+    def cpu_time(headers, repeat=20):
+        started = time.process_time()
+        for _ in range(repeat):
+            response = client.get(url, headers=headers)
+        return time.process_time() - started, response
+
+    full_cpu, full_response = cpu_time(HEADERS)
+    conditional_cpu, conditional_response = cpu_time({**HEADERS, "If-None-Match": etag})
+
+    assert full_response.status_code == 200
+    assert conditional_response.status_code == 304
+    saved_bytes = len(full_response.data) - len(conditional_response.data)
+    print(f"\n{url}: {len(full_response.data)} B -> {len(conditional_response.data)} B, "
+          f"CPU {full_cpu * 1000:.1f} ms -> {conditional_cpu * 1000:.1f} ms на 20 запросов")
+    assert saved_bytes == len(full_response.data) > 0
+    # Запрос к БД выполняется в обоих случаях; 304 экономит сериализацию 500 книг
+    assert conditional_cpu < full_cpu
@@ -0,0 +1,324 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src import cache
+from src.database import database, columns, crud, indexes, models, search
+
+
+@pytest.fixture
+def statements(engine):
+    """Список SQL-запросов, выполненных через engine"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def seeded(db):
+    users = [crud.create_user(db, {"username": f"user{i}", "password": "x"}) for i in range(3)]
+    books = [
+        crud.create_book(db, {"title": f"Book {i}", "author": "Author", "category": "Category",
+                              "user_id": users[i % 3].id, "year": 2000 + i})
+        for i in range(10)
+    ]
+    crud.create_collection(db, {"title": "Collection", "user_id": users[0].id,
+                                "book_ids": [b.id for b in books[:4]]})
+    for book in books[:5]:
+        crud.create_transaction(db, {"from_user_id": users[0].id, "to_user_id": users[1].id,
+                                     "book_id": book.id, "place": "Library"})
+    seeded = {"user_ids": [u.id for u in users], "book_ids": [b.id for b in books]}
+    db.expunge_all()
+    return seeded
+
+
+def test_get_books_loads_owner_in_one_query(db, seeded, statements):
+    books = crud.get_books(db)
+    usernames = [book.user.username for book in books]
+    assert len(usernames) == 10
+    assert len(statements) == 1
+
+
+def test_get_transactions_loads_relations_in_one_query(db, seeded, statements):
+    transactions = crud.get_transactions(db)
+    data = [(t.book.title, t.from_user.username, t.to_user.username) for t in transactions]
+    assert len(data) == 5
+    assert len(statements) == 1
+
+
+def test_get_collections_reads_only_collections_table(db, seeded, statements):
+    collections = crud.get_collections(db)
+    assert [c.book_count for c in collections] == [4]
+    assert len(statements) == 1
+    assert "collection_items" not in statements[0]
+
+
+def test_strict_loading_raises_on_unexpected_lazy_load(db, seeded, monkeypatch):
+    monkeypatch.setattr(database, "STRICT_LOADING", True)
+    books = crud.get_books(db)
+    assert books[0].user.username
+    with pytest.raises(InvalidRequestError):
+        books[0].reviews
+
+
+def test_search_books_ranks_title_matches_first(db, seeded):
+    owner = seeded["user_ids"][0]
+    crud.create_book(db, {"title": "Война и мир", "author": "Лев Толстой", "category": "Классика", "user_id": owner})
+    crud.create_book(db, {"title": "Анна Каренина", "author": "Лев Толстой", "category": "Классика", "user_id": owner})
+    crud.create_book(db, {"title": "Толстой: биография", "author": "Павел Басинский", "category": "Биография",
+                          "user_id": owner})
+
+    books, total = search.search_books(db, "толстой")
+    assert total == 3
+    assert books[0].title == "Толстой: биография"
+
+    books, total = search.search_books(db, "война", limit=1)
+    assert total == 1
+    assert books[0].user.id == owner
+
+
+def test_search_index_follows_updates_and_reindex(db, seeded):
+    book_id = seeded["book_ids"][0]
+    crud.update_book(db, book_id, {"title": "Мастер и Маргарита"})
+    assert [b.id for b in search.search_books(db, "маргарита")[0]] == [book_id]
+
+    db.execute(text("DELETE FROM books_fts"))
+    assert search.search_books(db, "маргарита")[1] == 0
+    assert search.reindex_books(db) == 10
+    assert search.search_books(db, "маргарита")[1] == 1
+
+
+def test_hot_queries_use_indexes(db, seeded):
+    results = indexes.check_query_plans(db)
+    assert results
+    assert [(name, plan) for name, plan, uses_index in results if not uses_index] == []
+
+
+def test_migrate_indexes_creates_missing_indexes(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_books_category")
+        conn.exec_driver_sql("DROP INDEX ix_transactions_status_date")
+
+    assert indexes.migrate_indexes(engine, echo=lambda message: None) == []
+    with engine.connect() as conn:
+        names = set(conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    assert {"ix_books_category", "ix_transactions_status_date"} <= names
+
+
+def test_migrate_indexes_reports_duplicates_for_unique_index(engine):
+    # БД, которую прежний seed-db заполнял несколько раз: username ещё не уникален
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_users_username")
+        conn.exec_driver_sql("INSERT INTO users (username, password) VALUES "
+                             "('user1', 'x'), ('user1', 'x'), ('user2', 'x'), ('user2', 'x'), ('user2', 'x'), "
+                             "('user3', 'x')")
+    messages = []
+    assert indexes.migrate_indexes(engine, echo=messages.append) == ["ix_users_username"]
+    report = next(message for message in messages if message.startswith("ix_users_username"))
+    assert "user2 (3), user1 (2)" in report
+    assert "user3" not in report
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM users WHERE id NOT IN (SELECT MIN(id) FROM users GROUP BY username)")
+    assert indexes.migrate_indexes(engine, echo=lambda message: None) == []
+
+
+def test_migrate_columns_upgrades_old_schema():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        # Таблицы в том виде, в каком их создавала первая версия моделей
+        conn.exec_driver_sql("CREATE TABLE books (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, "
+                             "author VARCHAR NOT NULL, category VARCHAR NOT NULL, user_id INTEGER NOT NULL, year INTEGER)")
+        conn.exec_driver_sql("CREATE TABLE collections (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, "
+                             "user_id INTEGER NOT NULL)")
+        conn.exec_driver_sql("CREATE TABLE transactions (id INTEGER PRIMARY KEY, date DATETIME NOT NULL, "
+                             "from_user_id INTEGER NOT NULL, to_user_id INTEGER NOT NULL, book_id INTEGER NOT NULL, "
+                             "place VARCHAR NOT NULL, status VARCHAR(11) NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO books VALUES (1, 'Война и мир', 'Лев Толстой', 'Классика', 1, 1869)")
+        conn.exec_driver_sql("INSERT INTO collections VALUES (1, 'Классика', 1)")
+    # create-tables дополняет только недостающие таблицы
+    database.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (id, username, password) VALUES (1, 'admin', 'x')")
+        conn.exec_driver_sql("INSERT INTO collection_items VALUES (1, 1)")
+        conn.exec_driver_sql("INSERT INTO reviews (rating, text, user_id, book_id, date) "
+                             "VALUES (8, 'x', 1, 1, '2024-01-01')")
+
+    added = columns.migrate_columns(engine, echo=lambda message: None)
+    assert set(added) == {"books.isbn", "books.search_vector", "books.updated_at", "collections.book_count",
+                          "collections.updated_at", "transactions.updated_at"}
+    assert columns.missing_columns(engine) == []
+
+    db = sessionmaker(bind=engine)()
+    try:
+        assert db.get(models.Collection, 1).book_count == 1
+        assert db.get(models.Book, 1).updated_at is not None
+        assert db.get(models.BookRating, 1).count == 1
+        books, total = search.search_books(db, "толстой")
+        assert total == 1
+        # Приложение работает с дополненной схемой
+        assert crud.get_book(db, 1).title == "Война и мир"
+    finally:
+        db.close()
+    assert columns.migrate_columns(engine, echo=lambda message: None) == []
+    engine.dispose()
+
+
+def test_delete_user_removes_dependents_with_set_based_deletes(db, seeded, statements):
+    user_id = seeded["user_ids"][0]
+    other = seeded["user_ids"][1]
+    foreign_book = seeded["book_ids"][1]
+    crud.create_review(db, {"rating": 7, "text": "Хорошо", "user_id": user_id, "book_id": foreign_book})
+    crud.create_review(db, {"rating": 9, "text": "Отлично", "user_id": other, "book_id": seeded["book_ids"][0]})
+    statements.clear()
+
+    deleted = crud.delete_user(db, user_id)
+
+    assert deleted == {"books": 4, "collections": 1, "collection_items": 4, "reviews": 2, "transactions": 5}
+    # +1 DELETE по сравнению с одними таблицами данных: агрегаты оценок удаляемых книг (book_ratings)
+    assert len([s for s in statements if s.lstrip().upper().startswith("DELETE")]) <= 11
+    assert crud.get_user(db, user_id) is None
+    # Оценка удалённого пользователя ушла из агрегатов чужой книги
+    rating = crud.get_book_rating(db, foreign_book)
+    assert (rating.count, rating.sum, rating.avg, rating.r7) == (0, 0, None, 0)
+    assert crud.count_books(db, user_id=user_id) == 0
+    assert crud.delete_user(db, user_id) is None
+
+
+def test_delete_book_removes_references(db, seeded):
+    book_id = seeded["book_ids"][0]
+    crud.create_review(db, {"rating": 5, "text": "Норм", "user_id": seeded["user_ids"][1], "book_id": book_id})
+
+    deleted = crud.delete_book(db, book_id)
+
+    assert deleted == {"books": 1, "collection_items": 1, "reviews": 1, "transactions": 1}
+    assert crud.get_book(db, book_id) is None
+    assert search.search_books(db, "Book")[1] == 9
+    assert crud.delete_book(db, book_id) is None
+
+
+def test_add_books_to_collection_in_few_statements(db, seeded, statements):
+    owner = seeded["user_ids"][0]
+    book_ids = [
+        crud.create_book(db, {"title": f"Extra {i}", "author": "A", "category": "C", "user_id": owner}).id
+        for i in range(1000)
+    ]
+    collection = crud.create_collection(db, {"title": "Big", "user_id": owner, "book_ids": book_ids[:10]})
+    statements.clear()
+
+    collection, changes = crud.add_books_to_collection(db, collection.id, book_ids + book_ids[:5] + [10 ** 6])
+
+    assert changes == {"added": 990, "removed": 0, "unchanged": 10}
+    assert len(statements) <= 5
+    assert len(crud.get_collection_with_items(db, collection.id).items) == 1000
+    assert crud.add_books_to_collection(db, 10 ** 6, book_ids) == (None, None)
+
+
+def test_update_collection_applies_diff(db, seeded, statements):
+    book_ids = seeded["book_ids"]
+    collection = crud.create_collection(db, {"title": "Diff", "user_id": seeded["user_ids"][0],
+                                             "book_ids": book_ids[:5]})
+    statements.clear()
+
+    collection, changes = crud.update_collection(db, collection.id, {"book_ids": book_ids[2:7]})
+
+    assert changes == {"added": 2, "removed": 2, "unchanged": 3}
+    assert not any(s.lstrip().upper().startswith("DELETE") and "IN" not in s.upper() for s in statements)
+    items = crud.get_collection_with_items(db, collection.id).items
+    assert sorted(item.book_id for item in items) == sorted(book_ids[2:7])
+
+
+def test_delete_collection_removes_items(db, seeded):
+    collection = crud.get_collections(db)[0]
+    assert crud.delete_collection(db, collection.id)
+    assert crud.get_collections(db) == []
+
+
+def _book_counts(db):
+    db.expire_all()
+    return {c.title: c.book_count for c in crud.get_collections(db)}
+
+
+def test_collection_book_count_is_maintained(db, seeded):
+    book_ids = seeded["book_ids"]
+    collection = crud.create_collection(db, {"title": "Counter", "user_id": seeded["user_ids"][1],
+                                             "book_ids": book_ids[:3] + [10 ** 6]})
+    assert _book_counts(db)["Counter"] == 3
+
+    crud.add_books_to_collection(db, collection.id, book_ids[2:6])
+    assert _book_counts(db)["Counter"] == 6
+
+    crud.update_collection(db, collection.id, {"book_ids": book_ids[4:8]})
+    assert _book_counts(db)["Counter"] == 4
+
+    assert crud.remove_book_from_collection(db, collection.id, book_ids[4])
+    assert not crud.remove_book_from_collection(db, collection.id, book_ids[4])
+    assert _book_counts(db)["Counter"] == 3
+
+    # Книга 1 есть в обеих коллекциях, книга 5 — только в "Counter"
+    crud.add_books_to_collection(db, collection.id, [book_ids[1]])
+    crud.delete_book(db, book_ids[1])
+    crud.delete_book(db, book_ids[5])
+    assert _book_counts(db) == {"Collection": 3, "Counter": 2}
+
+
+def test_recount_collections_repairs_drift(db, seeded):
+    db.execute(text("UPDATE collections SET book_count = 42"))
+    db.commit()
+    assert crud.recount_collections(db) == 1
+    assert _book_counts(db) == {"Collection": 4}
+    assert crud.recount_collections(db) == 0
+
+
+def test_get_collection_books_pages_by_keyset(db, seeded, statements):
+    collection = crud.get_collections(db)[0]
+    statements.clear()
+
+    first = crud.get_collection_books(db, collection.id, limit=3)
+    second = crud.get_collection_books(db, collection.id, limit=3, after=(first[-1].id,))
+    assert [b.id for b in first + second] == sorted(seeded["book_ids"][:4])
+    assert all("collection_items.book_id = books.id" in s and "books.category" not in s for s in statements)
+
+    by_title = crud.get_collection_books(db, collection.id, limit=2, sort="title")
+    rest = crud.get_collection_books(db, collection.id, sort="title", after=(by_title[-1].title, by_title[-1].id))
+    assert [b.title for b in by_title + rest] == ["Book 0", "Book 1", "Book 2", "Book 3"]
+
+
+def test_book_rating_aggregates_follow_reviews(db, seeded, statements):
+    book_id = seeded["book_ids"][0]
+    user_ids = seeded["user_ids"]
+    first = crud.create_review(db, {"rating": 8, "text": "", "user_id": user_ids[1], "book_id": book_id})
+    crud.create_review(db, {"rating": 4, "text": "", "user_id": user_ids[2], "book_id": book_id})
+    crud.update_review(db, first.id, {"rating": 10})
+    statements.clear()
+
+    rating = crud.get_book_rating(db, book_id)
+    assert (rating.count, rating.sum, rating.avg) == (2, 14, 7.0)
+    assert rating.histogram == {**dict.fromkeys(map(str, range(1, 11)), 0), "4": 1, "10": 1}
+
+    # Сортировка и фильтр по средней оценке — через book_ratings, без GROUP BY по reviews
+    top = crud.get_books(db, sort="-rating", limit=3)
+    assert top[0].id == book_id
+    assert [b.id for b in crud.get_books(db, min_rating=6.5)] == [book_id]
+    assert crud.count_books(db, min_rating=7.5) == 0
+    assert not any("GROUP BY" in s.upper() for s in statements)
+
+    crud.delete_review(db, first.id)
+    rating = crud.get_book_rating(db, book_id)
+    assert (rating.count, rating.sum, rating.avg, rating.r10) == (1, 4, 4.0, 0)
+    # Полный пересчёт даёт то же, что инкрементальные обновления, и сбрасывает закэшированные ответы
+    versions = cache.versions.get("ratings", "books")
+    crud.recount_ratings(db)
+    assert cache.versions.get("ratings", "books") == tuple(version + 1 for version in versions)
+    db.expire_all()
+    rating = crud.get_book_rating(db, book_id)
+    assert (rating.count, rating.sum, rating.avg, rating.r4) == (1, 4, 4.0, 1)
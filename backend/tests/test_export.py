@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import csv
+import io
+import json
+from datetime import datetime
+import pytest
+from sqlalchemy import insert
+from src.database import models
+
+os.environ["TESTING"] = "1"
+
+HEADERS = {"Authorization": "Bearer admin_token"}
+BOOKS = 2500
+
+
+@pytest.fixture(autouse=True)
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "username": "alice", "password": "x"},
+                                           {"id": 2, "username": "bob", "password": "x"}])
+        conn.execute(insert(models.Book), [
+            {"id": i, "title": f"Книга, {i}", "author": "Автор", "category": "Классика", "user_id": 1, "year": None}
+            for i in range(1, BOOKS + 1)
+        ])
+        conn.execute(insert(models.Collection), [{"id": 1, "title": "Полка", "user_id": 2, "book_count": 0}])
+        conn.execute(insert(models.Transaction), [
+            {"id": 1, "from_user_id": 1, "to_user_id": 2, "book_id": 7, "place": "Library",
+             "date": datetime(2024, 5, 1, 12, 0)}
+        ])
+
+
+def test_books_ndjson_export_returns_every_row(client):
+    response = client.get("/admin/books?format=ndjson&stream=1", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    # Без экспорта админка по-прежнему отдаёт первую страницу; экспорт — всю таблицу
+    assert len(lines) == BOOKS
+    assert json.loads(lines[-1]) == {"id": BOOKS, "title": f"Книга, {BOOKS}", "author": "Автор",
+                                     "category": "Классика", "user_id": 1, "year": None}
+
+
+def test_books_csv_export(client):
+    response = client.get("/admin/books?format=csv&stream=1", headers=HEADERS)
+    assert response.mimetype == "text/csv"
+    assert "attachment; filename=books.csv" == response.headers["Content-Disposition"]
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ["id", "title", "author", "category", "user_id", "year"]
+    assert rows[1] == ["1", "Книга, 1", "Автор", "Классика", "1", ""]
+    assert len(rows) == BOOKS + 1
+
+
+def test_transactions_export_is_flat(client):
+    response = client.get("/admin/transactions?format=ndjson&stream=1", headers=HEADERS)
+    assert json.loads(response.get_data(as_text=True)) == {
+        "id": 1, "date": "2024-05-01T12:00:00", "from_user_id": 1, "from_user_name": "alice",
+        "to_user_id": 2, "to_user_name": "bob", "book_id": 7, "book_title": "Книга, 7",
+        "place": "Library", "status": "pending",
+    }
+
+
+def test_collections_export_and_invalid_format(client):
+    response = client.get("/admin/collections?format=csv", headers=HEADERS)
+    assert response.get_data(as_text=True).splitlines() == ["id,title,user_id,book_count", "1,Полка,2,0"]
+    assert client.get("/admin/collections?format=xml&stream=1", headers=HEADERS).status_code == 400
@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import pytest
+from sqlalchemy import func, select
+from src.database.importer import BookCrossingImporter, USERNAME_PREFIX
+from src.database.models import Book, ImportCheckpoint, Review, User
+
+USERS = '''"User-ID";"Location";"Age"
+"1";"nyc, new york, usa";NULL
+"2";"moscow, russia";"34"
+"3";"stockton, california, usa";"18"
+'''
+
+BOOKS = '''"ISBN";"Book-Title";"Book-Author";"Year-Of-Publication";"Publisher"
+"0195153448";"Classical Mythology";"Mark P. O. Morford";"2002";"Oxford University Press"
+"0002005018";"Clara Callan";"Richard Bruce Wright";"2001";"HarperFlamingo Canada"
+"broken row"
+"0060973129";"Decision in Normandy &amp; more";"Carlo D'Este";"0";"HarperPerennial"
+'''
+
+RATINGS = '''"User-ID";"ISBN";"Book-Rating"
+"1";"0195153448";"0"
+"2";"0195153448";"5"
+"2";"0002005018";"8"
+"3";"0060973129";"10"
+"3";"unknown";"7"
+'''
+
+
+@pytest.fixture
+def dump(tmp_path, mocker):
+    mocker.patch("src.auth_utils.hash_password", return_value="hashed")
+    paths = {}
+    for name, content in (("users", USERS), ("books", BOOKS), ("ratings", RATINGS)):
+        path = tmp_path / f"BX-{name}.csv"
+        path.write_text(content, encoding="latin-1")
+        paths[name] = str(path)
+    return paths
+
+
+def _count(engine, model):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_import_bookcrossing(engine, dump):
+    importer = BookCrossingImporter(engine, batch_size=2)
+    assert importer.import_users(dump["users"]) == 3
+    assert importer.import_books(dump["books"]) == 3
+    assert importer.import_ratings(dump["ratings"]) == 3
+
+    with engine.connect() as conn:
+        book = conn.execute(select(Book).where(Book.isbn == "0060973129")).one()
+        assert book.title == "Decision in Normandy & more"
+        assert book.year is None
+        ratings = conn.execute(
+            select(User.username, Review.rating).join(User, User.id == Review.user_id).order_by(Review.rating)
+        ).all()
+    assert ratings == [(f"{USERNAME_PREFIX}2", 5), (f"{USERNAME_PREFIX}2", 8), (f"{USERNAME_PREFIX}3", 10)]
+
+
+def test_import_is_resumable(engine, dump):
+    importer = BookCrossingImporter(engine, batch_size=2)
+    importer.import_users(dump["users"])
+    importer.import_books(dump["books"])
+    importer.import_ratings(dump["ratings"])
+
+    # Повторный запуск с новым процессом ничего не дублирует
+    importer = BookCrossingImporter(engine, batch_size=2)
+    assert importer.import_users(dump["users"]) == 0
+    assert importer.import_books(dump["books"]) == 0
+    assert importer.import_ratings(dump["ratings"]) == 0
+    assert _count(engine, User) == 4
+    assert _count(engine, Book) == 3
+    assert _count(engine, Review) == 3
+
+
+def test_import_continues_from_checkpoint(engine, dump):
+    importer = BookCrossingImporter(engine, batch_size=2)
+    importer.import_users(dump["users"])
+    importer.import_books(dump["books"])
+    with engine.begin() as conn:
+        conn.execute(ImportCheckpoint.__table__.insert().values(source="ratings:BX-ratings.csv", position=2))
+
+    assert importer.import_ratings(dump["ratings"]) == 2
+    assert _count(engine, Review) == 2
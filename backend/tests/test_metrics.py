@@ -0,0 +1,98 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import re
+import threading
+import pytest
+from sqlalchemy import insert
+from app import create_app
+from src import metrics
+from src.database import database, models
+
+os.environ["TESTING"] = "1"
+
+
+@pytest.fixture
+def client(engine, db, mocker):
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "username": "alice", "password": "x"}])
+        conn.execute(insert(models.Book), [{"id": 1, "title": "Книга", "author": "Автор", "category": "Классика",
+                                            "user_id": 1}])
+    database.instrument_engine(engine)
+    # create_app, а не только маршруты: метрики собирают хуки приложения
+    mocker.patch("src.routes.books.get_db", return_value=db)
+    metrics.registry.reset()
+    app = create_app({"TESTING": True})
+
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError("boom")
+
+    return app.test_client()
+
+
+def samples(text):
+    """{'name{labels}': value} из текстового формата Prometheus"""
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def test_metrics_by_route(client):
+    for _ in range(2):
+        assert client.get("/books/1").status_code == 200
+    assert client.get("/books/1/similar?mode=unknown").status_code == 400
+    # Общий обработчик исключений (routes/transactions.py) отвечает 500 и на несуществующий путь
+    unmatched_status = client.get("/no/such/path").status_code
+    assert client.get("/boom").status_code == 500
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    values = samples(response.get_data(as_text=True))
+
+    route = 'method="GET",route="/books/<int:book_id>"'
+    assert values[f'http_requests_total{{{route},status="200"}}'] == 2
+    assert values['http_requests_total{method="GET",route="/books/<int:book_id>/similar",status="400"}'] == 1
+    assert values[f'http_requests_total{{method="GET",route="<unmatched>",status="{unmatched_status}"}}'] == 1
+    assert values['http_requests_total{method="GET",route="/boom",status="500"}'] == 1
+    assert values[f'http_request_duration_seconds_count{{{route}}}'] == 2
+    assert values[f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}'] == 2
+    # Сам /metrics ещё обслуживается
+    assert values["http_requests_in_flight"] == 1
+
+    # Второй ответ может прийти из кэша ответов, без SQL
+    assert values[f'db_queries_total{{{route}}}'] >= 1
+    assert values[f'db_query_seconds_total{{{route}}}'] > 0
+    assert values[f'http_request_db_queries_count{{{route}}}'] == 2
+    assert values['db_queries_total{method="GET",route="<unmatched>"}'] == 0
+
+    # Корзины гистограммы накопительные
+    buckets = [value for key, value in values.items()
+               if key.startswith(f'http_request_duration_seconds_bucket{{{route}')]
+    assert buckets == sorted(buckets)
+    assert all(re.fullmatch(r'[a-z_]+(\{.*\})?', key) for key in values)
+
+
+def test_per_thread_shards_are_merged_and_retired():
+    registry = metrics.MetricsRegistry()
+
+    def serve(requests):
+        for _ in range(requests):
+            shard = registry.start_request()
+            registry.record_query(0.001)
+            registry.finish_request(shard, "GET", "/books", 200, 0.02)
+
+    threads = [threading.Thread(target=serve, args=(10,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    serve(5)
+
+    total = registry.collect()
+    assert total.requests == {("GET", "/books", 200): 45}
+    assert total.latency[("GET", "/books")][-1] == pytest.approx(0.9)
+    assert total.queries[("GET", "/books")][-1] == 45
+    # Шарды завершившихся потоков слиты в общий, живым остался только текущий
+    assert len(registry._shards) == 1
+    assert registry.collect().requests == total.requests
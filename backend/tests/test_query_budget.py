@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import pytest
+from sqlalchemy import text
+from conftest import QueryRecorder
+
+os.environ["TESTING"] = "1"
+
+# Бюджет SQL-запросов на запрос к API. Каждый случай проверяется на двух объёмах синтетических данных
+# (conftest.BUDGET_SCALES): рост числа запросов вместе с числом строк — это N+1
+READ_BUDGETS = [
+    ("/books?limit=50", 2),  # страница + COUNT(*)
+    ("/books?limit=50&cursor=", 1),
+    ("/books/search?q=Книга", 3),
+    ("/books/3", 1),
+    ("/books/3/reviews", 1),
+    ("/books/3/rating", 1),
+    ("/users/2/reviews", 1),
+    ("/reviews/1", 1),
+    ("/collections?limit=50", 1),
+    ("/collections/1", 2),
+    ("/transactions?limit=100", 1),
+    ("/transactions?limit=100&cursor=", 1),
+    ("/transactions/1", 1),
+    ("/users", 1),
+    ("/health", 0),
+    ("/ready", 2),
+]
+
+WRITE_BUDGETS = [
+    ("post", "/reviews", {"rating": 7, "text": "Отлично", "book_id": 3}, 3),
+    ("post", "/collections", {"title": "Новая", "user_id": 1, "book_ids": list(range(1, 11))}, 4),
+    ("post", "/transactions", {"from_user_id": 1, "to_user_id": 2, "book_id": 3, "place": "Кафе"}, 2),
+    ("put", "/transactions/1/status", {"status": "completed"}, 3),
+    ("put", "/books/3", {"title": "Новое название"}, 5),
+    ("delete", "/collections/2", None, 3),
+    ("delete", "/books/5", None, 8),
+]
+
+
+@pytest.mark.parametrize("path,budget", READ_BUDGETS, ids=[path for path, _ in READ_BUDGETS])
+def test_read_query_budget(budget_client, query_budget, path, budget):
+    with query_budget(budget, f"GET {path}"):
+        response = budget_client.get(path)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("method,path,body,budget", WRITE_BUDGETS,
+                         ids=[f"{method.upper()} {path}" for method, path, _, _ in WRITE_BUDGETS])
+def test_write_query_budget(budget_client, query_budget, method, path, body, budget):
+    with query_budget(budget, f"{method.upper()} {path}"):
+        response = getattr(budget_client, method)(path, json=body)
+    assert response.status_code in (200, 201), response.get_data(as_text=True)
+
+
+def test_budget_report_shows_repeated_statements(budget_engine):
+    with QueryRecorder(budget_engine) as recorder:
+        with budget_engine.connect() as conn:
+            for user_id in range(1, 4):
+                conn.execute(text("SELECT id, username FROM users WHERE id = :id"), {"id": user_id})
+    report = recorder.report("GET /example", 1)
+    assert report.splitlines()[0] == "GET /example: 3 SQL statements, budget 1 (+2)"
+    assert "repeated statements (N+1?):" in report
+    assert "3× SELECT … FROM users WHERE id = " in report
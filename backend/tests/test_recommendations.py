@@ -0,0 +1,143 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from datetime import datetime
+import pytest
+from sqlalchemy import insert
+from src import content_similarity, recommendations
+from src.database import models
+
+os.environ["TESTING"] = "1"
+
+HEADERS = {"Authorization": "Bearer test_jwt_token"}
+# (пользователь, книга, оценка): книги 1 и 2 читают одни и те же люди, 3 связана с 2 через пользователя 2
+RATINGS = [(1, 1, 9), (1, 2, 8), (2, 1, 8), (2, 2, 9), (2, 3, 7), (3, 3, 8), (3, 4, 9), (4, 4, 8)]
+
+
+@pytest.fixture(autouse=True)
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": i, "username": f"user{i}", "password": "x"} for i in range(1, 6)])
+        conn.execute(insert(models.Book), [
+            {"id": i, "title": f"Книга {i}", "author": "Автор", "category": "Классика", "user_id": 1}
+            for i in range(1, 7)
+        ])
+        conn.execute(insert(models.Review), [
+            {"user_id": user_id, "book_id": book_id, "rating": rating, "text": "x", "date": datetime(2024, 1, 1)}
+            for user_id, book_id, rating in RATINGS
+        ])
+        # Завершённый обмен — тоже взаимодействие, незавершённый не учитывается
+        conn.execute(insert(models.Transaction), [
+            {"from_user_id": 1, "to_user_id": 4, "book_id": 5, "place": "Library", "status": "completed"},
+            {"from_user_id": 1, "to_user_id": 4, "book_id": 6, "place": "Library", "status": "pending"},
+        ])
+
+
+def test_full_build(db, tmp_path):
+    meta = recommendations.rebuild(db, directory=str(tmp_path))
+    assert (meta["books"], meta["users"], meta["interactions"]) == (5, 4, 9)
+
+    index = recommendations.load_index(str(tmp_path))
+    assert index.similar(1)[0][0] == 2
+    assert {book_id for book_id, _ in index.similar(4)} == {3, 5}
+    # Свои книги не рекомендуются; книга 3 приходит через соседство с книгой 2
+    assert [book_id for book_id, _ in index.recommend(1)] == [3]
+    # Без истории — популярные книги
+    assert [book_id for book_id, _ in index.recommend(99, limit=2)] == [1, 2]
+
+
+def test_incremental_matches_full(db, tmp_path):
+    recommendations.rebuild(db, directory=str(tmp_path / "incremental"))
+    db.add(models.Review(user_id=5, book_id=6, rating=9, text="x"))
+    db.add(models.Review(user_id=5, book_id=1, rating=6, text="x"))
+    db.query(models.Transaction).filter(models.Transaction.book_id == 6).update({"status": "completed"})
+    db.commit()
+
+    meta = recommendations.rebuild(db, incremental=True, directory=str(tmp_path / "incremental"))
+    assert meta["mode"] == "incremental"
+    recommendations.rebuild(db, directory=str(tmp_path / "full"))
+    incremental = recommendations.load_index(str(tmp_path / "incremental"))
+    full = recommendations.load_index(str(tmp_path / "full"))
+    assert incremental.book_ids.tolist() == full.book_ids.tolist()
+    for book_id in full.book_ids.tolist():
+        assert incremental.similar(book_id) == pytest.approx(full.similar(book_id))
+    assert incremental.recommend(4) == pytest.approx(full.recommend(4))
+
+    # Без новых данных новая версия не публикуется
+    version = os.path.basename(incremental.path)
+    recommendations.rebuild(db, incremental=True, directory=str(tmp_path / "incremental"))
+    assert os.path.basename(recommendations.load_index(str(tmp_path / "incremental")).path) == version
+
+
+def test_routes(client, db, tmp_path, mocker):
+    holder = recommendations.IndexHolder(str(tmp_path))
+    mocker.patch("src.routes.recommendations._index", lambda mode="collaborative": holder.get())
+
+    assert client.get("/books/1/similar", headers=HEADERS).status_code == 503
+    assert client.get("/books/1/similar?mode=popular", headers=HEADERS).status_code == 400
+
+    recommendations.rebuild(db, directory=str(tmp_path))
+    holder.reset()
+    response = client.get("/books/1/similar?limit=1", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json["similar"][0]["id"] == 2
+    assert response.json["similar"][0]["title"] == "Книга 2"
+    response = client.get("/users/1/recommendations", headers=HEADERS)
+    assert [book["id"] for book in response.json["recommendations"]] == [3]
+
+    for path in ("/books/1/similar?mode=content&limit=-3", "/books/1/similar?limit=0",
+                 "/users/1/recommendations?limit=-1", "/users/1/recommendations?limit=many"):
+        assert client.get(path, headers=HEADERS).status_code == 400, path
+
+
+BOOKS = {
+    1: ("Гарри Поттер и философский камень", "Джоан Роулинг", "Фэнтези"),
+    2: ("Гарри Поттер и тайная комната", "Джоан Роулинг", "Фэнтези"),
+    3: ("Война и мир", "Лев Толстой", "Классика"),
+    4: ("Анна Каренина", "Лев Толстой", "Классика"),
+    5: ("Властелин колец", "Джон Толкин", "Фэнтези"),
+    6: ("Мастер и Маргарита", "Михаил Булгаков", "Классика"),
+}
+
+
+def test_content_index_updates_in_place(db, tmp_path):
+    for book_id, (title, author, category) in BOOKS.items():
+        db.query(models.Book).filter(models.Book.id == book_id) \
+            .update({"title": title, "author": author, "category": category})
+    db.commit()
+    directory = str(tmp_path)
+    content_similarity.rebuild(db, directory=directory)
+    index = recommendations.load_index(directory, content_similarity.ContentIndex)
+    assert index.similar(1)[0][0] == 2
+    assert index.similar(3)[0][0] == 4
+
+    # Новая книга сразу получает соседей и попадает в их списки; открытый ранее индекс видит запись через mmap
+    book = models.Book(id=7, title="Гарри Поттер и узник Азкабана", author="Джоан Роулинг", category="Фэнтези",
+                       user_id=1)
+    db.add(book)
+    db.commit()
+    assert content_similarity.index_book(book, directory)
+    assert [book_id for book_id, _ in index.similar(7)][:2] == [1, 2]
+    assert 7 in [book_id for book_id, _ in index.similar(1)]
+
+    # После изменения близость пересчитывается и в строке книги, и в чужих списках
+    before = dict(index.similar(3))[4]
+    book = db.get(models.Book, 4)
+    book.title, book.author = "Мастер и Маргарита. Черновики", "Михаил Булгаков"
+    db.commit()
+    content_similarity.index_book(book, directory)
+    assert index.similar(4)[0][0] == 6
+    assert dict(index.similar(3)).get(4, 0) < before
+    assert index.similar(6)[0][0] == 4
+
+
+def test_content_index_failure_does_not_fail_write(client, db, mocker, caplog):
+    mocker.patch.object(content_similarity, "index_book", side_effect=OSError("No space left on device"))
+
+    response = client.post("/books", json={"title": "Новая", "author": "Автор", "category": "Классика",
+                                           "user_id": 1}, headers=HEADERS)
+    assert response.status_code == 201
+    assert db.get(models.Book, response.json["id"]).title == "Новая"
+    assert client.put(f"/books/{response.json['id']}", json={"title": "Другая"}, headers=HEADERS).status_code == 200
+    assert content_similarity.index_book.call_count == 2
+    assert "flask rebuild-recs" in caplog.text
@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import json
+from datetime import datetime
+import pytest
+from flask import Flask
+from src import serializers
+from src.database.models import Book, BookRating, Transaction, User
+from src.serializers import BOOK, BOOK_RATING, TRANSACTION_ADMIN
+
+
+def test_book_plan_matches_route_shape():
+    book = Book(id=1, title="Война и мир", author="Лев Толстой", category="Классика", user_id=2, year=None)
+    book.user = User(id=2, username="lev")
+    assert BOOK.one(book) == {
+        "id": 1, "title": "Война и мир", "author": "Лев Толстой", "category": "Классика",
+        "user_id": 2, "username": "lev", "year": "",
+    }
+    assert BOOK.many([Book(id=3, title="T", author="A", category="C", user_id=2, year=1869)])[0]["username"] is None
+
+
+def test_optional_nested_fields_are_none():
+    transaction = Transaction(id=5, place="Library", status="pending", date=datetime(2024, 1, 2))
+    data = TRANSACTION_ADMIN.one(transaction)
+    assert data["from_user"] == {"id": None, "username": None}
+    assert data["book"] == {"id": None, "title": None}
+    assert data["date"] == "2024-01-02T00:00:00"
+
+
+@pytest.mark.skipif(serializers.orjson is None, reason="orjson не установлен")
+def test_orjson_provider_matches_default_provider():
+    payload = {"b": [1, 2.5, None], "a": "Книга", "date": datetime(2024, 1, 2, 3, 4, 5)}
+    default_app = Flask(__name__)
+    fast_app = Flask(__name__)
+    serializers.init_json(fast_app)
+    assert isinstance(fast_app.json, serializers.OrjsonProvider)
+
+    with default_app.app_context():
+        expected = default_app.json.response(payload).get_data()
+    with fast_app.app_context():
+        actual = fast_app.json.response(payload).get_data()
+    assert json.loads(actual) == json.loads(expected)
+    # Ключи отсортированы, даты — в формате HTTP, как у стандартного провайдера
+    assert actual.index(b'"a"') < actual.index(b'"b"')
+    assert json.loads(actual)["date"] == "Tue, 02 Jan 2024 03:04:05 GMT"
+
+
+@pytest.mark.skipif(serializers.orjson is None, reason="orjson не установлен")
+def test_providers_agree_on_key_order():
+    rating = BookRating(book_id=5, count=2, sum=14, avg=7.0, **{f"r{i}": 0 for i in range(1, 11)})
+    rating.r4, rating.r10 = 1, 1
+    payload = {"rating": BOOK_RATING.one(rating), "title": "Книга"}
+    default_app = Flask(__name__)
+    fast_app = Flask(__name__)
+    serializers.init_json(fast_app)
+
+    with default_app.app_context():
+        expected = default_app.json.response(payload).get_data()
+    with fast_app.app_context():
+        actual = fast_app.json.response(payload).get_data()
+    # Не только те же данные, но и тот же порядок ключей
+    assert json.loads(actual, object_pairs_hook=list) == json.loads(expected, object_pairs_hook=list)
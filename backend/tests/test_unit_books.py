@@ -114,6 +114,7 @@ def test_get_books(client, mocker, mock_auth):
     mock_book2.user = None
 
     mocker.patch("src.routes.books.get_books", return_value=[mock_book1, mock_book2])
+    mocker.patch("src.routes.books.count_books", return_value=2)
     response = client.get("/books", headers=mock_auth["headers"])
     print(response.json)
     assert response.status_code == 200
@@ -128,12 +129,34 @@ def test_get_books_with_filters(client, mocker, mock_auth):
         Book(id=1, title="Filtered Book", author="Author", category="Category", user_id=1)
     ]
     mocker.patch("src.routes.books.get_books", return_value=mock_books)
+    mocker.patch("src.routes.books.count_books", return_value=1)
     response = client.get("/books?category=Category&author=Author&skip=0&limit=1", headers=mock_auth["headers"])
     assert response.status_code == 200
     assert len(response.json["books"]) == 1
     assert response.json["books"][0]["title"] == "Filtered Book"
 
 
+def test_get_books_pagination_in_db(client, mocker, mock_auth):
+    mock_get_books = mocker.patch("src.routes.books.get_books", return_value=[])
+    mock_count_books = mocker.patch("src.routes.books.count_books", return_value=250)
+    response = client.get("/books?exclude_user_id=2&skip=200&limit=20&sort=-year", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert response.json["total"] == 250
+    _, kwargs = mock_get_books.call_args
+    assert kwargs["skip"] == 200
+    assert kwargs["limit"] == 20
+    assert kwargs["sort"] == "-year"
+    assert kwargs["exclude_user_id"] == 2
+    _, kwargs = mock_count_books.call_args
+    assert kwargs["exclude_user_id"] == 2
+
+
+def test_get_books_invalid_sort(client, mocker, mock_auth):
+    mocker.patch("src.routes.books.get_books", side_effect=ValueError("Unsupported sort field: price"))
+    response = client.get("/books?sort=price", headers=mock_auth["headers"])
+    assert response.status_code == 400
+
+
 def test_get_book_success(client, mocker, mock_auth):
     mock_book = MagicMock(spec=Book)
     mock_book.id = 1
@@ -157,6 +180,12 @@ def test_get_book_not_found(client, mocker, mock_auth):
     assert response.status_code == 404
     assert "Book not found" in response.json["error"]
 
+    # crud.get_book возвращает None для несуществующей книги
+    mocker.patch("src.routes.books.get_book", return_value=None)
+    response = client.get("/books/9999", headers=mock_auth["headers"])
+    assert response.status_code == 404
+    assert response.json["error"] == "Book not found"
+
 
 def test_create_book_missing_user_id(client, mock_auth):
     invalid_book_data = {
@@ -205,3 +234,82 @@ def test_internal_server_error(client, mocker, mock_auth):
     assert response.status_code == 500
     assert "Unexpected error" in response.json["error"]
 
+
+
+def test_get_books_cursor(client, mocker, mock_auth):
+    mock_books = [
+        Book(id=i, title=f"Book {i}", author="Author", category="Category", user_id=1) for i in (11, 12, 13)
+    ]
+    mock_get_books = mocker.patch("src.routes.books.get_books", return_value=mock_books)
+    mock_count_books = mocker.patch("src.routes.books.count_books")
+    response = client.get("/books?cursor=&limit=2", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert [b["id"] for b in response.json["books"]] == [11, 12]
+    assert response.json["next_cursor"]
+    mock_count_books.assert_not_called()
+
+    mock_get_books.return_value = mock_books[2:]
+    response = client.get(f"/books?cursor={response.json['next_cursor']}&limit=2", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert mock_get_books.call_args.kwargs["after_id"] == 12
+    assert response.json["next_cursor"] is None
+
+
+def test_get_books_invalid_cursor(client, mocker, mock_auth):
+    mocker.patch("src.routes.books.get_books", return_value=[])
+    response = client.get("/books?cursor=not-a-cursor", headers=mock_auth["headers"])
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("query", ["cursor=&limit=0", "cursor=&limit=-1", "limit=0", "limit=-5"])
+def test_get_books_non_positive_limit(client, mocker, mock_auth, query):
+    mock_get_books = mocker.patch("src.routes.books.get_books", return_value=[Book(id=1, title="A", user_id=1)])
+    response = client.get(f"/books?{query}", headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_get_books.assert_not_called()
+
+
+def test_search_books(client, mocker, mock_auth):
+    mock_books = [Book(id=3, title="Война и мир", author="Лев Толстой", category="Классика", user_id=1)]
+    mock_search = mocker.patch("src.routes.books.search_books", return_value=(mock_books, 1))
+    response = client.get("/books/search?q=война&limit=5", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert response.json["total"] == 1
+    assert response.json["books"][0]["title"] == "Война и мир"
+    assert mock_search.call_args.kwargs == {"skip": 0, "limit": 5}
+
+
+def test_search_books_requires_query(client, mock_auth):
+    response = client.get("/books/search?q=", headers=mock_auth["headers"])
+    assert response.status_code == 400
+
+
+def test_get_books_response_cache(client, mocker, mock_auth):
+    from src import cache
+    mock_get_books = mocker.patch("src.routes.books.get_books", return_value=[])
+    mocker.patch("src.routes.books.count_books", return_value=0)
+
+    first = client.get("/books?category=A&limit=5", headers=mock_auth["headers"])
+    # Порядок параметров не влияет на ключ
+    second = client.get("/books?limit=5&category=A", headers=mock_auth["headers"])
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json == first.json
+    assert mock_get_books.call_count == 1
+    # Валидаторы сохраняются вместе с телом: условный запрос к кэшу получает 304
+    revalidated = client.get("/books?category=A&limit=5",
+                             headers={**mock_auth["headers"], "If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    cache.invalidate("books")
+    third = client.get("/books?category=A&limit=5", headers=mock_auth["headers"])
+    assert third.headers["X-Cache"] == "MISS"
+    assert mock_get_books.call_count == 2
+
+
+@pytest.mark.parametrize("query", ["limit=-1", "limit=0", "skip=-1", "limit=many"])
+def test_search_books_invalid_paging(client, mocker, mock_auth, query):
+    mock_search = mocker.patch("src.routes.books.search_books", return_value=([], 0))
+    response = client.get(f"/books/search?q=война&{query}", headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_search.assert_not_called()
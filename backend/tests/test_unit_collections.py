@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import pytest
+from flask import Flask
+from unittest.mock import MagicMock
+from src.database.models import Collection
+from src.init_routes import init_routes
+
+os.environ["TESTING"] = "1"
+
+
+@pytest.fixture
+def mock_auth():
+    return {"headers": {"Authorization": "Bearer test_jwt_token"}}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    init_routes(app)
+    app.config.update({"TESTING": True})
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def mock_collection():
+    return Collection(id=1, title="Русская классика", user_id=1, book_count=3)
+
+
+def _book_row(book_id, title):
+    row = MagicMock()
+    row.id = book_id
+    row.title = title
+    row.author = "Лев Толстой"
+    return row
+
+
+def test_get_collection_first_page(client, mocker, mock_auth, mock_collection):
+    mocker.patch("src.routes.collections.get_collection", return_value=mock_collection)
+    mock_books = mocker.patch(
+        "src.routes.collections.get_collection_books",
+        return_value=[_book_row(1, "Война и мир"), _book_row(2, "Анна Каренина"), _book_row(3, "Воскресение")]
+    )
+
+    response = client.get("/collections/1?limit=2", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert response.json["book_count"] == 3
+    assert [b["id"] for b in response.json["books"]] == [1, 2]
+    assert response.json["next_cursor"]
+    assert mock_books.call_args.kwargs == {"limit": 3, "sort": "id", "after": None}
+
+    mock_books.return_value = [_book_row(3, "Воскресение")]
+    response = client.get(f"/collections/1?limit=2&cursor={response.json['next_cursor']}", headers=mock_auth["headers"])
+    assert response.json["next_cursor"] is None
+    assert mock_books.call_args.kwargs["after"] == (2,)
+
+
+def test_get_collection_sorted_by_title(client, mocker, mock_auth, mock_collection):
+    mocker.patch("src.routes.collections.get_collection", return_value=mock_collection)
+    mock_books = mocker.patch(
+        "src.routes.collections.get_collection_books",
+        return_value=[_book_row(2, "Анна Каренина"), _book_row(1, "Война и мир")]
+    )
+
+    response = client.get("/collections/1?limit=1&sort=title", headers=mock_auth["headers"])
+    response = client.get(f"/collections/1?limit=1&sort=title&cursor={response.json['next_cursor']}",
+                          headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert mock_books.call_args.kwargs["after"] == ("Анна Каренина", 2)
+
+
+def test_get_collection_not_found(client, mocker, mock_auth):
+    mocker.patch("src.routes.collections.get_collection", return_value=None)
+    response = client.get("/collections/99", headers=mock_auth["headers"])
+    assert response.status_code == 404
+
+
+def test_get_collection_invalid_cursor(client, mock_auth):
+    response = client.get("/collections/1?cursor=bad", headers=mock_auth["headers"])
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_get_collection_non_positive_limit(client, mocker, mock_auth, limit):
+    mock_books = mocker.patch("src.routes.collections.get_collection_books", return_value=[_book_row(1, "А")])
+    response = client.get(f"/collections/1?limit={limit}", headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_books.assert_not_called()
@@ -1 +1,130 @@
-from flask import Flask
\ No newline at end of file
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import pytest
+from datetime import datetime
+from flask import Flask
+from src.database.models import BookRating, Review, User
+from src.init_routes import init_routes
+
+os.environ["TESTING"] = "1"
+
+
+@pytest.fixture
+def mock_auth():
+    return {"headers": {"Authorization": "Bearer test_jwt_token"}}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    init_routes(app)
+    app.config.update({"TESTING": True})
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _review(review_id, user_id=1, rating=8):
+    review = Review(id=review_id, rating=rating, text="Отлично", user_id=user_id, book_id=5,
+                    date=datetime(2024, 1, 1))
+    review.user = User(id=user_id, username=f"user{user_id}")
+    return review
+
+
+def test_get_book_reviews_cursor(client, mocker, mock_auth):
+    mock_get = mocker.patch("src.routes.reviews.get_book_reviews", return_value=[_review(9), _review(7), _review(4)])
+    response = client.get("/books/5/reviews?cursor=&limit=2", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json["reviews"]] == [9, 7]
+    assert response.json["reviews"][0]["username"] == "user1"
+    args, kwargs = mock_get.call_args
+    assert args[1] == 5
+    assert kwargs == {"limit": 3, "before_id": None}
+
+    next_cursor = response.json["next_cursor"]
+    client.get(f"/books/5/reviews?cursor={next_cursor}&limit=2", headers=mock_auth["headers"])
+    assert mock_get.call_args[1]["before_id"] == 7
+
+
+def test_get_user_reviews_offset(client, mocker, mock_auth):
+    review = _review(3)
+    review.book = None
+    mock_get = mocker.patch("src.routes.reviews.get_user_reviews", return_value=[review])
+    response = client.get("/users/1/reviews?skip=20&limit=500", headers=mock_auth["headers"])
+    assert response.json[0]["book_title"] is None
+    # Размер страницы ограничен
+    assert mock_get.call_args[1] == {"skip": 20, "limit": 100}
+
+
+def test_get_book_rating(client, mocker, mock_auth):
+    rating = BookRating(book_id=5, count=2, sum=14, avg=7.0,
+                        **{f"r{i}": 0 for i in range(1, 11)})
+    rating.r4, rating.r10 = 1, 1
+    mocker.patch("src.routes.reviews.get_book_rating", return_value=rating)
+    response = client.get("/books/5/rating", headers=mock_auth["headers"])
+    assert response.json["avg"] == 7.0
+    assert response.json["histogram"]["10"] == 1
+
+    mocker.patch("src.routes.reviews.get_book_rating", return_value=None)
+    response = client.get("/books/6/rating", headers=mock_auth["headers"])
+    assert response.json["count"] == 0
+
+
+def test_create_review_validates_rating(client, mocker, mock_auth):
+    mock_create = mocker.patch("src.routes.reviews.create_review", return_value=_review(1))
+    response = client.post("/reviews", json={"rating": 11, "text": "x", "book_id": 5}, headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_create.assert_not_called()
+
+    response = client.post("/reviews", json={"rating": 8, "text": "x", "book_id": 5}, headers=mock_auth["headers"])
+    assert response.status_code == 201
+    # Автор отзыва по умолчанию — текущий пользователь
+    assert mock_create.call_args[0][1]["user_id"] == 1
+
+
+def test_update_foreign_review_forbidden(client, mocker, mock_auth):
+    mocker.patch("src.routes.reviews.get_review", return_value=_review(1, user_id=2))
+    mock_update = mocker.patch("src.routes.reviews.update_review")
+    response = client.put("/reviews/1", json={"rating": 5}, headers=mock_auth["headers"])
+    assert response.status_code == 403
+    mock_update.assert_not_called()
+
+
+def test_delete_review(client, mocker, mock_auth):
+    mocker.patch("src.routes.reviews.get_review", return_value=_review(1))
+    mock_delete = mocker.patch("src.routes.reviews.delete_review", return_value=True)
+    response = client.delete("/reviews/1", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    mock_delete.assert_called_once()
+
+
+def test_create_review_for_another_user_forbidden(client, mocker, mock_auth):
+    mock_create = mocker.patch("src.routes.reviews.create_review", return_value=_review(1))
+    response = client.post("/reviews", json={"rating": 8, "text": "x", "book_id": 5, "user_id": 3},
+                           headers=mock_auth["headers"])
+    assert response.status_code == 403
+    mock_create.assert_not_called()
+
+
+def test_boolean_rating_rejected(client, mocker, mock_auth):
+    mock_create = mocker.patch("src.routes.reviews.create_review", return_value=_review(1))
+    response = client.post("/reviews", json={"rating": True, "text": "x", "book_id": 5}, headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_create.assert_not_called()
+
+    mocker.patch("src.routes.reviews.get_review", return_value=_review(1))
+    mock_update = mocker.patch("src.routes.reviews.update_review")
+    response = client.put("/reviews/1", json={"rating": True}, headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_update.assert_not_called()
+
+
+def test_reviews_non_positive_limit(client, mocker, mock_auth):
+    mock_get = mocker.patch("src.routes.reviews.get_book_reviews", return_value=[_review(9)])
+    response = client.get("/books/5/reviews?cursor=&limit=-1", headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_get.assert_not_called()
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import pytest
+from flask import Flask
+from src.database import database
+from src.init_routes import init_routes
+
+os.environ["TESTING"] = "1"
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    init_routes(app)
+    database.init_app(app)
+    app.config.update({"TESTING": True})
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_session_is_scoped_to_app_context(app):
+    with app.app_context():
+        first = database.get_db()
+        assert database.get_db() is first
+    with app.app_context():
+        assert database.get_db() is not first
+
+
+def test_pool_status(client):
+    response = client.get("/admin/db/pool", headers={"Authorization": "Bearer admin_token"})
+    assert response.status_code == 200
+    assert response.json["pool"] == "InstrumentedQueuePool"
+    assert {"checkouts", "wait_avg_ms", "wait_max_ms", "saturation", "size"} <= set(response.json)
+
+
+def test_response_cache_evicts_by_bytes():
+    from src.cache import LRUCacheBackend
+    backend = LRUCacheBackend(max_bytes=100, ttl=60)
+    backend.set("a", b"x" * 40, 40)
+    backend.set("b", b"x" * 40, 40)
+    assert backend.get("a") is not None
+    # "b" — самый давно использованный, вытесняется первым
+    backend.set("c", b"x" * 40, 40)
+    assert backend.get("b") is None
+    assert backend.get("c") is not None
+    stats = backend.stats()
+    assert stats["bytes"] == 80
+    assert stats["evictions"] == 1
+    assert stats["hit_ratio"] == 0.6667
+
+
+def test_response_cache_stats(client):
+    response = client.get("/admin/cache", headers={"Authorization": "Bearer admin_token"})
+    assert response.status_code == 200
+    assert {"backend", "hits", "misses", "hit_ratio", "evictions", "bytes", "versions"} <= set(response.json)
@@ -233,3 +233,37 @@ def test_change_transaction_status(client, mocker, mock_auth, mock_transaction):
 
     assert response.status_code == 200
     assert response.json["new_status"] == "completed"
+
+def test_get_transactions_cursor(client, mocker, mock_auth, mock_transaction):
+    mock_transaction.from_user = MagicMock(id=1, username="user1")
+    mock_transaction.to_user = MagicMock(id=2, username="user2")
+    mock_get_transactions = mocker.patch(
+        "src.routes.transactions.get_transactions",
+        return_value=[mock_transaction, mock_transaction]
+    )
+
+    response = client.get("/transactions?cursor=&limit=1", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert len(response.json["transactions"]) == 1
+    next_cursor = response.json["next_cursor"]
+    assert next_cursor
+
+    mock_get_transactions.return_value = [mock_transaction]
+    response = client.get(f"/transactions?cursor={next_cursor}&limit=1", headers=mock_auth["headers"])
+    assert response.status_code == 200
+    assert mock_get_transactions.call_args.kwargs["after"] == (mock_transaction.date, mock_transaction.id)
+    assert response.json["next_cursor"] is None
+
+
+def test_get_transactions_invalid_cursor(client, mocker, mock_auth):
+    mocker.patch("src.routes.transactions.get_transactions", return_value=[])
+    response = client.get("/transactions?cursor=bad", headers=mock_auth["headers"])
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("query", ["cursor=&limit=0", "cursor=&limit=-1", "limit=-1"])
+def test_get_transactions_non_positive_limit(client, mocker, mock_auth, mock_transaction, query):
+    mock_get = mocker.patch("src.routes.transactions.get_transactions", return_value=[mock_transaction])
+    response = client.get(f"/transactions?{query}", headers=mock_auth["headers"])
+    assert response.status_code == 400
+    mock_get.assert_not_called()
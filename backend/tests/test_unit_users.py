@@ -47,7 +47,7 @@ def test_auth(client, mocker):
         return_value=mock_user
     )
     mocker.patch(
-        "src.auth_utils.hash_password",
+        "src.routes.users.hash_password",
         return_value="hashed_password"
     )
 
@@ -98,3 +98,112 @@ def test_login_success(client, mocker):
     "role": "user",
     "username": "test_user"
 }
+
+
+def test_principal_cache_lru_and_ttl(mocker):
+    from src.principal_cache import Principal, PrincipalCache
+
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.set(Principal(1, "a", "user"))
+    cache.set(Principal(2, "b", "user"))
+    assert cache.get(1).username == "a"
+    cache.set(Principal(3, "c", "admin"))
+    assert cache.get(2) is None
+    assert cache.get(3).role == "admin"
+
+    mocker.patch("src.principal_cache.time.monotonic", return_value=10 ** 9)
+    assert cache.get(1) is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_principal_cache_follows_shared_users_version(tmp_path):
+    from src.cache import EntityVersions
+    from src.principal_cache import Principal, PrincipalCache
+
+    # Два воркера: у каждого свой кэш, версия "users" — общая
+    path = str(tmp_path / "versions")
+    worker, other_worker = PrincipalCache(versions=EntityVersions(path)), PrincipalCache(versions=EntityVersions(path))
+    worker.set(Principal(7, "admin", "admin"))
+    assert worker.get(7).role == "admin"
+
+    # Роль изменена в другом воркере: crud.update_user увеличивает версию "users"
+    other_worker.versions.bump("users")
+    assert worker.get(7) is None
+
+    # Запись, прочитанная из БД до изменения, не становится актуальной
+    version = worker.version()
+    other_worker.versions.bump("users")
+    worker.set(Principal(7, "admin", "admin"), version)
+    assert worker.get(7) is None
+
+
+def test_auth_required_uses_principal_cache(client, mocker, monkeypatch):
+    from src.principal_cache import principal_cache
+
+    monkeypatch.delenv("TESTING", raising=False)
+    principal_cache.clear()
+    mocker.patch("src.auth.decode_token", return_value={"sub": "7"})
+    mock_user = MagicMock(spec=User)
+    mock_user.id = 7
+    mock_user.username = "admin"
+    mock_user.role = "admin"
+    mock_get_user = mocker.patch("src.auth.get_user", return_value=mock_user)
+    mocker.patch("src.routes.users.get_users", return_value=[])
+
+    headers = {"Authorization": "Bearer token"}
+    assert client.get("/users", headers=headers).status_code == 200
+    assert client.get("/users", headers=headers).status_code == 200
+    assert mock_get_user.call_count == 1
+
+    principal_cache.invalidate(7)
+    mock_user.role = "user"
+    assert client.get("/users", headers=headers).status_code == 403
+    assert mock_get_user.call_count == 2
+    principal_cache.clear()
+
+
+def test_update_user_invalidates_principal_cache(mocker, db_session):
+    from src.database import crud
+    from src.principal_cache import Principal, principal_cache
+
+    principal_cache.set(Principal(5, "user5", "user"))
+    mocker.patch("src.database.crud.get_user", return_value=MagicMock(spec=User))
+    crud.update_user(db_session, 5, {"role": "admin"})
+    assert principal_cache.get(5) is None
+
+
+def test_login_returns_503_when_password_pool_is_full(client, mocker):
+    from src.password_pool import PasswordPoolBusy
+
+    mock_user = MagicMock(spec=User)
+    mock_user.password = "hashed_password"
+    mocker.patch("src.routes.users.get_user_by_name", return_value=mock_user)
+    mocker.patch("src.routes.users.verify_password", side_effect=PasswordPoolBusy(retry_after=2))
+
+    response = client.post('/login', json={"username": "test_user", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_password_pool_rejects_when_full(mocker):
+    from src import password_pool
+
+    mocker.patch.object(password_pool, "PASSWORD_CAPACITY", 0)
+    with pytest.raises(password_pool.PasswordPoolBusy):
+        password_pool.verify_password("secret", "hash")
+    assert password_pool.stats.snapshot()["rejected"] >= 1
+
+
+def test_password_pool_hashes_in_forkserver_processes(mocker, monkeypatch):
+    from src import auth_utils, password_pool
+
+    monkeypatch.setenv("BCRYPT_ROUNDS", "4")
+    mocker.patch.object(password_pool, "PASSWORD_POOL_SIZE", 1)
+    try:
+        hashed = password_pool.hash_password("secret")
+        assert password_pool._executor._mp_context.get_start_method() == "forkserver"
+        assert password_pool.verify_password("secret", hashed)
+        assert auth_utils.verify_password("secret", hashed)
+    finally:
+        password_pool.shutdown()